@@ -1,58 +1,138 @@
 import os
-from langchain_community.utilities import GoogleSerperAPIWrapper
-from langchain_openai import ChatOpenAI
-# --- THE FIX IS ON THE NEXT LINE ---
-from langchain_core.prompts import PromptTemplate 
-from dotenv import load_dotenv
-
-load_dotenv()
+import cache
+import tax_rules
+import throttle
+import clients
+import telemetry
+import llm_batch
 
+@telemetry.traced("analyze_market_trends", provider="serper")
 def analyze_market_trends(product_name, country_config):
-    search = GoogleSerperAPIWrapper()
     query = f"{product_name} market trends consumer interest {country_config['country_full']}"
-    return search.run(query)
+    return cache.cached("trends", cache.make_key("serper", "us", query), lambda: throttle.run("serper", clients.serper_search, query))
 
-def lookup_tax_rate(product_name, country_config):
-    """
-    Research the likely Tax/GST/VAT rate for a specific product category.
-    """
-    country = country_config['country_full']
-    
-    # 1. Define Strict Rules (The "Knowledge Base")
-    default_rate = 0.20 # UK Standard
-    if country == "India": default_rate = 0.18 # India Standard
-    
-    # 2. Use AI to categorize and refine the rate
-    llm = ChatOpenAI(model="gpt-4o", temperature=0)
-    
-    template = """
+TAX_FALLBACK_REASON = "Standard Fallback Rate"
+NO_TREND_DATA = "No trend data (demand agent unavailable)"
+
+TAX_TEMPLATE = """
     You are a Global Tax Compliance Officer.
     Determine the estimated Indirect Tax Rate (VAT/GST) for: "{product_name}" in {country}.
     
     STRICT RULES (2024/25):
-    [INDIA]
-    - Standard Electronics (Smart Rings, Earbuds): 18%
-    - Luxury Cars/Yachts: 28%
-    - Essentials (Food, Unbranded Clothes): 5% or 0%
-    - Gold/Jewellery: 3%
-    
-    [UK]
-    - Standard Goods: 20%
-    - Children's Clothes / Books: 0%
-    - Home Energy: 5%
+    {rules}
     
     OUTPUT ONLY A JSON:
     {{ "rate": 0.18, "reason": "Electronics slab in India is 18%" }}
     """
-    
+
+BATCH_TAX_TEMPLATE = """
+    You are a Global Tax Compliance Officer.
+    Determine the estimated Indirect Tax Rate (VAT/GST) for EACH item below (id -> product, country).
+
+    STRICT RULES (2024/25):
+    {rules}
+
+    ITEMS:
+    {items}
+
+    OUTPUT ONLY A JSON, one entry per id:
+    {{ "1": {{ "rate": 0.18, "reason": "Electronics slab in India is 18%" }} }}
+    """
+
+def tax_prompt(product_name, country):
+    """The single-item prompt; its hash is the "tax" cache key shared with lookup_tax_rates_batch."""
+    from langchain_core.prompts import PromptTemplate
     prompt = PromptTemplate(
-        input_variables=["product_name", "country"],
-        template=template
+        input_variables=["product_name", "country", "rules"],
+        template=TAX_TEMPLATE
     )
+    return prompt.format(product_name=product_name, country=country, rules=tax_rules.describe_rules(country))
+
+def _default_rate(country):
+    return tax_rules.TAX_RULES.get(country, {}).get("standard", 0.20)
+
+def tax_fallback(country_config):
+    """What lookup_tax_rate answers when it cannot research the rate (also the timeout fallback)."""
+    return { "rate": _default_rate(country_config['country_full']), "reason": TAX_FALLBACK_REASON }
+
+def _valid_tax(answer, item=None):
+    """A cleaned {"rate", "reason"} (rate as a 0-1 fraction), or None for a missing/malformed rate."""
+    if not isinstance(answer, dict): return None
+    try: rate = float(answer["rate"])
+    except (KeyError, TypeError, ValueError): return None
+    if rate > 1: rate /= 100  # "18" for 18%
+    if not 0 <= rate <= 1: return None
+    return {"rate": rate, "reason": str(answer.get("reason") or "")}
+
+@telemetry.traced("lookup_tax_rate", provider="openai")
+def lookup_tax_rate(product_name, country_config, category=None):
+    """
+    Research the likely Tax/GST/VAT rate for a specific product category.
+    `category` (tax_rules.categorize) can be passed in when it was already computed.
+    """
+    country = country_config['country_full']
+    
+    # 1. Deterministic rules table / learned mappings (no network)
+    local = tax_rules.classify(product_name, country, category)
+    if local: return local
+    
+    # 2. Only unknown products reach the LLM (and only they pay for the LangChain import)
+    llm = clients.get_llm("gpt-4o", temperature=0)
     
     try:
-        res = llm.invoke(prompt.format(product_name=product_name, country=country))
         import json
-        return json.loads(res.content.replace("```json","").replace("```",""))
-    except:
-        return { "rate": default_rate, "reason": "Standard Fallback Rate" }
\ No newline at end of file
+        # Validated inside parse, so a malformed answer is neither cached nor learned
+        result = cache.cached_invoke(
+            llm, tax_prompt(product_name, country), "tax",
+            parse=lambda text: _valid_tax(json.loads(text.replace("```json","").replace("```","")))
+        )
+        if result is None:
+            print("⚠️ Tax lookup returned no usable rate, using the default rate")
+            return tax_fallback(country_config)
+        # 3. Remember the answer so this product resolves locally next time
+        tax_rules.learn(product_name, country, result)
+        return result
+    except Exception as e:
+        print(f"⚠️ Tax lookup failed, using the default rate: {e}")
+        return tax_fallback(country_config)
+
+@telemetry.traced("lookup_tax_rates_batch", provider="openai")
+def lookup_tax_rates_batch(items):
+    """
+    Tax info for many [(product_name, country_config), ...] at once, in input order.
+    Same resolution order as lookup_tax_rate (rules/learned, cache, LLM), but all unknown
+    products share a few batched prompts; answers are learned and cached under the
+    single-item key, and items that never validate get the standard fallback rate.
+    """
+    results, pending = [None] * len(items), {}
+    llm = None
+    for i, (product_name, country_config) in enumerate(items):
+        country = country_config['country_full']
+        local = tax_rules.classify(product_name, country)
+        if local:
+            results[i] = local
+            continue
+        llm = llm or clients.get_llm("gpt-4o", temperature=0)
+        key = cache.llm_key(llm, tax_prompt(product_name, country))
+        hit = cache.get("tax", key)
+        if hit is not None: results[i] = hit
+        else: pending[str(i + 1)] = (i, product_name, country, key)
+
+    def build_prompt(chunk):
+        countries = sorted({country for _, _, country, _ in chunk.values()})
+        rules = "\n    ".join(tax_rules.describe_rules(c) for c in countries)
+        lines = [f'{item_id}: "{product_name}" | {country}' for item_id, (_, product_name, country, _) in chunk.items()]
+        return BATCH_TAX_TEMPLATE.format(rules=rules, items="\n    ".join(lines))
+
+    answers = llm_batch.run(llm, pending, build_prompt, _valid_tax) if pending else {}
+    learned = []
+    for item_id, (i, product_name, country, key) in pending.items():
+        if item_id in answers:
+            cache.set("tax", key, answers[item_id])
+            learned.append((product_name, country, answers[item_id]))
+            results[i] = answers[item_id]
+        else:
+            results[i] = { "rate": _default_rate(country), "reason": TAX_FALLBACK_REASON }
+    # One rewrite of the learned file for the whole batch, not one per item
+    tax_rules.learn_many(learned)
+    return results
@@ -5,12 +5,20 @@ import traceback
 st.set_page_config(page_title="AI Market Analyst", page_icon="⚡", layout="wide")
 
 try:
-    from config import get_country_config
-    from agents import analyze_market_trends, lookup_tax_rate
-    from scraper import get_price_data
-    from sourcing_agent import get_wholesale_cost
-    from brain import calculate_viability_score
-    from validator import get_market_guardrails
+    # Only light modules here: the first render must not wait on the scan stack (numpy, pandas, LangChain)
+    from config import get_country_config, list_markets
+    import telemetry
+    from cache import stats as cache_stats
+    import results
+    import watchlist
+    import jobs
+    import health
+    import cache
+    import deadline
+    import time
+    import product_keys
+    from contextlib import ExitStack
+    from datetime import datetime
 
     # CUSTOM CSS
     st.markdown("""
@@ -58,12 +66,57 @@ try:
     # 2. SIDEBAR
     with st.sidebar:
         st.header("🎯 Mission Control")
-        selected_country = st.selectbox("Target Market", ["UK", "INDIA"])
-        product_name = st.text_input("Product Idea", placeholder="e.g. Smart Ring")
+        scan_mode = st.radio("Mode", ["Single Market", "Compare Markets"], horizontal=True)
+        if scan_mode == "Single Market":
+            selected_country = st.selectbox("Target Market", list_markets())
+        else:
+            compare_markets = st.multiselect("Target Markets", list_markets(), default=["UK", "INDIA"])
+            selected_country = compare_markets[0] if compare_markets else list_markets()[0]
+        product_name = st.text_input("Product Idea", placeholder="e.g. Smart Ring", key="product_name")
+        if product_name and not product_keys.known(product_name):
+            # Near-duplicates are never merged silently ("USB A" is not "USB C"); the user picks
+            for suggestion, score in product_keys.similar(product_name, limit=3):
+                st.button(f"💡 Did you mean **{suggestion}**?", key=f"suggest_{suggestion}", use_container_width=True,
+                          on_click=lambda name=suggestion: st.session_state.update(product_name=name))
         config = get_country_config(selected_country)
         st.divider()
-        st.info(f"📍 **Region:** {config['country_full']}\n\n💷 **Currency:** {config['currency_symbol']}")
-        start_btn = st.button("Initialize Deep Scan 🚀", type="primary", use_container_width=True)
+        if scan_mode == "Single Market":
+            st.info(f"📍 **Region:** {config['country_full']}\n\n💷 **Currency:** {config['currency_symbol']}")
+        else:
+            st.info(f"🌍 **Markets:** {len(compare_markets)} · shared sourcing per hub, per-market agents run concurrently")
+        start_label = "Initialize Deep Scan 🚀" if scan_mode == "Single Market" else "Compare Markets 🌍"
+        start_btn = st.button(start_label, type="primary", use_container_width=True)
+        # A stored scan is shown instead of re-running paid agents; this forces a fresh one
+        refresh_btn = st.button("🔄 Refresh (re-scan)", use_container_width=True, disabled=not product_name)
+        if scan_mode == "Single Market" and product_name:
+            # Watched products are re-scanned off-peak by `python watchlist.py run`, so they open instantly
+            watched = watchlist.is_watched(product_name, selected_country)
+            if st.checkbox("⭐ Watch (background refresh)", value=watched,
+                           key=f"watch_{product_keys.canonical_key(product_name)}_{selected_country}") != watched:
+                if watched: watchlist.remove(product_name, selected_country)
+                else: watchlist.add(product_name, selected_country)
+
+        # Previous scans (this session + every other session via the shared cache)
+        past_scans = results.history(st.session_state)
+        if past_scans:
+            with st.expander(f"🕘 Scan History ({len(past_scans)})", expanded=False):
+                for past in past_scans:
+                    when = datetime.fromtimestamp(past['saved_at']).strftime("%d %b %H:%M")
+                    label = f"{past['product']} · {past['country']} · {past.get('final_score', '-')}/10 · {when}"
+                    if st.button(label, key=f"history_{past['key']}", use_container_width=True):
+                        results.activate(st.session_state, past['key'])
+
+        # Endpoints failing right now are skipped (circuit open) until their cooldown ends (health.py)
+        provider_health = health.snapshot()
+        if provider_health:
+            tripped = [row['endpoint'] for row in provider_health if row['state'] != "closed"]
+            with st.expander(f"🩺 Provider Health{' · ⚠️ ' + ', '.join(tripped) if tripped else ''}", expanded=bool(tripped)):
+                for row in provider_health:
+                    icon = {"closed": "🟢", "half_open": "🟡"}.get(row['state'], "🔴")
+                    retry_in = f" · retry in {row['retry_in_s']}s" if row['retry_in_s'] is not None else ""
+                    st.caption(f"{icon} **{row['endpoint']}** · {row['success_rate']:.0%} ok of last {row['calls']} · "
+                               f"p50 {row['p50_s']}s · p95 {row['p95_s']}s{retry_in}")
+                    if row['state'] != "closed" and row['last_error']: st.caption(f"↳ {row['last_error']}")
 
         with st.expander("🛠️ Scoring Methodology"):
             st.caption("""
@@ -74,66 +127,239 @@ try:
             - 🌏 **Ecosystem (20%):** App Maturity, Retail Trust, Adoption Barriers
             """)
 
+    # Spelling variants of an earlier product ("smart rings", "Smart-Ring 2024") scan as that product
+    if product_name and (start_btn or refresh_btn):
+        typed_name, product_name = product_name, product_keys.resolve(product_name)
+        if product_name != typed_name: st.caption(f"🔗 '{typed_name}' matched earlier scans of **{product_name}**")
+
     # 3. MAIN LOGIC
-    if start_btn and product_name:
+    # 3a. COMPARISON MODE: one product across N markets in a single run (pipeline.run_comparison)
+    if scan_mode == "Compare Markets":
+        if product_name and (start_btn or refresh_btn):
+            if not compare_markets:
+                st.warning("Pick at least one market to compare.")
+            else:
+                from pipeline import run_comparison, build_comparison_graph
+                total = len(build_comparison_graph(product_name, compare_markets)[0])
+                with st.status(f"🌍 Scanning {product_name} across {len(compare_markets)} markets...", expanded=True) as status:
+                    progress = st.progress(0.0)
+                    finished = []
+                    def show_progress(name, result):
+                        finished.append(name)
+                        progress.progress(len(finished) / total, text=f"✅ {name}")
+                    st.session_state["comparison"] = run_comparison(product_name, compare_markets, on_done=show_progress)
+                    status.update(label=f"Compared {len(compare_markets)} markets", state="complete", expanded=False)
+
+        comparison = st.session_state.get("comparison")
+        if comparison:
+            import pandas as pd
+            import altair as alt
+            st.subheader(f"🌍 Market Comparison: {comparison['product']}")
+            category = (comparison.get('category') or 'unclassified').replace('_', ' ').title()
+            st.caption(f"Tax category: {category} · prices are in each market's own currency")
+            matrix_df = pd.DataFrame(comparison['matrix'])
+            st.dataframe(matrix_df, hide_index=True)
+            margin_chart = alt.Chart(matrix_df).mark_bar().encode(
+                x=alt.X("market:N", sort="-y", title=None), y=alt.Y("net_margin_pct:Q", title="Net Margin %"),
+                color=alt.Color("final_score:Q", scale=alt.Scale(scheme="redyellowgreen", domain=[0, 10]), title="Score"),
+                tooltip=["country", "avg_price", "currency", "net_profit", "net_margin_pct", "loss_chance_pct", "tax_rate_pct", "final_score", "verdict_tag"]
+            )
+            st.altair_chart(margin_chart, use_container_width=True)
+
+    # 3b. SINGLE MARKET
+    # Any widget click reruns this script: the dashboard is redrawn from the stored record (results.py),
+    # and the agents only run for a scan we have not stored yet, or on an explicit refresh.
+    single_mode = scan_mode == "Single Market"
+    run_fresh = single_mode and bool(product_name) and (start_btn or refresh_btn)
+    if run_fresh and not refresh_btn and results.load(st.session_state, product_name, selected_country):
+        run_fresh = False
+
+    # With a worker pool running (`python jobs.py worker`), the scan becomes a queued job: a reload or a
+    # closed tab no longer kills it halfway, and this thread only polls. The job id lives in the URL.
+    job_id = st.query_params.get("job") if single_mode else None
+    if run_fresh and jobs.workers_alive():
+        job_id = st.query_params["job"] = jobs.submit(product_name, selected_country, force_refresh=refresh_btn)
+        run_fresh = False
+    if job_id:
+        job = jobs.get(job_id)
+        if job is None or job['status'] not in jobs.ACTIVE:
+            del st.query_params["job"]
+            if job and job['status'] == "done": results.activate(st.session_state, job['result_key'])
+            elif job: st.error(f"🚨 Scan of {job['product']} failed: {job['error']}")
+        else:
+            label = (f"⏳ {job['product']} is queued (position {jobs.queue_position(job_id)})" if job['status'] == "queued"
+                     else f"🔄 Scanning {job['product']} in the background...")
+            with st.status(label, expanded=True):
+                started, finished = [], {}
+                for event in jobs.events(job_id):
+                    if event['phase'] == "start": started.append(event['agent'])
+                    else: finished[event['agent']] = event['summary']
+                for agent in started:
+                    if agent not in finished: st.write(f"⏳ {agent}...")
+                    else: st.write(f"✅ {agent}" + (f": {finished[agent]}" if finished[agent] else ""))
+                st.caption("You can close or reload this page; the scan keeps running and is stored when it finishes.")
+            time.sleep(jobs.POLL_SECS)
+            st.rerun()
+
+    record = None if run_fresh or not single_mode else results.active(st.session_state)
+
+    if run_fresh or record:
+        from pipeline import run_scan, verdict_deadline
+        from brain import stream_viability_score
+        from economics import sensitivity_grid, normalize_tax_rate
+        import numpy as np
+        import pandas as pd
+        import altair as alt
+
+        if record:
+            # Show what was scanned, not what is currently typed in the sidebar
+            product_name = record['product']
+            config = get_country_config(record['country'])
+            market_data, competitor_data = record['market_data'], record['competitor_data']
+            sourcing_data, tax_info = record['sourcing_data'], record['tax_info']
+            refresh_note = "use 🔄 Refresh to re-scan"
+            # Stale-while-revalidate: show the last good verdict now, let the scheduler refresh it
+            if watchlist.is_stale(record['saved_at']) and watchlist.is_watched(product_name, record['country']):
+                watchlist.request_refresh(product_name, record['country'])
+                refresh_note = "⭐ watched, a background refresh is queued"
+            st.caption(f"📂 Stored scan from {datetime.fromtimestamp(record['saved_at']).strftime('%d %b %Y %H:%M')} "
+                       f"(pipeline {record['version']}) · {refresh_note}")
+
         st.divider()
         
-        # PHASE 1: LOADING
-        with st.status("🔄 Initializing Universal Market Engine...", expanded=True) as status:
-            st.write("⚖️ Agent 0: Calibrating Market Norms...")
-            guardrails = get_market_guardrails(product_name, config)
-            st.write(f"✅ Target Range: {config['currency_symbol']}{guardrails['min_price']} - {config['currency_symbol']}{guardrails['max_price']}")
-            
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                st.write("🕵️ Agent 1: Demand Signals...")
-                market_data = analyze_market_trends(product_name, config)
-            with col2:
-                st.write("⚔️ Agent 2: Competitive Scan...")
-                competitor_data = get_price_data(product_name, config, guardrails)
-            with col3:
-                st.write("🏭 Agent 3: Supply Chain...")
-                sourcing_data = get_wholesale_cost(product_name, config)
-            
-            st.write("⚖️ Agent 4: Tax & Compliance Scan...")
-            tax_info = lookup_tax_rate(product_name, config)
-            st.caption(f"Detected Tax Slab: {int(tax_info.get('rate', 0.18)*100)}% ({tax_info.get('reason', 'Standard')})")
-                
-            st.write("🧠 Agent 5: Synthesizing Strategy...")
-            verdict = calculate_viability_score(product_name, config, market_data, competitor_data, sourcing_data, tax_info)
-            status.update(label="Deep Analysis Complete", state="complete", expanded=False)
-
-        # PHASE 2: DASHBOARD
-        st.markdown("---")
+        # PHASE 1: LOADING (fresh scans only; the trace stays open while Agent 5 streams)
+        # Agents run concurrently (see pipeline.py); each result is written into its slot as it lands.
+        with ExitStack() as scan_scope:
+            if run_fresh:
+                trace = scan_scope.enter_context(telemetry.scan(product_name, config['country_full']))
+                with st.status("🔄 Initializing Universal Market Engine...", expanded=True) as status:
+                    guard_box = st.container()
+                    col1, col2, col3 = st.columns(3)
+                    tax_box = st.container()
+                    synth_box = st.container()
+
+                    def show_start(name):
+                        if name == "guardrails": guard_box.write("⚖️ Agent 0: Calibrating Market Norms...")
+                        elif name == "market_data": col1.write("🕵️ Agent 1: Demand Signals...")
+                        elif name == "competitor_data": col2.write("⚔️ Agent 2: Competitive Scan...")
+                        elif name == "sourcing_data": col3.write("🏭 Agent 3: Supply Chain...")
+                        elif name == "tax_info": tax_box.write("⚖️ Agent 4: Tax & Compliance Scan...")
+                        elif name == "verdict": synth_box.write("🧠 Agent 5: Synthesizing Strategy...")
+
+                    def show_done(name, result):
+                        if name == "guardrails":
+                            guard_box.write(f"✅ Target Range: {config['currency_symbol']}{result['min_price']} - {config['currency_symbol']}{result['max_price']}")
+                        elif name == "market_data": col1.caption("✅ Demand signals collected")
+                        elif name == "competitor_data": col2.caption(f"✅ {len(result.get('products', []))} listings via {result.get('source')}")
+                        elif name == "sourcing_data": col3.caption("✅ Sourcing benchmarks collected")
+                        elif name == "tax_info":
+                            tax_box.caption(f"Detected Tax Slab: {int(result.get('rate', 0.18)*100)}% ({result.get('reason', 'Standard')})")
+
+                    scan_started = time.monotonic()
+                    # 🔄 Refresh re-fetches everything; a plain scan may reuse cached responses
+                    scan = run_scan(product_name, config, on_start=show_start, on_done=show_done, include_verdict=False,
+                                    force_refresh=refresh_btn)
+                    cache_report = cache_stats()
+                    hits = sum(v.get('hits', 0) for k, v in cache_report.items() if not k.startswith('_'))
+                    misses = sum(v.get('misses', 0) for k, v in cache_report.items() if not k.startswith('_'))
+                    st.caption(f"🗄️ Response cache: {hits} hits / {misses} misses this session")
+                    market_data = scan["market_data"]
+                    competitor_data = scan["competitor_data"]
+                    sourcing_data = scan["sourcing_data"]
+                    tax_info = scan["tax_info"]
+                    status.update(label="Signals collected · Agent 5 is writing the verdict", state="complete", expanded=False)
+
+            # PHASE 2: DASHBOARD
+            st.markdown("---")
         
-        # 1. VERDICT SECTION
-        v_col, s_col, c_col = st.columns([2, 1, 1])
-        with v_col:
-            tag = verdict.get('verdict_tag', 'MONITOR')
-            if "AGGRESSIVELY" in tag: bg_color = "#28a745"
-            elif "CAUTIOUSLY" in tag: bg_color = "#ffc107"
-            else: bg_color = "#dc3545"
-            st.markdown(f'<div class="verdict-box" style="background-color: {bg_color}; font-size: 24px;">{tag}</div>', unsafe_allow_html=True)
-            st.info(f"💡 **Action:** {verdict.get('recommendation')}")
-
-        with s_col:
-            final_score = verdict.get('final_score', 0)
-            st.metric("Viability Score", f"{final_score}/10")
-            st.progress(final_score / 10)
-
-        with c_col:
-            conf = verdict.get('confidence_score', 50)
-            st.metric("Confidence", f"{conf}%")
-            vol = verdict.get('volatility', 'Medium')
-            vol_color = "orange" if vol == "Medium" else "red" if vol == "High" else "green"
-            st.caption(f"Market Volatility: :{vol_color}[{vol}]")
-
-        # 2. STRATEGIC THESIS
-        st.markdown(f"""
-        <div class="thesis-box">
-            🧠 <b>Strategic Thesis:</b> {verdict.get('strategic_thesis', 'Analysis pending...')}
-        </div>
-        """, unsafe_allow_html=True)
+            # 1. VERDICT SECTION (placeholders are filled live while Agent 5 streams)
+            v_col, s_col, c_col = st.columns([2, 1, 1])
+            tag_slot, action_slot = v_col.empty(), v_col.empty()
+            score_slot, conf_slot = s_col.empty(), c_col.empty()
+            thesis_slot = st.empty()
+            pillar_slots = dict(zip(["demand", "competition", "economics", "culture"], [c.empty() for c in st.columns(4)]))
+            pillar_names = {"demand": "📈 Demand", "competition": "⚔️ Competition", "economics": "💵 Economics", "culture": "🌏 Ecosystem"}
+
+            def show_tag(tag):
+                if "AGGRESSIVELY" in tag: bg_color = "#28a745"
+                elif "CAUTIOUSLY" in tag: bg_color = "#ffc107"
+                else: bg_color = "#dc3545"
+                tag_slot.markdown(f'<div class="verdict-box" style="background-color: {bg_color}; font-size: 24px;">{tag}</div>', unsafe_allow_html=True)
+
+            def show_score(final_score):
+                with score_slot.container():
+                    st.metric("Viability Score", f"{final_score}/10")
+                    st.progress(min(max(float(final_score) / 10, 0.0), 1.0))
+
+            def show_confidence(conf, vol):
+                with conf_slot.container():
+                    st.metric("Confidence", f"{conf}%")
+                    vol_color = "orange" if vol == "Medium" else "red" if vol == "High" else "green"
+                    st.caption(f"Market Volatility: :{vol_color}[{vol}]")
+
+            def show_thesis(text):
+                # 2. STRATEGIC THESIS
+                thesis_slot.markdown(f"""
+                <div class="thesis-box">
+                    🧠 <b>Strategic Thesis:</b> {text}
+                </div>
+                """, unsafe_allow_html=True)
+
+            if run_fresh:
+                show_thesis("Analysis pending...")
+                verdict = {}
+                live = {}
+                # Agent 5 streams here rather than inside run_scan, so give it the scan's remaining budget
+                with deadline.scope(at=verdict_deadline(scan_started)), cache.refreshing(refresh_btn):
+                    for path, value in stream_viability_score(product_name, config, market_data, competitor_data, sourcing_data, tax_info):
+                        if path == ():
+                            verdict = value
+                        elif path == ("verdict_tag",): show_tag(value)
+                        elif path == ("final_score",): show_score(value)
+                        elif path == ("strategic_thesis",): show_thesis(value)
+                        elif path == ("recommendation",): action_slot.info(f"💡 **Action:** {value}")
+                        elif path in [("confidence_score",), ("volatility",)]:
+                            live[path[0]] = value
+                            show_confidence(live.get('confidence_score', 50), live.get('volatility', 'Medium'))
+                        elif len(path) == 2 and path[0] == "breakdown" and path[1] in pillar_slots and isinstance(value, dict):
+                            pillar_slots[path[1]].metric(pillar_names[path[1]], f"{value.get('total')}/10")
+            else:
+                verdict = record['verdict']
+
+            # Final pass with the complete verdict (also covers fields the stream could not parse)
+            show_tag(verdict.get('verdict_tag', 'MONITOR'))
+            action_slot.info(f"💡 **Action:** {verdict.get('recommendation')}")
+            show_score(verdict.get('final_score', 0))
+            show_confidence(verdict.get('confidence_score', 50), verdict.get('volatility', 'Medium'))
+            show_thesis(verdict.get('strategic_thesis', 'Analysis pending...'))
+            for key, slot in pillar_slots.items():
+                slot.metric(pillar_names[key], f"{verdict.get('breakdown', {}).get(key, {}).get('total', '-')}/10")
+            ctx = verdict.get('context_report')
+            if ctx:
+                st.caption(f"🧮 Synthesis prompt: {ctx['prompt_tokens']} tokens · trends {ctx['trends']['input_tokens']}→{ctx['trends']['output_tokens']} · "
+                           f"sourcing {ctx['sourcing']['input_tokens']}→{ctx['sourcing']['output_tokens']}")
+                if ctx.get('missing_signals'):
+                    st.caption(f"⚠️ Confidence capped at {ctx['confidence_cap']}%: no {', '.join(s.replace('_', ' ') for s in ctx['missing_signals'])} "
+                               f"(agent unavailable or out of time)")
+
+        if run_fresh:
+            record = results.save(st.session_state, results.make_record(product_name, selected_country, scan, verdict, trace.to_dict()))
+
+        # Where did the time go? (telemetry.py also writes metrics/scans.jsonl + metrics/metrics.<pid>.prom)
+        with st.expander("⏱️ Scan Timing Waterfall"):
+            scan_trace = record.get('trace') or {}
+            spans = scan_trace.get('spans', [])
+            if spans:
+                span_df = pd.DataFrame(spans)
+                waterfall_chart = alt.Chart(span_df).mark_bar().encode(
+                    x=alt.X("start_s:Q", title="Seconds since scan start"), x2="end_s:Q",
+                    y=alt.Y("agent:N", sort=alt.EncodingSortField(field="start_s", order="ascending"), title=None),
+                    color="provider:N",
+                    tooltip=["agent", "provider", "duration_s", "prompt_tokens", "completion_tokens", "cost_usd", "cache_hits", "cache_misses", "payload_bytes"]
+                )
+                st.altair_chart(waterfall_chart, use_container_width=True)
+                st.dataframe(span_df[["agent", "provider", "duration_s", "retries", "prompt_tokens", "completion_tokens", "cost_usd", "cache_hits", "cache_misses", "payload_bytes"]], hide_index=True)
+                st.caption(f"Total: {scan_trace.get('elapsed_s')}s · est. cost ${sum(s['cost_usd'] for s in spans):.4f}")
 
         # 3. FINANCIALS (SAFE MODE)
         st.markdown("---")
@@ -196,6 +422,34 @@ try:
             else:
                 st.error("⚠️ Negative Net Margin projected. High Risk.")
 
+            # Monte Carlo spread around the estimate (economics.profit_risk); older stored scans have none
+            risk = fin.get('risk')
+            if risk:
+                m = risk['margin_percentiles']
+                r_col1, r_col2 = st.columns(2)
+                r_col1.metric("Chance of a Loss", f"{risk['p_loss'] * 100:.0f}%")
+                r_col2.metric("Break-even Price", f"{currency}{risk['break_even_price']:,}",
+                              help=f"Covers costs in 90% of scenarios at {currency}{risk['safe_price']:,}")
+                st.caption(f"🎲 {risk['scenarios']:,} simulated launches · net margin {m['p5']}% (P5) · "
+                           f"{m['p50']}% (median) · {m['p95']}% (P95)")
+
+        # Break-even heatmap: net margin over every COGS% x CPA% pair (vectorized, see economics.py)
+        if sell_price > 0:
+            with st.expander("🗺️ Break-even Heatmap (COGS% vs Marketing CPA%)"):
+                cogs_axis = np.arange(20, 51)
+                cpa_axis = np.arange(10, 41)
+                logistics_pct = config.get('logistics_pct', 0.15)
+                grid = sensitivity_grid(sell_price, normalize_tax_rate(tax_info.get('rate', 0.18)), cogs_axis / 100, cpa_axis / 100, logistics_pct)
+                cogs_mesh, cpa_mesh = np.meshgrid(cogs_axis, cpa_axis, indexing="ij")
+                heat_df = pd.DataFrame({"COGS %": cogs_mesh.ravel(), "CPA %": cpa_mesh.ravel(), "Net Margin %": grid.ravel()})
+                heatmap = alt.Chart(heat_df).mark_rect().encode(
+                    x="CPA %:O", y=alt.Y("COGS %:O", sort="descending"),
+                    color=alt.Color("Net Margin %:Q", scale=alt.Scale(scheme="redyellowgreen", domainMid=0)),
+                    tooltip=["COGS %", "CPA %", "Net Margin %"]
+                )
+                st.altair_chart(heatmap, use_container_width=True)
+                st.caption(f"Green cells are profitable; the red/green boundary is the break-even line. Logistics fixed at {int(round(logistics_pct * 100))}% ({config['country_full']} benchmark).")
+
         # 4. STRATEGY
         st.markdown("---")
         st.subheader("🚀 Market Entry Strategy")
@@ -241,6 +495,11 @@ try:
         with t1: render_pillar(bk.get('demand', {}), "Demand", "0=Dead, 10=Viral")
         with t2: 
             render_pillar(bk.get('competition', {}), "Competition", "0=Blue Ocean, 10=Bloodbath")
+            ps = competitor_data.get('price_stats')
+            if ps:
+                st.caption(f"Price spread across {ps['count']} listings: median {currency}{safe_num(ps['median'])} · "
+                           f"IQR {currency}{safe_num(ps['p25'])}–{currency}{safe_num(ps['p75'])} · "
+                           f"{ps['outliers']} outlier(s) outside the fences")
             with st.expander("View Competitor List"): st.dataframe(competitor_data['products'])
         with t3: render_pillar(bk.get('economics', {}), "Economics", "0=Money Pit, 10=Cash Cow")
         with t4: render_pillar(bk.get('culture', {}), "Ecosystem", "0=Impossible, 10=Plug & Play")
@@ -274,7 +533,7 @@ try:
         </div>
         """, unsafe_allow_html=True)
 
-    elif start_btn and not product_name:
+    if start_btn and not product_name:
         st.warning("Please enter a product name.")
 
 except Exception as e:
@@ -0,0 +1,201 @@
+"""
+Headless batch runner: scores a CSV/JSONL of (product, country) rows with the same
+pipeline the dashboard uses.
+
+    python batch.py ideas.csv -o results.jsonl --workers 8 --openai 6 --serper 10 --apify 3
+
+Results stream to the output JSONL as each row finishes. Completed rows are also
+appended to a checkpoint file (default: <output>.ckpt), so re-running the same
+command after a crash skips everything that already succeeded.
+"""
+import os
+import csv
+import sys
+import json
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from config import get_country_config
+import throttle
+
+# Rows whose guardrails/tax lookups are batched together before they are scanned
+PREWARM_BLOCK = 100
+
+def read_rows(path):
+    """Yields {'product', 'country'} dicts from a .csv (header row) or .jsonl file."""
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.endswith(".jsonl") or path.endswith(".json"):
+            rows = (json.loads(line) for line in f if line.strip())
+        else:
+            rows = csv.DictReader(f)
+        for row in rows:
+            product = (row.get("product") or row.get("product_name") or "").strip()
+            country = (row.get("country") or row.get("market") or "").strip().upper()
+            if product and country:
+                yield {"product": product, "country": country}
+
+def row_key(row):
+    return f"{row['product'].lower()}|{row['country']}"
+
+def load_checkpoint(path):
+    if not os.path.exists(path): return set()
+    with open(path, encoding="utf-8") as f:
+        return {line.rstrip("\n") for line in f if line.strip()}
+
+def prewarm(rows):
+    """
+    Asks for the guardrails and tax rates of a whole block of rows in a few batched LLM
+    calls and leaves the answers in the shared cache, so each row's scan finds them there
+    instead of paying for its own two small prompts. Needs the cache to be on.
+    """
+    import cache
+    if not cache.CACHE_ENABLED: return
+    import product_keys
+    from validator import get_market_guardrails_batch
+    from agents import lookup_tax_rates_batch
+
+    items = []
+    for row in rows:
+        config = get_country_config(row["country"])
+        # The name run_scan will use ("smart rings" -> "Smart Ring"), so the cache keys match
+        if config: items.append((product_keys.resolve(row["product"]), config))
+    if not items: return
+    try:
+        get_market_guardrails_batch(items)
+        lookup_tax_rates_batch(items)
+    except Exception as e:
+        # Rows simply fall back to single-item lookups
+        print(f"⚠️ Prewarm failed for {len(items)} rows: {e}")
+
+def blocks(rows, size):
+    block = []
+    for row in rows:
+        block.append(row)
+        if len(block) >= size:
+            yield block
+            block = []
+    if block: yield block
+
+def score_row(row):
+    # Imported lazily so `python batch.py --help` stays instant
+    from pipeline import run_scan
+    from economics import scan_profit_risk
+    import results
+    import warehouse
+
+    config = get_country_config(row["country"])
+    if config is None:
+        raise ValueError(f"Unknown market '{row['country']}'")
+
+    started = time.time()
+    scan = run_scan(row["product"], config)
+    # A verdict built on fallbacks is not a result: fail the row so it is not checkpointed and a resume retries it
+    if scan["verdict"].get("verdict_tag") == "ERROR":
+        raise RuntimeError(f"Verdict failed: {scan['verdict'].get('recommendation') or 'no verdict'}")
+    if scan.get("degraded"):
+        raise RuntimeError(f"Degraded scan, agents fell back: {', '.join(scan['degraded'])}")
+    competitor_data = scan["competitor_data"]
+    # Ranked alongside dashboard scans on the Leaderboard; a failed write never fails the (paid) row
+    try: warehouse.add(results.make_record(row["product"], row["country"], scan, scan["verdict"]))
+    except Exception as e: print(f"⚠️ Warehouse write failed: {e}")
+    return {
+        "product": row["product"],
+        "country": row["country"],
+        "status": "ok",
+        "scanned_at": started,
+        "elapsed_s": round(time.time() - started, 2),
+        "guardrails": scan["guardrails"],
+        "tax_info": scan["tax_info"],
+        "competitors": {
+            "source": competitor_data.get("source"),
+            "average_price": competitor_data.get("average_price"),
+            "count": len(competitor_data.get("products", [])),
+        },
+        "risk": (scan["verdict"].get("financials") or {}).get("risk")
+                or scan_profit_risk(competitor_data, scan["tax_info"], config["logistics_pct"]),
+        "verdict": scan["verdict"],
+    }
+
+def run_batch(input_path, output_path, checkpoint_path=None, workers=4, prewarm_block=PREWARM_BLOCK):
+    checkpoint_path = checkpoint_path or output_path + ".ckpt"
+    done = load_checkpoint(checkpoint_path)
+    write_lock = threading.Lock()
+    counts = {"ok": 0, "error": 0, "skipped": 0}
+
+    print(f"📦 Batch: {len(done)} rows already completed in {checkpoint_path}")
+
+    with open(output_path, "a", encoding="utf-8") as out, open(checkpoint_path, "a", encoding="utf-8") as ckpt:
+
+        def record(row, result):
+            with write_lock:
+                out.write(json.dumps(result, default=str) + "\n")
+                out.flush()
+                # Only successes are checkpointed: failed rows get retried on resume
+                if result["status"] == "ok":
+                    ckpt.write(row_key(row) + "\n")
+                    ckpt.flush()
+                counts[result["status"]] += 1
+
+        def task(row):
+            try:
+                record(row, score_row(row))
+            except Exception as e:
+                record(row, {"product": row["product"], "country": row["country"], "status": "error", "error": str(e)})
+
+        # Keep a bounded window of rows in flight so a 10k-row file isn't queued up front
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            def todo():
+                for row in read_rows(input_path):
+                    key = row_key(row)
+                    if key in done:
+                        counts["skipped"] += 1
+                        continue
+                    done.add(key)
+                    yield row
+
+            in_flight = set()
+            for block in blocks(todo(), prewarm_block or 1):
+                if prewarm_block: prewarm(block)
+                for row in block:
+                    if len(in_flight) >= workers * 2:
+                        _, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    in_flight.add(pool.submit(task, row))
+            wait(in_flight)
+
+    print(f"✅ Batch finished: {counts['ok']} scored, {counts['error']} failed, {counts['skipped']} skipped (already done).")
+    return counts
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score product ideas in bulk.")
+    parser.add_argument("input", help="CSV (columns: product,country) or JSONL file")
+    parser.add_argument("-o", "--output", default="results.jsonl", help="JSONL file results are appended to")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: <output>.ckpt)")
+    parser.add_argument("--workers", type=int, default=4, help="Rows scanned concurrently")
+    for provider in throttle.PROVIDERS:
+        parser.add_argument(f"--{provider}", type=int, default=None, metavar="N",
+                            help=f"Max concurrent {provider} requests across all rows")
+    parser.add_argument("--openai-rpm", type=int, default=None, metavar="N", help="OpenAI requests per minute")
+    parser.add_argument("--openai-tpm", type=int, default=None, metavar="N", help="OpenAI tokens per minute")
+    parser.add_argument("--serper-qps", type=float, default=None, metavar="N", help="Serper requests per second")
+    parser.add_argument("--no-prewarm", action="store_true",
+                        help="Skip batched guardrails/tax lookups; every row asks on its own")
+    args = parser.parse_args(argv)
+
+    for provider in throttle.PROVIDERS:
+        limit = getattr(args, provider)
+        if limit: throttle.set_concurrency(provider, limit)
+    if args.openai_rpm or args.openai_tpm:
+        # set_rate() replaces both limits: keep the one not given on the command line (OPENAI_RPM / OPENAI_TPM)
+        throttle.set_rate("openai", requests_per_min=args.openai_rpm or throttle.per_minute("openai", "requests"),
+                          tokens_per_min=args.openai_tpm or throttle.per_minute("openai", "tokens"))
+    if args.serper_qps:
+        throttle.set_rate("serper", requests_per_min=args.serper_qps * 60)
+
+    counts = run_batch(args.input, args.output, args.checkpoint, args.workers,
+                       prewarm_block=0 if args.no_prewarm else PREWARM_BLOCK)
+    return 1 if counts["error"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,170 @@
+"""
+Offline benchmark: drives the full scan pipeline against the in-process fakes in
+fakes.py (no keys, no network) and reports scan latency percentiles, throughput
+and peak memory.
+
+    python benchmark.py --scans 40 --concurrency 8 --llm-ms 800 --apify-ms 6000
+    python benchmark.py --scans 40 --cache on --distinct 10 --json bench.json
+
+Caches, the price store and metrics go to a throwaway temp dir, so runs never touch
+(or get sped up by) the real .cache/.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import resource
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+
+PRODUCTS = [
+    "Wireless Earbuds", "Yoga Mat", "Air Fryer", "Standing Desk", "Smart Watch",
+    "Bamboo Toothbrush", "Resistance Bands", "LED Desk Lamp", "Electric Kettle", "Protein Powder",
+    "Phone Tripod", "Reusable Water Bottle", "Gaming Mouse", "Scented Candle", "Baby Monitor",
+]
+MARKETS = ["INDIA", "UK"]
+
+def isolate(workdir, cache_on):
+    """Points every on-disk store at workdir. Must run before the pipeline modules are imported."""
+    os.environ["MARKET_CACHE"] = "on" if cache_on else "off"
+    os.environ["MARKET_CACHE_PATH"] = os.path.join(workdir, "responses.sqlite")
+    os.environ["PRICE_STORE_PATH"] = os.path.join(workdir, "prices.sqlite")
+    os.environ["TAX_LEARNED_PATH"] = os.path.join(workdir, "tax_learned.json")
+    os.environ["PRODUCT_KEYS_PATH"] = os.path.join(workdir, "product_keys.sqlite")
+    os.environ["WATCHLIST_PATH"] = os.path.join(workdir, "watchlist.sqlite")
+    os.environ["JOBS_PATH"] = os.path.join(workdir, "jobs.sqlite")
+    os.environ["WAREHOUSE_PATH"] = os.path.join(workdir, "warehouse.sqlite")
+    os.environ["METRICS_DIR"] = os.path.join(workdir, "metrics")
+    if not cache_on: os.environ["PRICE_FRESH_SECS"] = "0"
+
+def workload(scans, distinct):
+    """(product, market) pairs; `distinct` < scans makes later scans repeat earlier ones (warm-cache runs)."""
+    names = [f"{PRODUCTS[i % len(PRODUCTS)]} {i // len(PRODUCTS) or ''}".strip() for i in range(distinct)]
+    return [(names[i % distinct], MARKETS[i % len(MARKETS)]) for i in range(scans)]
+
+def percentiles(values):
+    if not values: return {"p50": None, "p95": None, "p99": None, "max": None}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"p50": round(float(p50), 3), "p95": round(float(p95), 3), "p99": round(float(p99), 3),
+            "max": round(float(max(values)), 3)}
+
+def run_benchmark(args):
+    import fakes
+    fakes_installed = fakes.install(
+        llm=fakes.Latency(args.llm_ms / 1000, args.sigma, args.llm_errors, seed=1),
+        serper=fakes.Latency(args.serper_ms / 1000, args.sigma, args.serper_errors, seed=2),
+        apify=fakes.Latency(args.apify_ms / 1000, args.sigma, args.apify_errors, seed=3),
+        llm_payload_chars=args.payload_chars,
+        shopping_results=args.listings,
+    )
+
+    # Imported after isolate() so the modules pick up the temp paths
+    import scraper
+    import health
+    import telemetry
+    from config import get_country_config
+    from pipeline import run_scan
+
+    scraper.APIFY_POLL_SECS = 1
+    scraper.MERGE_GRACE_SECS = args.merge_grace
+
+    def one_scan(product, market):
+        config = get_country_config(market)
+        t0 = time.perf_counter()
+        with telemetry.scan(product, config['country_full']) as trace:
+            try:
+                run_scan(product, config)
+                error = None
+            except Exception as e:
+                error = repr(e)
+        return time.perf_counter() - t0, trace, error
+
+    jobs = workload(args.scans, args.distinct or args.scans)
+    latencies, errors, agent_times = [], [], {}
+
+    if args.tracemalloc: tracemalloc.start()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        futures = [pool.submit(one_scan, product, market) for product, market in jobs]
+        for fut in as_completed(futures):
+            elapsed, trace, error = fut.result()
+            latencies.append(elapsed)
+            if error: errors.append(error)
+            for span in trace.spans:
+                agent_times.setdefault(span["agent"], []).append(span["duration_s"])
+    wall = time.perf_counter() - started
+    heap_peak = tracemalloc.get_traced_memory()[1] if args.tracemalloc else None
+    if args.tracemalloc: tracemalloc.stop()
+
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    rss_mb = rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+    return {
+        "scans": len(latencies),
+        "errors": len(errors),
+        "concurrency": args.concurrency,
+        "cache": args.cache,
+        "wall_s": round(wall, 3),
+        "scans_per_min": round(len(latencies) / wall * 60, 2) if wall else None,
+        "latency_s": percentiles(latencies),
+        "agents_p50_s": {name: percentiles(times)["p50"] for name, times in sorted(agent_times.items())},
+        "peak_rss_mb": round(rss_mb, 1),
+        "peak_heap_mb": round(heap_peak / (1024 * 1024), 2) if heap_peak is not None else None,
+        "provider_calls": {
+            "openai": sum(llm.calls for llm in fakes_installed["llm"].values()),
+            "serper": fakes_installed["serper"].calls,
+            "apify": len(fakes_installed["apify"].runs) // 2,
+        },
+        "provider_health": {row["endpoint"]: {"state": row["state"], "success_rate": row["success_rate"]} for row in health.snapshot()},
+        "sample_errors": errors[:3],
+    }
+
+def print_report(report):
+    lat = report["latency_s"]
+    print(f"\n📊 {report['scans']} scans · concurrency {report['concurrency']} · cache {report['cache']}")
+    print(f"   Latency   p50 {lat['p50']}s · p95 {lat['p95']}s · p99 {lat['p99']}s · max {lat['max']}s")
+    print(f"   Throughput {report['scans_per_min']} scans/min ({report['wall_s']}s wall)")
+    heap = f" · heap {report['peak_heap_mb']} MB" if report["peak_heap_mb"] is not None else ""
+    print(f"   Memory    peak RSS {report['peak_rss_mb']} MB{heap}")
+    print(f"   Calls     " + " · ".join(f"{k} {v}" for k, v in report["provider_calls"].items()))
+    print("   Agents p50 " + " · ".join(f"{k} {v}s" for k, v in report["agents_p50_s"].items()))
+    print("   Health    " + " · ".join(f"{k} {v['success_rate']:.0%} ({v['state']})" for k, v in report["provider_health"].items()))
+    if report["errors"]:
+        print(f"   ⚠️ {report['errors']} scans failed, e.g. {report['sample_errors'][0]}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the scan pipeline offline against latency-injecting fakes.")
+    parser.add_argument("--scans", type=int, default=20, help="Total scans to run")
+    parser.add_argument("--concurrency", type=int, default=4, help="Scans in flight at once")
+    parser.add_argument("--distinct", type=int, default=None, help="Distinct (product, market) pairs (default: all distinct)")
+    parser.add_argument("--cache", choices=["on", "off"], default="off", help="Response cache + price store reuse")
+    parser.add_argument("--llm-ms", type=float, default=800, help="Median OpenAI latency")
+    parser.add_argument("--serper-ms", type=float, default=300, help="Median Serper latency")
+    parser.add_argument("--apify-ms", type=float, default=6000, help="Median Apify run duration")
+    parser.add_argument("--sigma", type=float, default=0.35, help="Lognormal spread of every latency")
+    parser.add_argument("--llm-errors", type=float, default=0.0, help="OpenAI failure rate (0-1)")
+    parser.add_argument("--serper-errors", type=float, default=0.0, help="Serper failure rate (0-1)")
+    parser.add_argument("--apify-errors", type=float, default=0.0, help="Apify run failure rate (0-1)")
+    parser.add_argument("--payload-chars", type=int, default=0, help="Extra characters padded into each verdict")
+    parser.add_argument("--listings", type=int, default=20, help="Shopping results per Serper response")
+    parser.add_argument("--merge-grace", type=float, default=0.5, help="Seconds the losing price source gets to merge")
+    parser.add_argument("--no-tracemalloc", dest="tracemalloc", action="store_false", help="Skip heap tracking (lower overhead)")
+    parser.add_argument("--json", metavar="PATH", help="Also write the report as JSON")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="market-bench-") as workdir:
+        isolate(workdir, args.cache == "on")
+        report = run_benchmark(args)
+
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f: json.dump(report, f, indent=2)
+    return 1 if report["errors"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,27 @@
 import json
 import re
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import PromptTemplate
-from dotenv import load_dotenv
-
-load_dotenv()
+import cache
+import clients
+import price_store
+import throttle
+import health
+import telemetry
+import deadline
+import singleflight
+from json_stream import IncrementalJSONParser
+from context_packer import pack_context, count_tokens
+from agents import NO_TREND_DATA, TAX_FALLBACK_REASON
+from sourcing_agent import NO_SOURCING_DATA
+from economics import scalar_waterfall, normalize_tax_rate, scan_profit_risk, LOGISTICS_PCT
 
 # Temperature 0.5 for creativity in strategy, but we force math logic below
-llm = ChatOpenAI(model="gpt-4o", temperature=0.5)
+SYNTHESIS_MODEL = "gpt-4o"
+SYNTHESIS_TEMPERATURE = 0.5
+SYNTHESIS_TIMEOUT = "Strategy synthesis ran out of time"
+
+# Confidence starts here and drops for every signal an agent could not deliver (failure or timeout)
+BASE_CONFIDENCE = 70
+SIGNAL_PENALTIES = {"competitor_prices": 15, "demand_trends": 10, "tax_rate": 10, "sourcing_costs": 5}
 
 def clean_and_parse_json(text):
     try:
@@ -29,38 +43,46 @@ def get_empty_verdict(error_msg):
         "breakdown": {}, "market_entry": {}, "pros": [], "cons": [], "recommendation": error_msg
     }
 
-def calculate_viability_score(product_name, country_config, market_data, competitor_data, sourcing_data, tax_info):
+def missing_signals(market_data, competitor_data, sourcing_data, tax_info):
+    """Which inputs are agent fallbacks rather than real data."""
+    missing = []
+    if "Fallback" in (competitor_data or {}).get('source', ''): missing.append("competitor_prices")
+    if not market_data or market_data == NO_TREND_DATA: missing.append("demand_trends")
+    if (tax_info or {}).get('reason') == TAX_FALLBACK_REASON: missing.append("tax_rate")
+    if not sourcing_data or sourcing_data == NO_SOURCING_DATA: missing.append("sourcing_costs")
+    return missing
+
+def describe_risk(risk, currency):
+    if not risk: return "Unknown (no price data)"
+    m = risk['margin_percentiles']
+    return (f"{int(round(risk['p_loss'] * 100))}% chance of a loss over {risk['scenarios']:,} simulated launches; "
+            f"net margin {m['p5']}% (P5) / {m['p50']}% (P50) / {m['p95']}% (P95); break-even price {currency}{risk['break_even_price']}")
+
+def build_synthesis_prompt(product_name, country_config, market_data, competitor_data, sourcing_data, tax_info):
+    """
+    Runs the Python calculator and renders the Agent 5 prompt.
+    Returns (prompt, forced_financials, context_report).
+    """
+    from langchain_core.prompts import PromptTemplate  # deferred so importing brain stays cheap
     currency = country_config['currency_symbol']
     scraped_price = competitor_data.get('average_price', 0)
-    is_fallback = "Fallback" in competitor_data.get('source', '')
-    confidence_score = 55 if is_fallback else 70
+    missing = missing_signals(market_data, competitor_data, sourcing_data, tax_info)
+    confidence_score = BASE_CONFIDENCE - sum(SIGNAL_PENALTIES[m] for m in missing)
     
     # --- 1. STRICT FINANCIAL CALCULATOR (Python, not AI) ---
     # We calculate everything here to ensure 100% mathematical accuracy.
-    
-    if scraped_price > 0:
-        # Step A: Clean the Price (Force Integer)
-        sell_price = int(scraped_price)
-        
-        # Step B: Get Tax Rate (Handle 18 vs 0.18)
-        raw_rate = tax_info.get('rate', 0.18)
-        if raw_rate > 1: raw_rate = raw_rate / 100 # Fix for "18" becoming "0.18"
-        
-        # Step C: Calculate Costs as Integers (No decimals)
-        cogs_cost = int(sell_price * 0.35)   # 35% Manufacturing
-        ads_cost = int(sell_price * 0.25)    # 25% Marketing/CPA
-        logs_cost = int(sell_price * 0.15)   # 15% Logistics
-        tax_amt = int(sell_price * raw_rate) # Tax Amount (Correctly calculated now)
-        
-        # Step D: Calculate Exact Net Profit
-        total_expenses = cogs_cost + ads_cost + logs_cost + tax_amt
-        net_profit = sell_price - total_expenses
-        
-        # Step E: Calculate Margin %
-        net_margin = int((net_profit / sell_price) * 100)
-    else:
-        # Safety for zero results
-        sell_price = cogs_cost = ads_cost = logs_cost = tax_amt = net_profit = net_margin = 0
+    # (economics.py: 35% COGS, 25% CPA, the market's logistics benchmark, tax on sell price, integer steps)
+    raw_rate = normalize_tax_rate(tax_info.get('rate', 0.18))
+    waterfall = scalar_waterfall(scraped_price, raw_rate, country_config.get('logistics_pct', LOGISTICS_PCT))
+    sell_price = waterfall['sell_price']
+    cogs_cost = waterfall['cogs']
+    ads_cost = waterfall['marketing_cpa']
+    logs_cost = waterfall['logistics_cost']
+    tax_amt = waterfall['tax_amt']
+    net_profit = waterfall['net_profit']
+    net_margin = waterfall['net_margin_pct']
+    # Distribution around that point estimate (Monte Carlo over the scraped prices)
+    risk = scan_profit_risk(competitor_data, tax_info, country_config.get('logistics_pct', LOGISTICS_PCT))
 
     # --- END CALCULATOR ---
 
@@ -75,15 +97,18 @@ def calculate_viability_score(product_name, country_config, market_data, competi
     - Tax ({tax_pct}%): {currency}{tax_amt}
     - REAL NET PROFIT: {currency}{net_profit} (Margin: {net_margin}%)
     - Competitor Count: {comp_count} items found
+    - Downside Risk: {risk_summary}
     
     CONTEXT:
     - Trends: {trends}
     - Supply Chain: {sourcing}
+    - Price History: {price_history}
     
     SCORING RUBRIC (BE STRICT):
     - DEMAND (1-10): 10 = Viral/Explosive trend. 5 = Stable/Flat. 1 = Dead/Declining.
     - COMPETITION (1-10): 10 = Blue Ocean (Zero rivals). 5 = Normal. 1 = Saturated/Bloodbath (>20 rivals).
     - ECONOMICS (1-10): 10 = High Margin (>25%). 5 = Tight Margin (10-15%). 1 = Money Pit (<5%).
+      Subtract 2 if the chance of a loss is above 30%, 4 if above 50%.
     
     MISSION:
     1. Analyze the data using the rubric above.
@@ -121,19 +146,22 @@ def calculate_viability_score(product_name, country_config, market_data, competi
     }}
     """
     
-    comp_count = len(competitor_data.get('products', [])) if competitor_data else 0
+    comp_count = competitor_data.get('listing_count', len(competitor_data.get('products', []))) if competitor_data else 0
+
+    # Token-budgeted evidence instead of a blind character slice of raw Serper text
+    packed, context_report = pack_context({"trends": market_data, "sourcing": sourcing_data})
 
     prompt = PromptTemplate(
-        input_variables=["country_full", "product_name", "trends", "comp_source", "sourcing", "confidence_score", "price", "currency", "cogs", "ads", "logs", "tax_reason", "tax_amt", "tax_pct", "net_profit", "net_margin", "comp_count"], 
+        input_variables=["country_full", "product_name", "trends", "comp_source", "sourcing", "confidence_score", "price", "currency", "cogs", "ads", "logs", "tax_reason", "tax_amt", "tax_pct", "net_profit", "net_margin", "comp_count", "price_history", "risk_summary"], 
         template=template
     )
     
     final_prompt = prompt.format(
         country_full=country_config['country_full'], 
         product_name=product_name,
-        trends=str(market_data)[:600], 
+        trends=packed['trends'], 
         comp_source=competitor_data.get('source'),
-        sourcing=str(sourcing_data)[:600], 
+        sourcing=packed['sourcing'], 
         confidence_score=confidence_score,
         price=sell_price, 
         currency=currency,
@@ -145,23 +173,118 @@ def calculate_viability_score(product_name, country_config, market_data, competi
         tax_pct=int(raw_rate*100),
         net_profit=net_profit,
         net_margin=net_margin,
-        comp_count=comp_count
+        comp_count=comp_count,
+        risk_summary=describe_risk(risk, currency),
+        price_history=price_store.describe(product_name, price_store.market_key(country_config), currency)
     )
     
+    forced_financials = {
+        'sell_price': sell_price,
+        'cogs': cogs_cost,
+        'marketing_cpa': ads_cost,
+        'logistics_cost': logs_cost,
+        'tax_rate': tax_amt,
+        'net_profit': net_profit,
+        'net_margin_pct': net_margin,
+        'risk': risk,
+    }
+    context_report['prompt_tokens'] = count_tokens(final_prompt)
+    context_report['missing_signals'] = missing
+    context_report['confidence_cap'] = confidence_score
+    return final_prompt, forced_financials, context_report
+
+def finish_verdict(result, forced, context_report):
+    """Forces the Python financials in, and caps the model's confidence when signals were missing."""
+    result['financials'] = force_financials(result.get('financials'), forced)
+    result['context_report'] = context_report
+    if context_report.get('missing_signals'):
+        cap = context_report['confidence_cap']
+        try: result['confidence_score'] = min(int(result.get('confidence_score') or cap), cap)
+        except (TypeError, ValueError): result['confidence_score'] = cap
+    return result
+
+def force_financials(fin, forced):
+    # FORCE OVERWRITE: Ensure the Python-calculated math replaces any AI guesses
+    fin = dict(fin) if isinstance(fin, dict) else {}
+    fin.update(forced)
+    return fin
+
+@telemetry.traced("calculate_viability_score", provider="openai")
+def calculate_viability_score(product_name, country_config, market_data, competitor_data, sourcing_data, tax_info):
+    final_prompt, forced, context_report = build_synthesis_prompt(product_name, country_config, market_data, competitor_data, sourcing_data, tax_info)
+    
     try:
-        res = llm.invoke(final_prompt)
-        result = clean_and_parse_json(res.content)
-        if result:
-            # FORCE OVERWRITE: Ensure the Python-calculated math replaces any AI guesses
-            fin = result.get('financials', {})
-            fin['sell_price'] = sell_price
-            fin['cogs'] = cogs_cost
-            fin['marketing_cpa'] = ads_cost
-            fin['logistics_cost'] = logs_cost
-            fin['tax_rate'] = tax_amt
-            fin['net_profit'] = net_profit
-            fin['net_margin_pct'] = net_margin
-            result['financials'] = fin
-            return result
+        llm = clients.get_llm(SYNTHESIS_MODEL, temperature=SYNTHESIS_TEMPERATURE)
+        result = cache.cached_invoke(llm, final_prompt, "synthesis", parse=clean_and_parse_json)
+        if result: return finish_verdict(result, forced, context_report)
         return get_empty_verdict("JSON Error")
-    except Exception as e: return get_empty_verdict(str(e))
\ No newline at end of file
+    except Exception as e: return get_empty_verdict(str(e))
+
+def _replay(result):
+    for key, value in result.items():
+        if key == 'breakdown' and isinstance(value, dict):
+            for pillar, data in value.items(): yield ('breakdown', pillar), data
+        yield (key,), value
+
+@telemetry.traced("calculate_viability_score", provider="openai")
+def stream_viability_score(product_name, country_config, market_data, competitor_data, sourcing_data, tax_info):
+    """
+    Streaming Agent 5 for the dashboard. Yields (path, value) as soon as each verdict field closes,
+    e.g. (("verdict_tag",), "🟡 ENTER CAUTIOUSLY") or (("breakdown", "demand"), {...}).
+    The last event is always ((), full_verdict) with the Python financials forced in.
+    Inside a deadline.scope the stream is cut off when time runs out and the verdict is get_empty_verdict().
+    """
+    final_prompt, forced, context_report = build_synthesis_prompt(product_name, country_config, market_data, competitor_data, sourcing_data, tax_info)
+    llm = clients.get_llm(SYNTHESIS_MODEL, temperature=SYNTHESIS_TEMPERATURE)
+    key = cache.llm_key(llm, final_prompt)
+    
+    # Warm cache: replay instantly
+    result = cache.get("synthesis", key)
+    # Same verdict already streaming for another session: wait for it, then replay
+    flight, leader = singleflight.join(("synthesis", key)) if not result else (None, False)
+    if flight is not None and not leader:
+        telemetry.note_coalesced("synthesis")
+        try: result = flight.wait()
+        except Exception: result = None  # The other stream failed: fall through and stream our own
+    if result:
+        finish_verdict(result, forced, context_report)
+        yield from _replay(result)
+        yield (), result
+        return
+    
+    parsed = None
+    try:
+        if deadline.expired():
+            yield (), get_empty_verdict(SYNTHESIS_TIMEOUT)
+            return
+        parser = IncrementalJSONParser(max_depth=2)
+        text = ""
+        try:
+            estimate = throttle.estimate_tokens(final_prompt)
+            with throttle.slot("openai", tokens=estimate), health.track(f"openai/{SYNTHESIS_MODEL}"):
+                usage = None
+                for chunk in llm.stream(final_prompt, **clients.llm_call_kwargs()):
+                    # The request timeout only bounds each read, not a slow stream as a whole
+                    if deadline.expired(): raise TimeoutError(SYNTHESIS_TIMEOUT)
+                    text += chunk.content
+                    usage = getattr(chunk, "usage_metadata", None) or usage
+                    for path, value in parser.feed(chunk.content):
+                        if path == ('financials',): value = force_financials(value, forced)
+                        elif path[0] == 'financials' and path[-1] in forced: value = forced[path[-1]]
+                        yield path, value
+                throttle.settle_tokens("openai", estimate, usage)
+                telemetry.note_llm_usage(SYNTHESIS_MODEL, usage)
+        except Exception as e:
+            yield (), get_empty_verdict(str(e))
+            return
+        
+        result = parser.result or clean_and_parse_json(text)
+        if not result:
+            yield (), get_empty_verdict("JSON Error")
+            return
+        cache.set("synthesis", key, result)
+        parsed = json.loads(json.dumps(result))  # Followers get the raw verdict, before our financials are forced in
+        yield (), finish_verdict(result, forced, context_report)
+    finally:
+        # Runs on success, failure and early close alike, so waiting sessions are never stranded
+        if leader: singleflight.finish(("synthesis", key), flight, parsed)
\ No newline at end of file
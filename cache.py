@@ -0,0 +1,218 @@
+"""
+Persistent response cache shared by every agent.
+
+Entries live in a small SQLite file, keyed on (namespace, normalized request hash).
+Each namespace has its own TTL because tax rules barely move while prices move daily.
+The store is size-bounded: once it grows past MAX_ENTRIES / MAX_BYTES the least
+recently used rows are evicted.
+
+A forced refresh runs inside refreshing(): every read misses, so the agents fetch again,
+and their fresh answers replace the stored ones.
+"""
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+import contextvars
+from contextlib import contextmanager
+import throttle
+import health
+import clients
+import telemetry
+import singleflight
+
+CACHE_ENABLED = os.getenv("MARKET_CACHE", "on").lower() != "off"
+CACHE_PATH = os.getenv("MARKET_CACHE_PATH", os.path.join(".cache", "responses.sqlite"))
+MAX_ENTRIES = int(os.getenv("MARKET_CACHE_MAX_ENTRIES", "5000"))
+MAX_BYTES = int(os.getenv("MARKET_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+# Freshness per source (seconds)
+TTL = {
+    "guardrails": 7 * DAY,   # Price bands for a category
+    "tax": 30 * DAY,         # GST/VAT slabs
+    "trends": 1 * DAY,       # Serper news/trend snippets
+    "sourcing": 3 * DAY,     # Wholesale listings
+    "synthesis": 1 * DAY,    # Agent 5 verdict
+    "shopping": 6 * HOUR,    # Google Shopping prices
+    "amazon": 6 * HOUR,      # Apify Amazon prices
+    "scans": 1 * DAY,        # Finished dashboard scans (results.py)
+    "scan_index": 1 * DAY,   # Their one-line history summaries
+}
+DEFAULT_TTL = 1 * DAY
+
+_local = threading.local()
+_refreshing = contextvars.ContextVar("cache_refreshing", default=False)
+_stats_lock = threading.Lock()
+_stats = {}
+
+def _connect():
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        folder = os.path.dirname(CACHE_PATH)
+        if folder: os.makedirs(folder, exist_ok=True)
+        conn = sqlite3.connect(CACHE_PATH, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_access ON entries(last_access)")
+        conn.commit()
+        _local.conn = conn
+    return conn
+
+def _count(namespace, field):
+    with _stats_lock:
+        ns = _stats.setdefault(namespace, {"hits": 0, "misses": 0})
+        ns[field] += 1
+    telemetry.note_cache(namespace, field == "hits")
+
+def _normalize(part):
+    if isinstance(part, str): return " ".join(part.lower().split())
+    return part
+
+def make_key(*parts):
+    """Stable hash of the request parts (strings are case/whitespace-normalized)."""
+    raw = json.dumps([_normalize(p) for p in parts], sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+@contextmanager
+def refreshing(enabled=True):
+    """Inside, reads miss (fresh data is fetched) while writes still land. Carried into run_graph workers."""
+    token = _refreshing.set(bool(enabled) or _refreshing.get())
+    try:
+        yield
+    finally:
+        _refreshing.reset(token)
+
+def bypassed():
+    return _refreshing.get()
+
+def get(namespace, key):
+    if not CACHE_ENABLED: return None
+    if _refreshing.get():
+        _count(namespace, "misses")
+        return None
+    conn = _connect()
+    now = time.time()
+    row = conn.execute(
+        "SELECT value, expires_at FROM entries WHERE namespace = ? AND key = ?", (namespace, key)
+    ).fetchone()
+
+    if row is None or row[1] < now:
+        _count(namespace, "misses")
+        return None
+
+    conn.execute("UPDATE entries SET last_access = ? WHERE namespace = ? AND key = ?", (now, namespace, key))
+    conn.commit()
+    _count(namespace, "hits")
+    return json.loads(row[0])
+
+def set(namespace, key, value, ttl=None):
+    if not CACHE_ENABLED: return
+    conn = _connect()
+    now = time.time()
+    payload = json.dumps(value)
+    ttl = ttl if ttl is not None else TTL.get(namespace, DEFAULT_TTL)
+    conn.execute(
+        "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (namespace, key, payload, len(payload), now, now + ttl, now)
+    )
+    conn.commit()
+    _evict(conn)
+
+def recent(namespace, limit=20):
+    """Newest unexpired values in a namespace (no hit/miss accounting)."""
+    if not CACHE_ENABLED: return []
+    rows = _connect().execute(
+        "SELECT value FROM entries WHERE namespace = ? AND expires_at >= ? ORDER BY created_at DESC LIMIT ?",
+        (namespace, time.time(), limit)
+    ).fetchall()
+    return [json.loads(r[0]) for r in rows]
+
+def _evict(conn):
+    # 1. Drop anything already expired
+    conn.execute("DELETE FROM entries WHERE expires_at < ?", (time.time(),))
+
+    # 2. LRU until we fit inside both bounds
+    count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+    if count > MAX_ENTRIES or total > MAX_BYTES:
+        excess_rows = max(count - MAX_ENTRIES, 0)
+        victims = conn.execute("SELECT namespace, key, size FROM entries ORDER BY last_access ASC").fetchall()
+        doomed = []
+        for ns, k, size in victims:
+            if excess_rows <= 0 and total <= MAX_BYTES: break
+            doomed.append((ns, k))
+            excess_rows -= 1
+            total -= size
+        conn.executemany("DELETE FROM entries WHERE namespace = ? AND key = ?", doomed)
+    conn.commit()
+
+def cached(namespace, key, compute, ttl=None):
+    """
+    Returns the cached value for (namespace, key) or calls compute() and stores it.
+    Exceptions from compute() propagate and nothing is stored, so agent fallbacks never get cached.
+    Concurrent misses on the same key (two sessions scanning the same product) share one compute().
+    """
+    value = get(namespace, key)
+    if value is not None: return value
+    def compute_and_store():
+        value = compute()
+        if value is not None: set(namespace, key, value, ttl)
+        return value
+    return singleflight.do((namespace, key), compute_and_store)
+
+def _model_name(llm):
+    return getattr(llm, "model_name", None) or getattr(llm, "model", "unknown")
+
+def llm_key(llm, prompt):
+    model = _model_name(llm)
+    prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    return make_key("llm", model, getattr(llm, "temperature", None), prompt_hash)
+
+def cached_invoke(llm, prompt, namespace, parse=None):
+    """
+    LLM call cached on (model, temperature, prompt hash).
+    The *parsed* answer is what gets stored, so a malformed reply (parse raises / returns None)
+    is never cached and the next scan simply asks again.
+    """
+    parse = parse or (lambda text: text)
+    def compute():
+        health.check_abandoned(f"openai/{_model_name(llm)}")  # e.g. after waiting on another session's call
+        estimate = throttle.estimate_tokens(prompt)
+        with throttle.slot("openai", tokens=estimate), health.track(f"openai/{_model_name(llm)}"):
+            res = llm.invoke(prompt, **clients.llm_call_kwargs())
+        usage = getattr(res, "usage_metadata", None)
+        throttle.settle_tokens("openai", estimate, usage)
+        telemetry.note_llm_usage(_model_name(llm), usage)
+        return parse(res.content)
+    return cached(namespace, llm_key(llm, prompt), compute)
+
+def stats():
+    """Hit/miss counters for this process plus the on-disk footprint."""
+    with _stats_lock:
+        report = {ns: dict(v) for ns, v in _stats.items()}
+    if CACHE_ENABLED:
+        count, total = _connect().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        report["_store"] = {"entries": count, "bytes": total}
+    return report
+
+def clear(namespace=None):
+    conn = _connect()
+    if namespace: conn.execute("DELETE FROM entries WHERE namespace = ?", (namespace,))
+    else: conn.execute("DELETE FROM entries")
+    conn.commit()
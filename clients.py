@@ -0,0 +1,126 @@
+"""
+Central registry of long-lived provider clients.
+
+Every agent gets its OpenAI / Serper / Apify client from here instead of building a
+new one per call, so repeated scans (and batch runs) reuse pooled keep-alive
+connections rather than paying a fresh TCP + TLS handshake each time. SDKs (requests,
+httpx, LangChain, Apify) are imported inside the factories, on first use.
+
+Tuning (env):
+    HTTP_POOL_SIZE    connections kept per host (default 20)
+    HTTP_TIMEOUT      Serper / generic HTTP timeout in seconds (default 30)
+    HTTP_KEEPALIVE    idle seconds before a pooled connection is dropped (default 60)
+    LLM_TIMEOUT       OpenAI request timeout in seconds (default 60)
+    LLM_MAX_RETRIES   OpenAI SDK retries (default 2)
+Inside a scan, HTTP and LLM timeouts are further capped by the agent's budget (deadline.py).
+Serper calls are retried and circuit-broken per endpoint by health.py.
+"""
+import os
+import json
+import threading
+
+import telemetry
+import deadline
+import health
+
+POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "20"))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "30"))
+KEEPALIVE = float(os.getenv("HTTP_KEEPALIVE", "60"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+
+SERPER_URL = "https://google.serper.dev"
+
+_lock = threading.RLock()  # factories may build their own dependencies
+_registry = {}
+
+def _get_or_create(key, factory):
+    with _lock:
+        if key not in _registry:
+            _registry[key] = factory()
+        return _registry[key]
+
+def register(key, client):
+    """Pins a client under a registry key ('http', 'apify', ('llm', model, temperature), ...). Used by fakes.py."""
+    with _lock:
+        _registry[key] = client
+
+def reset():
+    """Drops every cached client; the next get_* call rebuilds it."""
+    with _lock:
+        _registry.clear()
+
+# --- HTTP (Serper and anything else plain-REST) ---
+
+def get_http_session():
+    def build():
+        import requests
+        from requests.adapters import HTTPAdapter
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers["Connection"] = "keep-alive"
+        return session
+    return _get_or_create("http", build)
+
+def serper_post(endpoint, payload, timeout=None):
+    """POST to a Serper endpoint ('search', 'shopping', ...) over the pooled session."""
+    headers = { 'X-API-KEY': os.getenv("SERPER_API_KEY") or "", 'Content-Type': 'application/json' }
+    def post():
+        health.check_abandoned(f"serper/{endpoint}")  # Every attempt, retries included
+        telemetry.note_call("serper")
+        response = get_http_session().post(
+            f"{SERPER_URL}/{endpoint}", headers=headers, data=json.dumps(payload),
+            timeout=deadline.timeout(timeout or HTTP_TIMEOUT)  # never outlives the scan's budget
+        )
+        response.raise_for_status()
+        return response.json()
+    return health.call(f"serper/{endpoint}", post)
+
+def get_serper_wrapper(gl="us"):
+    # Only used for its result formatter, so output text stays identical to GoogleSerperAPIWrapper.run()
+    def build():
+        from langchain_community.utilities import GoogleSerperAPIWrapper
+        return GoogleSerperAPIWrapper(gl=gl)
+    return _get_or_create(("serper_wrapper", gl), build)
+
+def serper_search(query, gl="us", hl="en", num=10):
+    """Drop-in for GoogleSerperAPIWrapper(gl=gl).run(query) that reuses pooled connections."""
+    results = serper_post("search", {"q": query, "gl": gl, "hl": hl, "num": num})
+    return get_serper_wrapper(gl)._parse_results(results)
+
+# --- OpenAI ---
+
+def _openai_http_client():
+    def build():
+        import httpx
+        limits = httpx.Limits(
+            max_connections=POOL_SIZE, max_keepalive_connections=POOL_SIZE, keepalive_expiry=KEEPALIVE
+        )
+        return httpx.Client(limits=limits, timeout=LLM_TIMEOUT)
+    return _get_or_create("openai_http", build)
+
+def get_llm(model="gpt-4o", temperature=0):
+    """One ChatOpenAI per (model, temperature), all sharing a single pooled httpx client."""
+    def build():
+        from langchain_openai import ChatOpenAI
+        return ChatOpenAI(
+            model=model, temperature=temperature, timeout=LLM_TIMEOUT,
+            max_retries=LLM_MAX_RETRIES, http_client=_openai_http_client(),
+            stream_usage=True  # token counts on streamed responses too (telemetry.py)
+        )
+    return _get_or_create(("llm", model, temperature), build)
+
+def llm_call_kwargs():
+    """Per-call kwargs for llm.invoke/stream: a timeout cut to the scan's remaining budget (if any)."""
+    if deadline.remaining() is None: return {}
+    return {"timeout": deadline.timeout(LLM_TIMEOUT)}
+
+# --- Apify ---
+
+def get_apify_client():
+    def build():
+        from apify_client import ApifyClient
+        return ApifyClient(os.getenv("APIFY_API_TOKEN"))
+    return _get_or_create("apify", build)
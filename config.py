@@ -1,17 +1,112 @@
+import os
+import threading
+
+_env_loaded = False
+_env_lock = threading.Lock()
+
+def load_env(path=None):
+    """Loads .env into os.environ exactly once per process (existing env vars win)."""
+    global _env_loaded
+    with _env_lock:
+        if _env_loaded: return
+        try:
+            from dotenv import load_dotenv
+            load_dotenv(path)
+        except ImportError:
+            pass  # python-dotenv is optional when keys come from the real environment
+        _env_loaded = True
+
+# Importing config is the single place settings get loaded; entry points import it first
+load_env()
+
+# --- MARKET REGISTRY ---
+# One entry per market; adding a market is a data change only. Fields:
+#   google_gl       Serper/Google country code       amazon_code   Apify Amazon marketplace
+#   sourcing_hub    wholesale site for Agent 3       tax           GST/VAT table (see tax_rules.py)
+#   logistics_pct   fulfilment + shipping as a share of the sell price (heuristic benchmark)
+SOURCING_HUBS = {
+    # hub -> Google country its wholesale search runs in (shared by every market using the hub)
+    "Alibaba": "us",
+    "IndiaMart": "in",
+}
+
+MARKETS = {
+    "UK": {
+        "country_full": "United Kingdom", "currency_symbol": "£", "currency_code": "GBP",
+        # Google expects 'uk', Amazon and Google Shopping call it 'GB'
+        "google_gl": "uk", "tld": "co.uk", "amazon_code": "GB",
+        "sourcing_hub": "Alibaba", "logistics_pct": 0.15,
+        "tax": {
+            "standard": 0.20, "label": "VAT",
+            "rates": {"fresh_produce": 0.0, "food": 0.0, "childrens_clothing": 0.0, "books": 0.0, "home_energy": 0.05},
+        },
+    },
+    "INDIA": {
+        "country_full": "India", "currency_symbol": "₹", "currency_code": "INR",
+        "google_gl": "in", "tld": "in", "amazon_code": "IN",
+        "sourcing_hub": "IndiaMart", "logistics_pct": 0.15,
+        "tax": {
+            "standard": 0.18, "label": "GST",
+            "rates": {
+                "electronics": 0.18, "luxury_vehicles": 0.28, "food": 0.05, "fresh_produce": 0.0,
+                "clothing": 0.05, "childrens_clothing": 0.05, "books": 0.0, "gold_jewellery": 0.03,
+            },
+        },
+    },
+    "US": {
+        "country_full": "United States", "currency_symbol": "$", "currency_code": "USD",
+        "google_gl": "us", "tld": "com", "amazon_code": "US",
+        "sourcing_hub": "Alibaba", "logistics_pct": 0.12,
+        # Sales tax is added at checkout on top of the listed price, so it does not come out of the margin
+        "tax": {"standard": 0.0, "label": "Sales Tax", "rates": {}},
+    },
+    "GERMANY": {
+        "country_full": "Germany", "currency_symbol": "€", "currency_code": "EUR",
+        "google_gl": "de", "tld": "de", "amazon_code": "DE",
+        "sourcing_hub": "Alibaba", "logistics_pct": 0.14,
+        "tax": {"standard": 0.19, "label": "MwSt", "rates": {"food": 0.07, "fresh_produce": 0.07, "books": 0.07}},
+    },
+    "FRANCE": {
+        "country_full": "France", "currency_symbol": "€", "currency_code": "EUR",
+        "google_gl": "fr", "tld": "fr", "amazon_code": "FR",
+        "sourcing_hub": "Alibaba", "logistics_pct": 0.14,
+        "tax": {"standard": 0.20, "label": "TVA", "rates": {"food": 0.055, "fresh_produce": 0.055, "books": 0.055}},
+    },
+    "CANADA": {
+        "country_full": "Canada", "currency_symbol": "$", "currency_code": "CAD",
+        "google_gl": "ca", "tld": "ca", "amazon_code": "CA",
+        "sourcing_hub": "Alibaba", "logistics_pct": 0.17,
+        "tax": {"standard": 0.05, "label": "GST", "rates": {"food": 0.0, "fresh_produce": 0.0}},
+    },
+    "AUSTRALIA": {
+        "country_full": "Australia", "currency_symbol": "$", "currency_code": "AUD",
+        "google_gl": "au", "tld": "com.au", "amazon_code": "AU",
+        "sourcing_hub": "Alibaba", "logistics_pct": 0.18,
+        "tax": {"standard": 0.10, "label": "GST", "rates": {"fresh_produce": 0.0}},
+    },
+    "UAE": {
+        "country_full": "United Arab Emirates", "currency_symbol": "AED", "currency_code": "AED",
+        "google_gl": "ae", "tld": "ae", "amazon_code": "AE",
+        "sourcing_hub": "Alibaba", "logistics_pct": 0.16,
+        "tax": {"standard": 0.05, "label": "VAT", "rates": {}},
+    },
+}
+
+def list_markets():
+    """Market codes in registry order (UK first, as the dashboard's default)."""
+    return list(MARKETS)
+
 def get_country_config(country):
-    if country == "INDIA":
-        return {
-            "country_full": "India",
-            "currency_symbol": "₹",
-            "google_gl": "in",
-            "tld": "in"
-        }
-    elif country == "UK":
-        return {
-            "country_full": "United Kingdom",
-            "currency_symbol": "£",
-            # Google expects 'uk', we handle Amazon 'GB' mapping in scraper.py
-            "google_gl": "uk", 
-            "tld": "co.uk"
-        }
-    return None
\ No newline at end of file
+    """Registry entry for a market code ('UK', 'india', ...) plus its 'code', or None if unknown."""
+    code = str(country or "").strip().upper()
+    market = MARKETS.get(code)
+    if market is None: return None
+    return {"code": code, **market}
+
+def tax_tables():
+    """{country_full: tax table} for every registered market."""
+    return {m["country_full"]: m["tax"] for m in MARKETS.values()}
+
+def sourcing_gl(country_config):
+    """Google country the market's sourcing hub is searched in."""
+    return SOURCING_HUBS.get(country_config.get("sourcing_hub"), country_config["google_gl"])
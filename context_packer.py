@@ -0,0 +1,97 @@
+"""
+Token-budgeted context packing for the Agent 5 prompt.
+
+Raw Serper text is mostly boilerplate ("Read more...", repeated snippets). Instead of
+cutting it at a character offset, each agent's output is split into sentences,
+deduped, ranked by how much evidence it carries (numbers, prices, growth terms) and
+packed into a per-agent token budget, keeping the original sentence order.
+"""
+import os
+import re
+
+ENCODING_MODEL = "gpt-4o"
+DEFAULT_BUDGET = 150
+BUDGETS = {
+    "trends": int(os.getenv("SYNTH_TRENDS_TOKENS", str(DEFAULT_BUDGET))),
+    "sourcing": int(os.getenv("SYNTH_SOURCING_TOKENS", str(DEFAULT_BUDGET))),
+}
+
+GROWTH_TERMS = {
+    "growth", "growing", "cagr", "increase", "surge", "demand", "trend", "trending",
+    "popular", "rise", "rising", "boom", "decline", "forecast", "market size", "billion", "million",
+}
+PRICE_TERMS = {"price", "cost", "per unit", "wholesale", "moq", "usd", "inr", "gbp", "margin", "fob", "bulk"}
+CURRENCY_RE = re.compile(r"[$£€₹]\s?\d|\d\s?(?:usd|inr|gbp|rs\.?)\b", re.IGNORECASE)
+NUMBER_RE = re.compile(r"\d[\d,.]*")
+SENTENCE_RE = re.compile(r"(?<=[.!?])\s+|\n+")
+
+_encoder = None
+
+def _get_encoder():
+    global _encoder
+    if _encoder is None:
+        try:
+            import tiktoken
+            _encoder = tiktoken.encoding_for_model(ENCODING_MODEL)
+        except Exception:
+            _encoder = False  # No tiktoken / no BPE file: fall back to a ~4 chars per token estimate
+    return _encoder
+
+def count_tokens(text):
+    enc = _get_encoder()
+    if enc: return len(enc.encode(text))
+    return max(1, len(text) // 4) if text else 0
+
+def score_sentence(sentence):
+    low = sentence.lower()
+    score = 0.0
+    score += 3 * len(CURRENCY_RE.findall(sentence))
+    score += min(len(NUMBER_RE.findall(sentence)), 4)
+    score += 2 * sum(term in low for term in GROWTH_TERMS)
+    score += 2 * sum(term in low for term in PRICE_TERMS)
+    if "%" in sentence: score += 2
+    if len(sentence) < 25: score -= 2  # headings, "Read more", dates
+    return score
+
+def _dedupe_key(sentence):
+    return re.sub(r"[^a-z0-9]+", " ", sentence.lower()).strip()
+
+def pack(text, budget):
+    """Returns (packed_text, report) with packed_text no longer than `budget` tokens."""
+    text = str(text or "")
+    sentences, seen = [], set()
+    for raw in SENTENCE_RE.split(text):
+        s = raw.strip()
+        key = _dedupe_key(s)
+        if not key or key in seen: continue
+        seen.add(key)
+        sentences.append(s)
+
+    # Best evidence first, then greedily fill the budget
+    scores = [score_sentence(s) for s in sentences]
+    ranked = sorted(range(len(sentences)), key=lambda i: (-scores[i], i))
+    chosen, used = [], 0
+    for i in ranked:
+        if scores[i] < 0: break  # Boilerplate never earns budget
+        cost = count_tokens(sentences[i]) + 1
+        if used + cost > budget: continue
+        chosen.append(i)
+        used += cost
+
+    packed = " ".join(sentences[i] for i in sorted(chosen))
+    report = {
+        "input_tokens": count_tokens(text),
+        "output_tokens": count_tokens(packed),
+        "sentences_total": len(sentences),
+        "sentences_kept": len(chosen),
+        "budget": budget,
+    }
+    return packed, report
+
+def pack_context(agent_outputs, budgets=None):
+    """pack() for several agents at once: {'trends': text, ...} -> ({'trends': packed}, {'trends': report})."""
+    budgets = budgets or BUDGETS
+    packed, reports = {}, {}
+    for name, text in agent_outputs.items():
+        packed[name], reports[name] = pack(text, budgets.get(name, DEFAULT_BUDGET))
+    return packed, reports
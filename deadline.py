@@ -0,0 +1,61 @@
+"""
+Per-scan time budget, carried in a contextvar down to every network call.
+
+pipeline.run_graph gives each agent its own sub-budget (never past the scan's deadline)
+and runs it inside scope(); anything below asks how long it may still take:
+
+    with deadline.scope(45):
+        clients.serper_post(..., timeout=deadline.timeout(HTTP_TIMEOUT))   # min(30s, time left)
+        if deadline.cancelled(): ...                                       # graph gave up on us
+
+An agent that overruns is abandoned by the graph (its fallback result is used instead) and
+its cancel event is set, so cooperative loops like the Apify poller abort the paid run.
+Outside any scope every helper is a no-op, so agents called directly behave as before.
+"""
+import time
+import contextvars
+from contextlib import contextmanager
+
+_deadline = contextvars.ContextVar("scan_deadline", default=None)  # time.monotonic() value
+_cancel = contextvars.ContextVar("scan_cancel", default=None)      # threading.Event
+
+MIN_TIMEOUT = 1.0  # Never hand a client a zero/negative timeout
+
+@contextmanager
+def scope(seconds=None, at=None, cancel=None):
+    """Tightens the current deadline to `seconds` from now (or the absolute monotonic time `at`)."""
+    limit = at if at is not None else (time.monotonic() + seconds if seconds is not None else None)
+    current = _deadline.get()
+    if current is not None and (limit is None or current < limit): limit = current
+    token = _deadline.set(limit)
+    cancel_token = _cancel.set(cancel) if cancel is not None else None
+    try:
+        yield limit
+    finally:
+        _deadline.reset(token)
+        if cancel_token is not None: _cancel.reset(cancel_token)
+
+def current():
+    return _deadline.get()
+
+def remaining():
+    """Seconds left in the innermost scope (None = unbounded)."""
+    limit = _deadline.get()
+    return None if limit is None else limit - time.monotonic()
+
+def expired():
+    left = remaining()
+    return left is not None and left <= 0
+
+def timeout(default):
+    """A per-request timeout: `default`, shortened to the time left (but at least MIN_TIMEOUT)."""
+    left = remaining()
+    if left is None: return default
+    return max(MIN_TIMEOUT, min(default, left)) if default else max(MIN_TIMEOUT, left)
+
+def cancel_event():
+    return _cancel.get()
+
+def cancelled():
+    event = _cancel.get()
+    return (event is not None and event.is_set()) or expired()
@@ -0,0 +1,131 @@
+"""
+Vectorized unit-economics engine.
+
+Same waterfall as the dashboard (35% COGS, 25% CPA, 15% logistics, tax on the sell
+price, integer truncation at every step) but computed on NumPy arrays, so a whole
+competitor price list or a 2-D sensitivity grid is a single pass.
+
+profit_risk() puts a distribution around that point estimate: a Monte Carlo over
+sell prices resampled from the scraped listings and per-unit costs drawn from ranges,
+giving P(loss), net-margin percentiles and the break-even price (~100k scenarios in
+a few tens of milliseconds).
+"""
+import numpy as np
+
+COGS_PCT = 0.35       # Manufacturing
+CPA_PCT = 0.25        # Marketing / CPA
+LOGISTICS_PCT = 0.15  # Logistics
+
+# Monte Carlo cost ranges: (low, most likely, high) for triangular draws. COGS/CPA are shares
+# of the market's reference price; logistics is a multiple of the market's benchmark.
+# The most likely values are the fixed ratios above, the tails lean towards overruns.
+COGS_RANGE = (0.25, COGS_PCT, 0.50)
+CPA_RANGE = (0.15, CPA_PCT, 0.40)
+LOGISTICS_SPREAD = (0.7, 1.0, 1.5)
+PRICE_JITTER = 0.05          # Lognormal sigma around each resampled competitor price
+FALLBACK_PRICE_SIGMA = 0.15  # Only an average price to go on: wider spread
+SIMULATIONS = 100_000
+MARGIN_PERCENTILES = (5, 25, 50, 75, 95)
+
+def normalize_tax_rate(rate):
+    # Fix for "18" becoming "0.18"
+    return rate / 100 if rate > 1 else rate
+
+def unit_economics(sell_prices, tax_rate, cogs_pct=COGS_PCT, cpa_pct=CPA_PCT, logistics_pct=LOGISTICS_PCT):
+    """
+    Waterfall for every element of sell_prices. All rate arguments may be scalars or
+    arrays that broadcast against sell_prices. Returns a dict of int64 arrays.
+    Zero/negative prices produce an all-zero row (same as the scalar safety branch).
+    """
+    price = np.trunc(np.asarray(sell_prices, dtype=np.float64))
+    tax_rate = np.asarray(tax_rate, dtype=np.float64)
+    tax_rate = np.where(tax_rate > 1, tax_rate / 100, tax_rate)
+
+    cogs = np.trunc(price * cogs_pct)
+    ads = np.trunc(price * cpa_pct)
+    logs = np.trunc(price * logistics_pct)
+    tax = np.trunc(price * tax_rate)
+    net_profit = price - (cogs + ads + logs + tax)
+
+    valid = price > 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        margin = np.trunc(np.where(valid, net_profit / np.where(valid, price, 1) * 100, 0))
+
+    out = {
+        "sell_price": price, "cogs": cogs, "marketing_cpa": ads, "logistics_cost": logs,
+        "tax_amt": tax, "net_profit": net_profit, "net_margin_pct": margin,
+    }
+    return {k: np.where(valid, v, 0).astype(np.int64) for k, v in out.items()}
+
+def scalar_waterfall(scraped_price, tax_rate, logistics_pct=LOGISTICS_PCT):
+    """Exact drop-in for the old int() arithmetic in brain.calculate_viability_score."""
+    res = unit_economics(scraped_price, tax_rate, logistics_pct=logistics_pct)
+    return {k: int(v) for k, v in res.items()}
+
+def sensitivity_grid(sell_price, tax_rate, cogs_pcts, cpa_pcts, logistics_pct=LOGISTICS_PCT):
+    """
+    Net margin % for every (COGS%, CPA%) pair at one sell price.
+    Returns an int64 array of shape (len(cogs_pcts), len(cpa_pcts)).
+    """
+    cogs = np.asarray(cogs_pcts, dtype=np.float64)[:, None]
+    cpa = np.asarray(cpa_pcts, dtype=np.float64)[None, :]
+    return unit_economics(sell_price, tax_rate, cogs_pct=cogs, cpa_pct=cpa, logistics_pct=logistics_pct)["net_margin_pct"]
+
+def tax_sensitivity_grid(sell_price, tax_rates, cogs_pcts, cpa_pct=CPA_PCT, logistics_pct=LOGISTICS_PCT):
+    """Net margin % over (COGS%, tax rate) at a fixed CPA. Shape (len(cogs_pcts), len(tax_rates))."""
+    cogs = np.asarray(cogs_pcts, dtype=np.float64)[:, None]
+    tax = np.asarray(tax_rates, dtype=np.float64)[None, :]
+    return unit_economics(sell_price, tax, cogs_pct=cogs, cpa_pct=cpa_pct, logistics_pct=logistics_pct)["net_margin_pct"]
+
+def price_list_economics(products, tax_rate, logistics_pct=LOGISTICS_PCT):
+    """Waterfall for every competitor listing in competitor_data['products'] (pass the market's logistics_pct)."""
+    prices = [p.get("price", 0) for p in products]
+    return unit_economics(prices, tax_rate, logistics_pct=logistics_pct)
+
+def profit_risk(prices, tax_rate, reference_price=None, logistics_pct=LOGISTICS_PCT, n=SIMULATIONS,
+                cogs_range=COGS_RANGE, cpa_range=CPA_RANGE, logistics_spread=LOGISTICS_SPREAD, seed=0):
+    """
+    Monte Carlo of n launches. Sell price is a bootstrap of the observed competitor prices
+    (with a little lognormal jitter); COGS, CPA and logistics are per-unit costs anchored
+    on reference_price (default: median observed price), so a launch priced below the
+    market really does lose money. Tax is charged on the sell price, as in the waterfall.
+
+    Returns None when there is no price to go on, else
+    {scenarios, p_loss, expected_net_profit, margin_percentiles: {"p5": .., ...},
+     break_even_price (median), safe_price (covers costs in 90% of scenarios)}.
+    The fixed seed keeps the numbers (and so the synthesis prompt/cache key) stable per input.
+    """
+    prices = np.asarray(prices, dtype=np.float64).ravel()
+    prices = prices[prices > 0]
+    reference_price = reference_price or (float(np.median(prices)) if prices.size else 0)
+    if reference_price <= 0: return None
+
+    rng = np.random.default_rng(seed)
+    if prices.size:
+        sell = rng.choice(prices, n) * rng.lognormal(0.0, PRICE_JITTER, n)
+    else:
+        sell = reference_price * rng.lognormal(0.0, FALLBACK_PRICE_SIGMA, n)
+    unit_cost = reference_price * (
+        rng.triangular(*cogs_range, n) + rng.triangular(*cpa_range, n)
+        + logistics_pct * rng.triangular(*logistics_spread, n)
+    )
+    tax_rate = normalize_tax_rate(float(tax_rate))
+
+    net = sell * (1 - tax_rate) - unit_cost
+    margin = net / sell * 100
+    margins = np.percentile(margin, MARGIN_PERCENTILES)
+    break_even, safe = np.percentile(unit_cost / max(1 - tax_rate, 1e-9), [50, 90])
+    return {
+        "scenarios": int(n),
+        "p_loss": round(float(np.count_nonzero(net < 0)) / n, 4),
+        "expected_net_profit": round(float(net.mean()), 2),
+        "margin_percentiles": {f"p{p}": round(float(v), 1) for p, v in zip(MARGIN_PERCENTILES, margins)},
+        "break_even_price": int(np.ceil(break_even)),
+        "safe_price": int(np.ceil(safe)),
+    }
+
+def scan_profit_risk(competitor_data, tax_info, logistics_pct=LOGISTICS_PCT, **kwargs):
+    """profit_risk() straight from a scan's competitor_data / tax_info."""
+    prices = [p.get("price", 0) for p in (competitor_data or {}).get("products", [])]
+    reference = (competitor_data or {}).get("average_price") or None
+    return profit_risk(prices, (tax_info or {}).get("rate", 0.18), reference, logistics_pct, **kwargs)
@@ -0,0 +1,288 @@
+"""
+In-process stand-ins for OpenAI, Serper and Apify, for benchmarks and offline runs.
+
+Each fake mimics the response shapes the agents expect and draws its latency from a
+configurable distribution, fails at a configurable rate and returns configurable
+payload sizes. install() registers them in clients.py, so the real agent code runs
+unchanged, just without the network:
+
+    import fakes
+    fakes.install(llm=fakes.Latency(median_s=0.8), apify=fakes.Latency(median_s=6))
+"""
+import os
+import json
+import re
+import math
+import time
+import random
+import threading
+import itertools
+import zlib
+
+import requests
+
+import clients
+
+class Latency:
+    """Lognormal latency (median + spread) with an independent failure probability."""
+
+    def __init__(self, median_s=0.2, sigma=0.35, error_rate=0.0, seed=None):
+        self.median_s = median_s
+        self.sigma = sigma
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def sample(self):
+        with self.lock:
+            if self.median_s <= 0: return 0.0
+            return self.rng.lognormvariate(math.log(self.median_s), self.sigma)
+
+    def fails(self):
+        with self.lock:
+            return self.rng.random() < self.error_rate
+
+class FakeProviderError(RuntimeError):
+    pass
+
+# --- OpenAI (ChatOpenAI) ---
+
+class FakeMessage:
+    def __init__(self, content, usage=None):
+        self.content = content
+        self.usage_metadata = usage
+
+def _usage(prompt, completion):
+    return {"input_tokens": max(1, len(prompt) // 4), "output_tokens": max(1, len(completion) // 4)}
+
+def fake_verdict(prompt, padding_chars=0):
+    rng = random.Random(zlib.crc32(prompt.encode("utf-8")))  # hash() is salted per process (PYTHONHASHSEED)
+    pillar = lambda: {
+        "total": rng.randint(3, 9), "reason": "Synthetic reason.",
+        "signal_1": "Search: High", "signal_2": "Growth: Fast", "signal_3": "Social: Viral",
+    }
+    score = round(rng.uniform(3, 9), 1)
+    return {
+        "final_score": score,
+        "confidence_score": 70,
+        "verdict_tag": "🟡 ENTER CAUTIOUSLY" if score < 7 else "🟢 ENTER AGGRESSIVELY",
+        "strategic_thesis": "Synthetic thesis. " + ("x" * padding_chars),
+        "lifecycle_stage": "Growth",
+        "volatility": rng.choice(["Low", "Medium", "High"]),
+        "financials": {"sell_price": 0, "note": "Synthetic."},
+        "market_entry": {"strategy": "D2C", "reason": "Synthetic."},
+        "breakdown": {k: pillar() for k in ["demand", "competition", "economics", "culture"]},
+        "pros": ["Pro 1", "Pro 2"],
+        "cons": ["Con 1", "Con 2"],
+        "recommendation": "Synthetic advice.",
+    }
+
+class FakeChatOpenAI:
+    def __init__(self, model_name="gpt-4o", temperature=0, latency=None, payload_chars=0):
+        self.model_name = model_name
+        self.temperature = temperature
+        self.latency = latency or Latency(0.8)
+        self.payload_chars = payload_chars
+        self.calls = 0
+
+    def _answer(self, prompt):
+        if "EACH item below" in prompt:
+            # llm_batch prompts: one line per item, '<id>: "<product>" | ...'
+            ids = re.findall(r'^\s*(\d+): "', prompt, re.M)
+            one = json.loads(self._answer(prompt.replace("EACH item below", "the item")))
+            return json.dumps({i: one for i in ids})
+        if "Market Calibration Engine" in prompt:
+            return json.dumps({"min_price": 40, "max_price": 400})
+        if "Tax Compliance Officer" in prompt:
+            return json.dumps({"rate": 0.2, "reason": "Synthetic standard rate"})
+        return "```json\n" + json.dumps(fake_verdict(prompt, self.payload_chars), ensure_ascii=False) + "\n```"
+
+    def invoke(self, prompt, timeout=None, **kwargs):
+        self.calls += 1
+        delay = self.latency.sample()
+        if timeout and delay > timeout:
+            time.sleep(timeout)
+            raise FakeProviderError(f"Fake OpenAI: request timed out ({timeout}s)")
+        time.sleep(delay)
+        if self.latency.fails(): raise FakeProviderError("Fake OpenAI: 500 Internal Server Error")
+        content = self._answer(prompt)
+        return FakeMessage(content, _usage(prompt, content))
+
+    def stream(self, prompt, timeout=None, **kwargs):
+        """Latency is split into time-to-first-token (1/4) and a steady token stream (3/4)."""
+        self.calls += 1
+        total = self.latency.sample()
+        if timeout and total / 4 > timeout:
+            time.sleep(timeout)
+            raise FakeProviderError(f"Fake OpenAI: request timed out ({timeout}s)")
+        time.sleep(total / 4)
+        if self.latency.fails(): raise FakeProviderError("Fake OpenAI: stream reset")
+        content = self._answer(prompt)
+        chunks = [content[i:i + 16] for i in range(0, len(content), 16)]
+        per_chunk = (total * 3 / 4) / max(len(chunks), 1)
+        for i, chunk in enumerate(chunks):
+            time.sleep(per_chunk)
+            yield FakeMessage(chunk, _usage(prompt, content) if i == len(chunks) - 1 else None)
+
+# --- Serper (HTTP) ---
+
+class FakeResponse:
+    def __init__(self, payload, status=200):
+        self.payload = payload
+        self.status_code = status
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"Fake Serper: HTTP {self.status_code}", response=self)
+
+    def json(self):
+        return self.payload
+
+GL_CURRENCY = {"gb": "£", "uk": "£", "in": "₹", "us": "$"}
+
+class FakeSerperSession:
+    """Replaces the pooled requests.Session for google.serper.dev (/search and /shopping)."""
+
+    def __init__(self, latency=None, organic_results=10, shopping_results=20, price_range=(40, 400)):
+        self.latency = latency or Latency(0.3)
+        self.organic_results = organic_results
+        self.shopping_results = shopping_results
+        self.price_range = price_range
+        self.calls = 0
+        self.headers = {}
+
+    def post(self, url, headers=None, data=None, params=None, timeout=None, **kwargs):
+        self.calls += 1
+        delay = self.latency.sample()
+        if timeout and delay > timeout:
+            time.sleep(timeout)
+            raise requests.Timeout(f"Fake Serper: read timed out ({timeout}s)")
+        time.sleep(delay)
+        if self.latency.fails(): return FakeResponse({"message": "error"}, status=503)
+
+        body = json.loads(data) if data else dict(params or {})
+        q = body.get("q", "")
+        rng = random.Random(f"{url}|{q}")
+        if url.endswith("/shopping"):
+            symbol = GL_CURRENCY.get(str(body.get("gl", "")).lower(), "$")
+            lo, hi = self.price_range
+            items = [
+                {"title": f"{q} model {i}", "price": f"{symbol}{rng.uniform(lo, hi):,.2f}", "source": "Fake Store"}
+                for i in range(self.shopping_results)
+            ]
+            return FakeResponse({"shopping": items})
+        organic = [
+            {
+                "title": f"{q} result {i}",
+                "link": f"https://example.com/{i}",
+                "snippet": f"{q}: demand grew {rng.randint(5, 60)}% last year, average price ${rng.randint(20, 300)}.",
+            }
+            for i in range(self.organic_results)
+        ]
+        return FakeResponse({"organic": organic})
+
+# --- Apify ---
+
+class _FakeRun:
+    def __init__(self, run_id, finishes_at, failed, max_items, dataset_id):
+        self.data = {
+            "id": run_id, "status": "RUNNING", "defaultDatasetId": dataset_id,
+        }
+        self.finishes_at = finishes_at
+        self.failed = failed
+        self.max_items = max_items
+
+    def snapshot(self):
+        if self.data["status"] == "RUNNING" and time.time() >= self.finishes_at:
+            self.data["status"] = "FAILED" if self.failed else "SUCCEEDED"
+        return dict(self.data)
+
+class _FakeRunClient:
+    def __init__(self, run):
+        self.run = run
+
+    def get(self):
+        return self.run.snapshot()
+
+    def wait_for_finish(self, wait_secs=None):
+        remaining = self.run.finishes_at - time.time()
+        if remaining > 0: time.sleep(min(remaining, wait_secs) if wait_secs else remaining)
+        return self.run.snapshot()
+
+    def abort(self):
+        self.run.data["status"] = "ABORTED"
+        return dict(self.run.data)
+
+class _FakeDatasetClient:
+    def __init__(self, run, price_range):
+        self.run = run
+        self.price_range = price_range
+
+    def iterate_items(self, fields=None, **kwargs):
+        rng = random.Random(self.run.data["id"])
+        lo, hi = self.price_range
+        for i in range(self.run.max_items if self.run else 0):
+            yield {"asin": f"B0FAKE{i:05d}", "title": f"Fake listing {i}", "price": round(rng.uniform(lo, hi), 2)}
+
+    def list_items(self, **kwargs):
+        class _Page: pass
+        page = _Page()
+        page.items = list(self.iterate_items())
+        return page
+
+class _FakeActorClient:
+    def __init__(self, owner):
+        self.owner = owner
+
+    def start(self, run_input=None, **kwargs):
+        return self.owner._start(run_input or {})
+
+    def call(self, run_input=None, **kwargs):
+        run = self.owner._start(run_input or {})
+        return self.owner.run(run["id"]).wait_for_finish()
+
+class FakeApifyClient:
+    def __init__(self, latency=None, price_range=(40, 400)):
+        self.latency = latency or Latency(6.0)
+        self.price_range = price_range
+        self.runs = {}
+        self.ids = itertools.count(1)
+        self.lock = threading.Lock()
+
+    def _start(self, run_input):
+        with self.lock:
+            n = next(self.ids)
+        run = _FakeRun(
+            f"fake-run-{n}", time.time() + self.latency.sample(), self.latency.fails(),
+            int(run_input.get("maxItems", 10)), f"fake-dataset-{n}"
+        )
+        self.runs[run.data["id"]] = run
+        self.runs[run.data["defaultDatasetId"]] = run
+        return dict(run.data)
+
+    def actor(self, actor_id):
+        return _FakeActorClient(self)
+
+    def run(self, run_id):
+        return _FakeRunClient(self.runs[run_id])
+
+    def dataset(self, dataset_id):
+        return _FakeDatasetClient(self.runs.get(dataset_id), self.price_range)
+
+# --- Wiring ---
+
+def install(llm=None, serper=None, apify=None, llm_payload_chars=0, organic_results=10, shopping_results=20):
+    """Registers fakes for every provider and returns them (for call counts)."""
+    os.environ.setdefault("OPENAI_API_KEY", "sk-fake")
+    os.environ.setdefault("SERPER_API_KEY", "fake")
+    os.environ.setdefault("APIFY_API_TOKEN", "fake")
+
+    fake_llms = {}
+    for temperature in (0, 0.5):
+        fake_llms[temperature] = FakeChatOpenAI("gpt-4o", temperature, llm or Latency(0.8), llm_payload_chars)
+        clients.register(("llm", "gpt-4o", temperature), fake_llms[temperature])
+    session = FakeSerperSession(serper or Latency(0.3), organic_results, shopping_results)
+    apify_client = FakeApifyClient(apify or Latency(6.0))
+    clients.register("http", session)
+    clients.register("apify", apify_client)
+    return {"llm": fake_llms, "serper": session, "apify": apify_client}
@@ -0,0 +1,190 @@
+"""
+Provider health: rolling success rate and latency per endpoint, circuit breakers, and
+retries with jittered exponential backoff.
+
+When Apify or Serper is down, every scan used to pay the full failed attempt (a 30s
+timeout, a failed actor run) before falling back. Calls now go through here:
+
+    health.call("serper/shopping", post)            # retried on transient errors, recorded
+    with health.track("apify/amazon-search-scraper"):
+        ...                                         # recorded, never retried (e.g. a paid run)
+
+An endpoint whose last CIRCUIT_FAILURES calls all failed opens its circuit: for the next
+CIRCUIT_COOLDOWN_SECS every call fails at once with CircuitOpenError, so the scan goes
+straight to the other price source or the agent's fallback. After the cooldown one probe
+call is let through (half-open); success closes the circuit, failure re-opens it for twice
+as long (capped at MAX_COOLDOWN_SECS).
+
+Retries only cover transient errors (timeouts, dropped connections, 408/425/429/5xx) and
+never sleep past the scan's deadline (deadline.py). OpenAI calls are tracked but not retried
+here: the OpenAI SDK already retries them (LLM_MAX_RETRIES, clients.py).
+
+State is per process, like throttle.py. Settings (env): HEALTH_WINDOW, CIRCUIT_FAILURES,
+CIRCUIT_COOLDOWN_SECS, PROVIDER_RETRIES.
+"""
+import os
+import time
+import random
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+import telemetry
+import deadline
+
+WINDOW = int(os.getenv("HEALTH_WINDOW", "50"))                    # Recent calls kept per endpoint
+FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURES", "5"))      # Consecutive failures that open a circuit
+COOLDOWN_SECS = float(os.getenv("CIRCUIT_COOLDOWN_SECS", "30"))
+MAX_COOLDOWN_SECS = 300.0
+RETRIES = int(os.getenv("PROVIDER_RETRIES", "2"))                # Extra attempts after a transient error
+BACKOFF_BASE_SECS = 0.5
+BACKOFF_CAP_SECS = 8.0
+
+TRANSIENT_STATUS = {408, 425, 429, 500, 502, 503, 504}
+# Matched by class name so no SDK (requests, httpx, openai) has to be imported here
+TRANSIENT_ERRORS = {
+    "TimeoutError", "ConnectionError", "Timeout", "ReadTimeout", "ConnectTimeout", "TimeoutException",
+    "APITimeoutError", "APIConnectionError", "RateLimitError", "InternalServerError", "RemoteProtocolError",
+}
+
+class CircuitOpenError(RuntimeError):
+    """The endpoint's circuit is open; the call was not attempted."""
+
+class Abandoned(Exception):
+    """The caller gave up on the request (cancelled, out of budget). Says nothing about the provider."""
+
+class _Endpoint:
+    def __init__(self):
+        self.outcomes = deque(maxlen=WINDOW)  # (ok, seconds)
+        self.failures = 0                     # Consecutive
+        self.state = "closed"                 # closed | open | half_open
+        self.opened_at = 0.0
+        self.cooldown = COOLDOWN_SECS
+        self.probing = False
+        self.last_error = None
+
+_endpoints = {}
+_lock = threading.Lock()
+
+def _get(endpoint):
+    if endpoint not in _endpoints: _endpoints[endpoint] = _Endpoint()
+    return _endpoints[endpoint]
+
+def _provider(endpoint):
+    return endpoint.split("/")[0]
+
+def reset():
+    with _lock: _endpoints.clear()
+
+def check_abandoned(what):
+    """Raises Abandoned if the scan gave up on the caller (cancelled, out of budget): no paid call for a discarded result."""
+    if deadline.cancelled(): raise Abandoned(f"{what}: abandoned by the scan, call not made")
+
+def is_transient(error):
+    names = {cls.__name__ for cls in type(error).__mro__}
+    if names & TRANSIENT_ERRORS: return True
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    return status in TRANSIENT_STATUS
+
+def allow(endpoint):
+    """True if a call may go out now. In half-open state only one probe call is let through at a time."""
+    with _lock:
+        ep = _get(endpoint)
+        if ep.state == "closed": return True
+        if ep.state == "open":
+            if time.monotonic() - ep.opened_at < ep.cooldown: return False
+            ep.state = "half_open"
+        if ep.probing: return False
+        ep.probing = True
+        return True
+
+def record(endpoint, ok, seconds, error=None):
+    with _lock:
+        ep = _get(endpoint)
+        ep.outcomes.append((ok, seconds))
+        was = ep.state
+        ep.probing = False
+        if ok:
+            ep.failures = 0
+            ep.state, ep.cooldown = "closed", COOLDOWN_SECS
+        else:
+            ep.failures += 1
+            ep.last_error = str(error)[:200] if error is not None else None
+            if was == "half_open":
+                ep.cooldown = min(ep.cooldown * 2, MAX_COOLDOWN_SECS)
+            if was == "half_open" or ep.failures >= FAILURE_THRESHOLD:
+                ep.state, ep.opened_at = "open", time.monotonic()
+        now_state, failures, last_error = ep.state, ep.failures, ep.last_error
+        success_rate = sum(o for o, _ in ep.outcomes) / len(ep.outcomes)
+    telemetry.note_provider_result(endpoint, ok, seconds)
+    telemetry.set_gauge("provider_success_ratio", (("endpoint", endpoint),), success_rate)
+    telemetry.set_gauge("provider_circuit_open", (("endpoint", endpoint),), int(now_state != "closed"))
+    if now_state != was:
+        telemetry.note_circuit(endpoint, now_state)
+        if now_state == "open": print(f"🔌 {endpoint}: circuit open after {failures} failures ({last_error})")
+        elif now_state == "closed": print(f"🔌 {endpoint}: circuit closed, provider recovered")
+
+@contextmanager
+def track(endpoint):
+    """Records the block as one call to `endpoint`; raises CircuitOpenError instead if its circuit is open."""
+    if not allow(endpoint):
+        telemetry.note_circuit(endpoint, "skipped")
+        raise CircuitOpenError(f"{endpoint} circuit open (provider failing), skipped")
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException as e:
+        if isinstance(e, (Abandoned, GeneratorExit, KeyboardInterrupt)) or deadline.cancelled():
+            # Not the provider's fault: release a half-open probe without counting anything
+            with _lock: _get(endpoint).probing = False
+        else:
+            record(endpoint, False, time.perf_counter() - started, e)
+        raise
+    record(endpoint, True, time.perf_counter() - started)
+
+def backoff(attempt):
+    """Full-jitter exponential backoff: uniform(0, min(cap, base * 2^attempt))."""
+    return random.uniform(0, min(BACKOFF_CAP_SECS, BACKOFF_BASE_SECS * 2 ** attempt))
+
+def retry(fn, *args, provider=None, retries=None, **kwargs):
+    """Calls fn, retrying transient errors with jittered backoff while the scan's deadline allows."""
+    retries = RETRIES if retries is None else retries
+    for attempt in range(retries + 1):
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            if attempt == retries or not is_transient(e) or deadline.cancelled(): raise
+            pause = backoff(attempt)
+            left = deadline.remaining()
+            if left is not None and pause >= left: raise
+            telemetry.note_retry(provider)
+            print(f"🔁 {provider or 'provider'}: {e}; retry {attempt + 1}/{retries} in {pause:.1f}s")
+            time.sleep(pause)
+
+def call(endpoint, fn, *args, retries=None, **kwargs):
+    """track() + retry(): every attempt is recorded, and an open circuit stops the retries."""
+    def attempt():
+        with track(endpoint):
+            return fn(*args, **kwargs)
+    return retry(attempt, provider=_provider(endpoint), retries=retries)
+
+def snapshot():
+    """One row per endpoint seen so far, for the dashboard and benchmark report."""
+    now = time.monotonic()
+    rows = []
+    with _lock:
+        for endpoint, ep in sorted(_endpoints.items()):
+            if not ep.outcomes: continue
+            latencies = sorted(s for _, s in ep.outcomes)
+            rows.append({
+                "endpoint": endpoint,
+                "state": ep.state,
+                "success_rate": round(sum(o for o, _ in ep.outcomes) / len(ep.outcomes), 3),
+                "p50_s": round(latencies[len(latencies) // 2], 3),
+                "p95_s": round(latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)], 3),
+                "calls": len(ep.outcomes),
+                "consecutive_failures": ep.failures,
+                "retry_in_s": round(max(ep.cooldown - (now - ep.opened_at), 0), 1) if ep.state == "open" else None,
+                "last_error": ep.last_error,
+            })
+    return rows
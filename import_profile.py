@@ -0,0 +1,106 @@
+"""
+Import-time report: what each entry point costs to import, module by module.
+
+    python import_profile.py                       # default entry points
+    python import_profile.py pipeline --top 25
+    python import_profile.py --budget-ms 250 --forbid langchain --forbid langchain_openai
+
+Each target is imported in a fresh interpreter under `python -X importtime`, so results
+are cold-start numbers and unaffected by what this script itself imports. --budget-ms and
+--forbid turn the report into a check (exit 1) that a CI job can run to keep startup fast.
+"""
+import os
+import re
+import sys
+import json
+import argparse
+import subprocess
+
+# What the dashboard's first render and `batch.py --help` import before any scan starts
+DEFAULT_TARGETS = ["config", "telemetry", "cache", "batch", "pipeline"]
+
+LINE_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+def profile(target, python=None):
+    """Returns {'target', 'total_ms', 'modules': [{'module', 'self_ms', 'cumulative_ms', 'depth'}]}."""
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    proc = subprocess.run(
+        [python or sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        capture_output=True, text=True, env=env, cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {target} failed:\n{proc.stderr.strip().splitlines()[-1]}")
+
+    modules = []
+    for line in proc.stderr.splitlines():
+        m = LINE_RE.match(line)
+        if not m: continue
+        self_us, cum_us, indent, name = m.groups()
+        modules.append({
+            "module": name, "self_ms": int(self_us) / 1000, "cumulative_ms": int(cum_us) / 1000,
+            "depth": (len(indent) - 1) // 2,
+        })
+    # importtime prints children before their parent: keep only the target's own subtree,
+    # not interpreter startup (site, .pth hooks) that every process pays anyway
+    end = max((i for i, m in enumerate(modules) if m["module"] == target and m["depth"] == 0), default=len(modules) - 1)
+    start = end
+    while start > 0 and modules[start - 1]["depth"] > 0: start -= 1
+    modules = modules[start:end + 1]
+    return {
+        "target": target,
+        "total_ms": modules[-1]["cumulative_ms"] if modules else 0.0,
+        "modules": modules,
+    }
+
+def top_level_packages(modules):
+    """Self time rolled up per top-level package (numpy, requests, ...)."""
+    totals = {}
+    for m in modules:
+        package = m["module"].split(".")[0]
+        totals[package] = totals.get(package, 0) + m["self_ms"]
+    return sorted(totals.items(), key=lambda kv: -kv[1])
+
+def print_report(result, top=15):
+    print(f"\n📦 import {result['target']}: {result['total_ms']:.1f} ms ({len(result['modules'])} modules)")
+    print("   By package (self time):")
+    for package, ms in top_level_packages(result["modules"])[:top]:
+        print(f"     {ms:8.1f} ms  {package}")
+    print("   Slowest modules (cumulative):")
+    for m in sorted(result["modules"], key=lambda m: -m["cumulative_ms"])[:top]:
+        print(f"     {m['cumulative_ms']:8.1f} ms  {m['module']}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Per-module import cost of the app's entry points.")
+    parser.add_argument("targets", nargs="*", default=DEFAULT_TARGETS, help="Modules to import (default: startup path)")
+    parser.add_argument("--top", type=int, default=15, help="Rows per table")
+    parser.add_argument("--budget-ms", type=float, default=None, help="Fail if any target takes longer to import")
+    parser.add_argument("--forbid", action="append", default=[], metavar="PACKAGE",
+                        help="Fail if a target pulls in this package at import time (repeatable)")
+    parser.add_argument("--json", metavar="PATH", help="Also write the raw per-module timings as JSON")
+    args = parser.parse_args(argv)
+
+    results, failures = [], []
+    for target in args.targets:
+        try:
+            result = profile(target)
+        except RuntimeError as e:
+            failures.append(str(e))
+            continue
+        results.append(result)
+        print_report(result, args.top)
+
+        if args.budget_ms is not None and result["total_ms"] > args.budget_ms:
+            failures.append(f"import {target} took {result['total_ms']:.1f} ms (budget {args.budget_ms:.0f} ms)")
+        loaded = {m["module"].split(".")[0] for m in result["modules"]}
+        for package in args.forbid:
+            if package in loaded:
+                failures.append(f"import {target} pulls in '{package}' at import time")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f: json.dump(results, f, indent=2)
+    for failure in failures:
+        print(f"❌ {failure}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
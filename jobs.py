@@ -0,0 +1,319 @@
+"""
+Scan job queue (SQLite) + a pool of worker processes.
+
+A scan run inline in the Streamlit script thread dies with the page: a browser refresh
+halfway through throws away calls that were already paid for, and a long scan holds a
+server thread the whole time. Instead the dashboard submits a job and polls it; worker
+processes run the pipeline and store the finished record through results.py, so a
+closed tab still ends with a stored verdict that the next visit opens instantly.
+
+    python jobs.py worker --processes 4          # start the pool (Ctrl+C to stop)
+    python jobs.py submit "Smart Ring" UK
+    python jobs.py status <job id>
+
+Jobs report per-agent progress as events ("start"/"done" per pipeline node). A job whose
+worker stops heartbeating (crash, kill) is put back in the queue, up to MAX_ATTEMPTS.
+Note: throttle.py limits are per process, so size MAX_CONCURRENT_* for one worker.
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import sqlite3
+import argparse
+import threading
+
+import config  # loads .env once, before the modules below read their settings
+import product_keys
+
+STORE_PATH = os.getenv("JOBS_PATH", os.path.join(".cache", "jobs.sqlite"))
+POLL_SECS = 1.0
+HEARTBEAT_SECS = 5.0
+LEASE_SECS = 30.0  # No heartbeat for this long: the worker is gone
+MAX_ATTEMPTS = 2
+KEEP_SECS = 7 * 24 * 3600  # Finished jobs (and their events) are pruned after this
+
+ACTIVE = ("queued", "running")
+
+_local = threading.local()
+
+def _connect():
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        folder = os.path.dirname(STORE_PATH)
+        if folder: os.makedirs(folder, exist_ok=True)
+        conn = sqlite3.connect(STORE_PATH, timeout=10, isolation_level=None)  # explicit transactions below
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                product TEXT NOT NULL,
+                product_key TEXT NOT NULL,
+                country TEXT NOT NULL,
+                status TEXT NOT NULL,
+                submitted_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL,
+                heartbeat_at REAL,
+                worker TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                result_key TEXT,
+                error TEXT,
+                force_refresh INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        # Files created before forced refreshes get the column added in place
+        if "force_refresh" not in {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}:
+            conn.execute("ALTER TABLE jobs ADD COLUMN force_refresh INTEGER NOT NULL DEFAULT 0")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, submitted_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_product ON jobs(product_key, country, status)")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS events (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                job_id TEXT NOT NULL,
+                at REAL NOT NULL,
+                agent TEXT NOT NULL,
+                phase TEXT NOT NULL,
+                summary TEXT
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_events_job ON events(job_id, seq)")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS workers (
+                id TEXT PRIMARY KEY,
+                pid INTEGER,
+                started_at REAL NOT NULL,
+                heartbeat_at REAL NOT NULL,
+                current_job TEXT
+            )
+        """)
+        _local.conn = conn
+    return conn
+
+_JOB_COLS = ("id", "product", "product_key", "country", "status", "submitted_at", "started_at", "finished_at",
+             "heartbeat_at", "worker", "attempts", "result_key", "error", "force_refresh")
+
+def _job(row):
+    return dict(zip(_JOB_COLS, row)) if row else None
+
+# --- Client side (dashboard, CLI) ---
+
+def submit(product, country, force_refresh=False):
+    """
+    Queues a scan and returns its job id. If the same (canonical product, market) is already
+    queued or running (e.g. the page was reloaded mid-scan), that job's id is returned instead.
+    force_refresh=True (the dashboard's Refresh) skips the response cache and only joins another forced job.
+    """
+    product = product_keys.resolve(product)
+    key, country = product_keys.canonical_key(product), country.upper()
+    conn = _connect()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        row = conn.execute(
+            "SELECT id FROM jobs WHERE product_key = ? AND country = ? AND status IN (?, ?) AND force_refresh >= ? "
+            "ORDER BY submitted_at LIMIT 1",
+            (key, country, *ACTIVE, int(force_refresh))
+        ).fetchone()
+        if row:
+            conn.execute("COMMIT")
+            return row[0]
+        job_id = uuid.uuid4().hex[:12]
+        conn.execute(
+            "INSERT INTO jobs (id, product, product_key, country, status, submitted_at, force_refresh) "
+            "VALUES (?, ?, ?, ?, 'queued', ?, ?)",
+            (job_id, product, key, country, time.time(), int(force_refresh))
+        )
+        conn.execute("COMMIT")
+        return job_id
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+
+def get(job_id):
+    return _job(_connect().execute(f"SELECT {', '.join(_JOB_COLS)} FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+def events(job_id, after_seq=0):
+    """Progress events in order: [{seq, at, agent, phase ('start' | 'done'), summary}]."""
+    rows = _connect().execute(
+        "SELECT seq, at, agent, phase, summary FROM events WHERE job_id = ? AND seq > ? ORDER BY seq", (job_id, after_seq)
+    ).fetchall()
+    return [{"seq": s, "at": at, "agent": agent, "phase": phase, "summary": summary} for s, at, agent, phase, summary in rows]
+
+def queue_position(job_id):
+    job = get(job_id)
+    if not job or job["status"] != "queued": return 0
+    return _connect().execute(
+        "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND submitted_at <= ?", (job["submitted_at"],)
+    ).fetchone()[0]
+
+def workers_alive(now=None):
+    """Number of workers that heartbeated recently (0: run scans inline instead)."""
+    return _connect().execute(
+        "SELECT COUNT(*) FROM workers WHERE heartbeat_at >= ?", ((now or time.time()) - LEASE_SECS,)
+    ).fetchone()[0]
+
+# --- Worker side ---
+
+def summarize(name, result):
+    """One-line progress text per pipeline node (what the inline dashboard prints as each agent lands)."""
+    if not isinstance(result, dict): return None
+    if name == "guardrails": return f"Target range {result.get('min_price')} - {result.get('max_price')}"
+    if name == "competitor_data": return f"{len(result.get('products', []))} listings via {result.get('source')}"
+    if name == "tax_info": return f"Tax slab {int(float(result.get('rate', 0.18)) * 100)}% ({result.get('reason', 'Standard')})"
+    if name == "verdict": return f"{result.get('verdict_tag')} · {result.get('final_score')}/10"
+    return None
+
+def _event(job_id, agent, phase, summary=None):
+    _connect().execute(
+        "INSERT INTO events (job_id, at, agent, phase, summary) VALUES (?, ?, ?, ?, ?)",
+        (job_id, time.time(), agent, phase, summary)
+    )
+
+def _beat(worker_id, job_id=None):
+    now = time.time()
+    conn = _connect()
+    conn.execute("UPDATE workers SET heartbeat_at = ?, current_job = ? WHERE id = ?", (now, job_id, worker_id))
+    if job_id: conn.execute("UPDATE jobs SET heartbeat_at = ? WHERE id = ?", (now, job_id))
+
+def requeue_stale(now=None):
+    """Running jobs whose worker stopped heartbeating go back to the queue (or fail after MAX_ATTEMPTS)."""
+    cutoff = (now or time.time()) - LEASE_SECS
+    conn = _connect()
+    conn.execute(
+        "UPDATE jobs SET status = 'error', finished_at = ?, error = 'Worker lost (gave up after retries)' "
+        "WHERE status = 'running' AND heartbeat_at < ? AND attempts >= ?", (time.time(), cutoff, MAX_ATTEMPTS)
+    )
+    conn.execute(
+        "UPDATE jobs SET status = 'queued', worker = NULL WHERE status = 'running' AND heartbeat_at < ?", (cutoff,)
+    )
+
+def claim(worker_id):
+    """Atomically takes the oldest queued job (or returns None)."""
+    conn = _connect()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        row = conn.execute("SELECT id FROM jobs WHERE status = 'queued' ORDER BY submitted_at LIMIT 1").fetchone()
+        if row is None:
+            conn.execute("COMMIT")
+            return None
+        now = time.time()
+        conn.execute(
+            "UPDATE jobs SET status = 'running', worker = ?, started_at = ?, heartbeat_at = ?, attempts = attempts + 1 WHERE id = ?",
+            (worker_id, now, now, row[0])
+        )
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    return get(row[0])
+
+def run_job(job, worker_id):
+    import results
+    import telemetry
+    from pipeline import run_scan
+
+    stop = threading.Event()
+    def heartbeat():
+        while not stop.wait(HEARTBEAT_SECS): _beat(worker_id, job["id"])
+    threading.Thread(target=heartbeat, daemon=True).start()
+
+    status, result_key, error = "done", None, None
+    try:
+        cfg = config.get_country_config(job["country"])
+        if cfg is None: raise ValueError(f"Unknown market '{job['country']}'")
+        with telemetry.scan(job["product"], cfg["country_full"]) as trace:
+            scan = run_scan(
+                job["product"], cfg, force_refresh=bool(job["force_refresh"]),
+                on_start=lambda name: _event(job["id"], name, "start"),
+                on_done=lambda name, result: _event(job["id"], name, "done", summarize(name, result)),
+            )
+        record = results.save({}, results.make_record(job["product"], job["country"], scan, scan["verdict"], trace.to_dict()))
+        result_key = record["key"]
+    except Exception as e:
+        status, error = "error", str(e)
+    finally:
+        stop.set()
+
+    _connect().execute(
+        "UPDATE jobs SET status = ?, finished_at = ?, result_key = ?, error = ? WHERE id = ?",
+        (status, time.time(), result_key, error, job["id"])
+    )
+    return status
+
+def prune(now=None):
+    cutoff = (now or time.time()) - KEEP_SECS
+    conn = _connect()
+    conn.execute("DELETE FROM events WHERE job_id IN (SELECT id FROM jobs WHERE finished_at < ?)", (cutoff,))
+    conn.execute("DELETE FROM jobs WHERE finished_at < ?", (cutoff,))
+    conn.execute("DELETE FROM workers WHERE heartbeat_at < ?", (cutoff,))
+
+def work_loop(worker_id=None, max_jobs=None):
+    """One worker process: claim, run, repeat. max_jobs is for tests/benchmarks."""
+    worker_id = worker_id or f"{os.uname().nodename}-{os.getpid()}"
+    conn = _connect()
+    now = time.time()
+    conn.execute("INSERT OR REPLACE INTO workers VALUES (?, ?, ?, ?, NULL)", (worker_id, os.getpid(), now, now))
+    done = 0
+    last_beat = 0.0
+    try:
+        while max_jobs is None or done < max_jobs:
+            if time.time() - last_beat >= HEARTBEAT_SECS:
+                _beat(worker_id)
+                requeue_stale()
+                last_beat = time.time()
+            job = claim(worker_id)
+            if job is None:
+                time.sleep(POLL_SECS)
+                continue
+            status = run_job(job, worker_id)
+            print(f"{'✅' if status == 'done' else '❌'} [{worker_id}] {job['product']} · {job['country']}")
+            _beat(worker_id)
+            done += 1
+    finally:
+        conn.execute("DELETE FROM workers WHERE id = ?", (worker_id,))
+
+def run_pool(processes):
+    """Starts `processes` worker processes and waits for them (Ctrl+C stops all)."""
+    import multiprocessing
+    # spawn: the pipeline is thread-heavy, and forked copies of locks/connections are not safe
+    ctx = multiprocessing.get_context("spawn")
+    prune()
+    procs = [ctx.Process(target=work_loop, name=f"scan-worker-{i}") for i in range(processes)]
+    for p in procs: p.start()
+    print(f"👷 {processes} scan workers running (queue: {STORE_PATH})")
+    try:
+        for p in procs: p.join()
+    except KeyboardInterrupt:
+        for p in procs: p.terminate()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scan job queue and worker pool.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    worker = sub.add_parser("worker", help="Run a pool of worker processes")
+    worker.add_argument("--processes", type=int, default=2, help="Worker processes (scans in parallel)")
+    submit_cmd = sub.add_parser("submit", help="Queue a scan")
+    submit_cmd.add_argument("product")
+    submit_cmd.add_argument("country", help="Market code from config.MARKETS, e.g. UK")
+    submit_cmd.add_argument("--refresh", action="store_true", help="Skip cached responses and stored prices")
+    status_cmd = sub.add_parser("status", help="Show a job and its progress events")
+    status_cmd.add_argument("job_id")
+    args = parser.parse_args(argv)
+
+    if args.command == "worker":
+        run_pool(args.processes)
+    elif args.command == "submit":
+        if config.get_country_config(args.country) is None: parser.error(f"Unknown market '{args.country}'")
+        print(submit(args.product, args.country, force_refresh=args.refresh))
+    else:
+        job = get(args.job_id)
+        if job is None:
+            print(f"Unknown job '{args.job_id}'")
+            return 1
+        print(json.dumps(job, indent=1))
+        for e in events(args.job_id):
+            print(f"  {e['phase']:>5} {e['agent']}" + (f" · {e['summary']}" if e["summary"] else ""))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
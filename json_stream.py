@@ -0,0 +1,109 @@
+"""
+Incremental JSON parser for streamed LLM output.
+
+Feed it token chunks as they arrive; it reports every object member that has fully
+closed, down to max_depth, e.g. ("verdict_tag",) as soon as its closing quote lands
+or ("breakdown", "demand") once that pillar's closing brace arrives. Anything before
+the first '{' (like a ```json fence) is ignored.
+"""
+import json
+
+class _Frame:
+    __slots__ = ("kind", "path", "key", "state", "key_start", "value_start", "scalar")
+
+    def __init__(self, kind, path):
+        self.kind = kind        # 'obj' or 'arr'
+        self.path = path        # path of this container from the root
+        self.key = None
+        self.state = "key" if kind == "obj" else "value"
+        self.key_start = None
+        self.value_start = None
+        self.scalar = False     # current value is a number / true / false / null
+
+class IncrementalJSONParser:
+    def __init__(self, max_depth=2):
+        self.max_depth = max_depth
+        self.buf = ""
+        self.pos = 0
+        self.stack = []
+        self.in_string = False
+        self.escape = False
+        self.string_role = None
+        self.done = False
+        self.result = None
+
+    def feed(self, chunk):
+        """Consumes a chunk and returns a list of (path, value) for members that just closed."""
+        self.buf += chunk
+        events = []
+        while self.pos < len(self.buf) and not self.done:
+            self._step(self.buf[self.pos], events)
+            self.pos += 1
+        return events
+
+    # --- internals ---
+
+    def _emit(self, frame, end, events):
+        start, frame.value_start, frame.scalar = frame.value_start, None, False
+        frame.state = "after"
+        if frame.kind != "obj": return
+        path = frame.path + (frame.key,)
+        if len(path) > self.max_depth: return
+        try:
+            events.append((path, json.loads(self.buf[start:end])))
+        except ValueError:
+            pass
+
+    def _step(self, c, events):
+        if self.in_string:
+            if self.escape: self.escape = False
+            elif c == "\\": self.escape = True
+            elif c == '"':
+                self.in_string = False
+                frame = self.stack[-1]
+                if self.string_role == "key":
+                    frame.key = json.loads(self.buf[frame.key_start:self.pos + 1])
+                    frame.state = "colon"
+                else:
+                    self._emit(frame, self.pos + 1, events)
+            return
+
+        if not self.stack:
+            if c == "{": self.stack.append(_Frame("obj", ()))
+            return
+
+        frame = self.stack[-1]
+
+        # A pending number/literal ends at the next delimiter
+        if frame.scalar and (c in ",}]" or c.isspace()):
+            self._emit(frame, self.pos, events)
+
+        if c.isspace(): return
+
+        if c == '"':
+            self.in_string = True
+            if frame.kind == "obj" and frame.state == "key":
+                frame.key_start = self.pos
+                self.string_role = "key"
+            else:
+                frame.value_start = self.pos
+                self.string_role = "value"
+        elif c == ":" and frame.state == "colon":
+            frame.state = "value"
+        elif c == ",":
+            frame.state = "key" if frame.kind == "obj" else "value"
+        elif c in "{[":
+            frame.value_start = self.pos
+            path = frame.path + ((frame.key,) if frame.kind == "obj" else ("[]",))
+            self.stack.append(_Frame("obj" if c == "{" else "arr", path))
+        elif c in "}]":
+            self.stack.pop()
+            if not self.stack:
+                self.done = True
+                try: self.result = json.loads(self.buf[self.buf.index("{"):self.pos + 1])
+                except ValueError: self.result = None
+                return
+            self._emit(self.stack[-1], self.pos + 1, events)
+        elif frame.state == "value" and frame.value_start is None:
+            frame.value_start = self.pos
+            frame.scalar = True
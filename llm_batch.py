@@ -0,0 +1,82 @@
+"""
+Many small LLM classifications in one call.
+
+Guardrails and tax lookups each return a tiny JSON object, so for batch work the
+per-call overhead (instructions, examples, round-trip) dwarfs the answer. run() packs
+items into one prompt under short per-item IDs, expects a JSON object keyed by those
+IDs back, validates each entry on its own and re-asks only for the entries that were
+missing or malformed.
+
+    answers = llm_batch.run(llm, {"1": {...}, "2": {...}}, build_prompt, validate)
+    # -> {"1": <validated>, ...}; ids that never validated are simply absent
+"""
+import os
+import json
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+import throttle
+import health
+import clients
+import telemetry
+
+MAX_BATCH = int(os.getenv("LLM_BATCH_SIZE", "25"))
+MAX_ROUNDS = 3        # First pass + up to 2 retries of the failed items only
+CONCURRENT_CHUNKS = 4
+
+def parse_object(text):
+    """The model's reply as a dict ({} if it is not a JSON object)."""
+    text = str(text or "").replace("```json", "").replace("```", "").strip()
+    start, end = text.find("{"), text.rfind("}")
+    if start == -1 or end <= start: return {}
+    try:
+        value = json.loads(text[start:end + 1])
+    except ValueError:
+        return {}
+    return value if isinstance(value, dict) else {}
+
+def _model_name(llm):
+    return getattr(llm, "model_name", None) or getattr(llm, "model", "unknown")
+
+def _ask(llm, chunk, build_prompt, validate):
+    prompt = build_prompt(chunk)
+    estimate = throttle.estimate_tokens(prompt, completion=40 * len(chunk))
+    with throttle.slot("openai", tokens=estimate), health.track(f"openai/{_model_name(llm)}"):
+        res = llm.invoke(prompt, **clients.llm_call_kwargs())
+    usage = getattr(res, "usage_metadata", None)
+    throttle.settle_tokens("openai", estimate, usage)
+    telemetry.note_llm_usage(_model_name(llm), usage)
+
+    answers = parse_object(res.content)
+    good = {}
+    for item_id, item in chunk.items():
+        try:
+            value = validate(answers.get(item_id), item)
+        except (TypeError, ValueError, KeyError):
+            value = None
+        if value is not None: good[item_id] = value
+    return good
+
+def run(llm, items, build_prompt, validate, max_batch=None, max_rounds=MAX_ROUNDS):
+    """
+    items: {id: item}. build_prompt(chunk) renders one prompt for a {id: item} chunk.
+    validate(raw_answer, item) returns the cleaned value or None (raising counts as None).
+    Chunks of a round run concurrently (still subject to throttle.py limits).
+    """
+    max_batch = max_batch or MAX_BATCH
+    results = {}
+    pending = dict(items)
+    for round_no in range(max_rounds):
+        if not pending: break
+        if round_no: telemetry.note_retry("openai")
+        ids = list(pending)
+        chunks = [{i: pending[i] for i in ids[n:n + max_batch]} for n in range(0, len(ids), max_batch)]
+        with ThreadPoolExecutor(max_workers=min(CONCURRENT_CHUNKS, len(chunks))) as pool:
+            futures = [pool.submit(contextvars.copy_context().run, _ask, llm, chunk, build_prompt, validate) for chunk in chunks]
+            for fut in futures:
+                try:
+                    results.update(fut.result())
+                except Exception as e:
+                    print(f"⚠️ Batch LLM chunk failed: {e}")
+        pending = {i: item for i, item in pending.items() if i not in results}
+    return results
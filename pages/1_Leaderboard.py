@@ -0,0 +1,89 @@
+import io
+import time
+import traceback
+import streamlit as st
+
+# LEADERBOARD: every idea ever scanned (dashboard, workers, watchlist, batch), ranked from warehouse.py
+st.set_page_config(page_title="Leaderboard · AI Market Analyst", page_icon="🏆", layout="wide")
+
+try:
+    from config import list_markets
+    import warehouse
+    from datetime import datetime
+
+    st.title("🏆 Leaderboard")
+    st.markdown("### Every evaluated idea, ranked by viability")
+
+    with st.sidebar:
+        st.header("🔎 Filters")
+        markets = st.multiselect("Markets", list_markets(), placeholder="All markets")
+        min_margin = st.slider("Minimum net margin %", -50, 60, -50, help="-50 = no margin filter")
+        min_score = st.slider("Minimum viability score", 0.0, 10.0, 0.0, 0.5)
+        max_loss = st.slider("Maximum chance of a loss %", 0, 100, 100)
+        top_n = st.number_input("Show top", min_value=10, max_value=1000, value=50, step=10)
+
+    min_margin = min_margin if min_margin > -50 else None
+    filters = dict(
+        country=markets or None, min_margin=min_margin,
+        min_score=min_score or None, max_loss_chance=max_loss if max_loss < 100 else None,
+    )
+    started = time.perf_counter()
+    rows = warehouse.top(int(top_n), **filters)
+    matching = warehouse.count(**filters)
+    summary = warehouse.market_summary(min_margin=min_margin)
+    query_ms = (time.perf_counter() - started) * 1000
+
+    if not matching and not summary:
+        st.info("No scans stored yet. Run a Deep Scan (or `python batch.py ideas.csv out.jsonl`), "
+                "or load older scans with `python warehouse.py backfill`.")
+        st.stop()
+
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Matching ideas", f"{matching:,}")
+    c2.metric("Best score", f"{rows[0]['final_score']}/10" if rows else "-")
+    c3.metric("Markets", len(summary))
+    st.caption(f"⚡ Queried in {query_ms:.1f} ms · newest scan of each product and market")
+
+    import pandas as pd
+    board = pd.DataFrame(rows)
+    if not board.empty:
+        board.insert(0, "rank", range(1, len(board) + 1))
+        board["scanned_at"] = board["scanned_at"].map(lambda t: datetime.fromtimestamp(t).strftime("%d %b %Y %H:%M"))
+        st.dataframe(
+            board, hide_index=True, use_container_width=True,
+            column_config={
+                "final_score": st.column_config.ProgressColumn("Score", min_value=0, max_value=10, format="%.1f"),
+                "confidence_score": st.column_config.NumberColumn("Confidence", format="%d%%"),
+                "net_margin_pct": st.column_config.NumberColumn("Net margin", format="%.0f%%"),
+                "loss_chance_pct": st.column_config.NumberColumn("Loss chance", format="%.0f%%"),
+            },
+        )
+    else:
+        st.warning("No ideas match these filters.")
+
+    st.subheader("🌍 Per-Market Summary")
+    if summary:
+        import altair as alt
+        summary_df = pd.DataFrame(summary)
+        st.dataframe(summary_df, hide_index=True, use_container_width=True)
+        chart = alt.Chart(summary_df).mark_bar().encode(
+            x=alt.X("country:N", sort="-y", title=None), y=alt.Y("avg_score:Q", title="Average score"),
+            color=alt.Color("avg_margin_pct:Q", title="Avg margin %", scale=alt.Scale(scheme="redyellowgreen")),
+            tooltip=["country", "ideas", "avg_score", "best_score", "avg_margin_pct", "avg_loss_chance_pct", "strong_ideas"],
+        )
+        st.altair_chart(chart, use_container_width=True)
+
+    with st.expander("📦 Export"):
+        st.caption(f"Every warehouse column ({len(warehouse.COLUMNS)}) for each idea's newest scan, as Parquet.")
+        if st.button("Prepare Parquet export"):
+            buffer = io.BytesIO()
+            try:
+                exported = warehouse.export_parquet(buffer)
+                st.download_button(f"⬇️ Download verdicts.parquet ({exported:,} rows)", buffer.getvalue(),
+                                   file_name="verdicts.parquet", mime="application/octet-stream")
+            except ImportError:
+                st.error("Parquet export needs pyarrow: `pip install pyarrow`")
+
+except Exception as e:
+    st.error("🚨 LEADERBOARD CRASHED")
+    st.code(traceback.format_exc())
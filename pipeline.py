@@ -0,0 +1,287 @@
+import os
+import time
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import config  # loads .env once, before the modules below read their settings
+from agents import analyze_market_trends, lookup_tax_rate, tax_fallback, NO_TREND_DATA
+from scraper import get_price_data, estimate_from_guardrails
+from sourcing_agent import get_wholesale_cost, NO_SOURCING_DATA
+from brain import calculate_viability_score, get_empty_verdict, SYNTHESIS_TIMEOUT
+from validator import get_market_guardrails, FALLBACK_GUARDRAILS
+import cache
+import telemetry
+import deadline
+import singleflight
+import tax_rules
+import product_keys
+from config import get_country_config
+from economics import scalar_waterfall, normalize_tax_rate, scan_profit_risk
+
+# End-to-end budget per scan and per agent (seconds). The critical path
+# guardrails -> competitor_data -> verdict fits inside the scan budget.
+SCAN_BUDGET_SECS = float(os.getenv("SCAN_BUDGET_SECS", "90"))
+AGENT_BUDGETS = {
+    "guardrails": 15, "market_data": 25, "sourcing_data": 25, "tax_info": 20,
+    "competitor_data": 45, "verdict": 30,
+}
+
+def agent_fallbacks(config):
+    """Stand-ins for agents that overrun or fail: the same values the agents fall back to themselves."""
+    return {
+        "guardrails": lambda: dict(FALLBACK_GUARDRAILS),
+        "market_data": lambda: NO_TREND_DATA,
+        "sourcing_data": lambda: NO_SOURCING_DATA,
+        "tax_info": lambda **_: tax_fallback(config),
+        "competitor_data": lambda guardrails: estimate_from_guardrails(guardrails),
+        "verdict": lambda **_: get_empty_verdict(SYNTHESIS_TIMEOUT),
+    }
+
+def degrade_plan(graph, config_for):
+    """(budgets, fallbacks) for run_graph. Node names may be namespaced ("UK/tax_info", "sourcing/Alibaba")."""
+    budgets, fallbacks = {}, {}
+    for name in graph:
+        agent = "sourcing_data" if name.startswith("sourcing/") else name.split("/")[-1]
+        if agent not in AGENT_BUDGETS: continue
+        budgets[name] = AGENT_BUDGETS[agent]
+        fallback = agent_fallbacks(config_for(name))[agent]
+        fallbacks[name] = lambda fallback=fallback, **deps: fallback(**{k.split("/")[-1]: v for k, v in deps.items()})
+    return budgets, fallbacks
+
+def verdict_deadline(scan_started, budget_secs=None):
+    """
+    Monotonic time by which a verdict streamed after run_scan(include_verdict=False) must finish:
+    its own budget, never past the scan's (scan_started = time.monotonic() before run_scan).
+    """
+    budget_secs = SCAN_BUDGET_SECS if budget_secs is None else budget_secs
+    limits = [time.monotonic() + AGENT_BUDGETS["verdict"]]
+    if budget_secs: limits.append(scan_started + budget_secs)
+    return min(limits)
+
+def _run_node(fn, kwargs, node_deadline, cancel):
+    with deadline.scope(at=node_deadline, cancel=cancel):
+        return fn(**kwargs)
+
+def run_graph(nodes, on_start=None, on_done=None, max_workers=None, budget_secs=None, budgets=None, fallbacks=None):
+    """
+    Runs a dict of { name: (fn, [dependency names]) } on a thread pool.
+    Every node starts as soon as its dependencies have finished and receives
+    their results as keyword arguments.
+
+    on_start / on_done are called from the *calling* thread (never from a worker),
+    so it is safe to draw Streamlit widgets from them.
+
+    Deadlines: with budget_secs the whole graph must finish within that many seconds, and each
+    node gets at most budgets[name] of it (deadline.py carries the limit down to every network call).
+    A node that overruns or raises is abandoned and fallbacks[name](**same kwargs) stands in;
+    without a fallback it raises as before. Abandoned nodes are listed in results['degraded'].
+    """
+    budgets, fallbacks = budgets or {}, fallbacks or {}
+    graph_deadline = time.monotonic() + budget_secs if budget_secs else None
+    results = {}
+    degraded = []
+    pending = dict(nodes)
+    running = {}  # future -> (name, kwargs, node deadline, cancel event)
+
+    def give_up(name, kwargs, reason):
+        if name not in fallbacks: raise reason
+        print(f"⏱️ {name}: {reason or type(reason).__name__}; using its fallback")
+        degraded.append(name)
+        return fallbacks[name](**kwargs)
+
+    pool = ThreadPoolExecutor(max_workers=max_workers or len(nodes) or 1)
+    try:
+        while pending or running:
+            # 1. Launch everything whose inputs are ready
+            for name, (fn, deps) in list(pending.items()):
+                if all(d in results for d in deps):
+                    del pending[name]
+                    if on_start: on_start(name)
+                    kwargs = {d: results[d] for d in deps}
+                    node_deadline = graph_deadline
+                    if name in budgets:
+                        node_deadline = min(filter(None, [graph_deadline, time.monotonic() + budgets[name]]))
+                    cancel = threading.Event()
+                    # copy_context: the worker inherits the caller's telemetry trace
+                    ctx = contextvars.copy_context()
+                    running[pool.submit(ctx.run, _run_node, fn, kwargs, node_deadline, cancel)] = (name, kwargs, node_deadline, cancel)
+
+            if not running:
+                raise ValueError(f"Unresolvable dependencies for: {sorted(pending)}")
+
+            # 2. Block until the next agent lands (or the earliest deadline passes), then loop to unlock its dependents
+            limits = [d for _, _, d, _ in running.values() if d is not None]
+            timeout = max(min(limits) - time.monotonic(), 0) if limits else None
+            done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+            now = time.monotonic()
+            for fut in list(running):
+                name, kwargs, node_deadline, cancel = running[fut]
+                if fut in done:
+                    del running[fut]
+                    try:
+                        results[name] = fut.result()
+                    except Exception as e:
+                        results[name] = give_up(name, kwargs, e)
+                elif node_deadline is not None and now >= node_deadline:
+                    # Overran: stop waiting, tell it to stop (Apify runs abort), and carry on with the fallback
+                    del running[fut]
+                    cancel.set()
+                    results[name] = give_up(name, kwargs, TimeoutError("ran out of its time budget"))
+                else:
+                    continue
+                if on_done: on_done(name, results[name])
+    finally:
+        # Never block on abandoned agents; their own request timeouts end them
+        pool.shutdown(wait=False)
+
+    if degraded: results['degraded'] = degraded
+    return results
+
+def build_scan_graph(product_name, config, include_verdict=True):
+    # Only the competitive scan needs the guardrails; synthesis needs everything.
+    graph = {
+        "guardrails": (lambda: get_market_guardrails(product_name, config), []),
+        "market_data": (lambda: analyze_market_trends(product_name, config), []),
+        "sourcing_data": (lambda: get_wholesale_cost(product_name, config), []),
+        "tax_info": (lambda: lookup_tax_rate(product_name, config), []),
+        "competitor_data": (
+            lambda guardrails: get_price_data(product_name, config, guardrails),
+            ["guardrails"]
+        ),
+    }
+    if include_verdict:
+        graph["verdict"] = (
+            lambda market_data, competitor_data, sourcing_data, tax_info: calculate_viability_score(
+                product_name, config, market_data, competitor_data, sourcing_data, tax_info
+            ),
+            ["market_data", "competitor_data", "sourcing_data", "tax_info"]
+        )
+    return graph
+
+def run_scan(product_name, config, on_start=None, on_done=None, include_verdict=True, budget_secs=None, force_refresh=False):
+    """
+    Full Deep Scan. Returns a dict with every agent output plus the 'verdict'.
+    include_verdict=False stops after the data agents (the dashboard streams Agent 5 itself).
+    budget_secs (default SCAN_BUDGET_SECS, 0 = unbounded) caps the whole scan; agents that overrun
+    their share are replaced by their fallbacks and named in results['degraded'].
+    force_refresh skips every cached response and stored price (cache.refreshing), e.g. the dashboard's Refresh.
+    """
+    # "smart rings" / "Smart-Ring 2024" reuse everything cached for "Smart Ring"
+    product_name = product_keys.resolve(product_name)
+    graph = build_scan_graph(product_name, config, include_verdict)
+    # An identical scan already running (another session) is awaited instead of re-run
+    key = ("scan", product_keys.canonical_key(product_name), config['country_full'], include_verdict, force_refresh)
+    budgets, fallbacks = degrade_plan(graph, lambda name: config)
+    budget_secs = SCAN_BUDGET_SECS if budget_secs is None else budget_secs
+    with telemetry.scan(product_name, config['country_full']), cache.refreshing(force_refresh):
+        results, shared = singleflight.do_shared(key, lambda: run_graph(
+            graph, on_start=on_start, on_done=on_done, budget_secs=budget_secs, budgets=budgets, fallbacks=fallbacks
+        ))
+    if shared:
+        # The leader's callbacks drew *its* page; replay them so this caller's UI fills in too
+        for name in graph:
+            if on_start: on_start(name)
+            if on_done: on_done(name, results[name])
+    return results
+
+# --- Multi-market comparison ---
+
+def _node(fn, **deps):
+    """Graph node whose inputs have namespaced names: _node(f, guardrails="UK/guardrails") calls f(guardrails=...)."""
+    return (lambda **results: fn(**{arg: results[name] for arg, name in deps.items()}), list(deps.values()))
+
+def build_comparison_graph(product_name, market_codes, include_verdict=True):
+    """
+    One graph for N markets. Country-independent work runs once: the tax category, and one
+    sourcing search per hub (every Alibaba market shares it). Per-market agents are namespaced
+    "<CODE>/<agent>" and all fan out on the same pool.
+    """
+    configs = {}
+    for code in market_codes:
+        config = get_country_config(code)
+        if config is None: raise ValueError(f"Unknown market '{code}'")
+        configs[config['code']] = config
+
+    graph = {"category": (lambda: tax_rules.categorize(product_name), [])}
+    for config in configs.values():
+        hub = f"sourcing/{config['sourcing_hub']}"
+        if hub not in graph: graph[hub] = (lambda config=config: get_wholesale_cost(product_name, config), [])
+
+    for code, config in configs.items():
+        graph[f"{code}/guardrails"] = (lambda config=config: get_market_guardrails(product_name, config), [])
+        graph[f"{code}/market_data"] = (lambda config=config: analyze_market_trends(product_name, config), [])
+        graph[f"{code}/tax_info"] = _node(
+            lambda category, config=config: lookup_tax_rate(product_name, config, category), category="category"
+        )
+        graph[f"{code}/competitor_data"] = _node(
+            lambda guardrails, config=config: get_price_data(product_name, config, guardrails), guardrails=f"{code}/guardrails"
+        )
+        if include_verdict:
+            graph[f"{code}/verdict"] = _node(
+                lambda config=config, **data: calculate_viability_score(product_name, config, **data),
+                market_data=f"{code}/market_data", competitor_data=f"{code}/competitor_data",
+                sourcing_data=f"sourcing/{config['sourcing_hub']}", tax_info=f"{code}/tax_info",
+            )
+    return graph, configs
+
+def comparison_matrix(markets):
+    """Side-by-side rows (best score, then best margin, first) from run_comparison()['markets']."""
+    rows = []
+    for code, m in markets.items():
+        config, verdict = m['config'], m.get('verdict') or {}
+        competitor_data, tax_info = m['competitor_data'], m['tax_info']
+        tax_rate = normalize_tax_rate(tax_info.get('rate', 0.18))
+        fin = scalar_waterfall(competitor_data.get('average_price', 0), tax_rate, config['logistics_pct'])
+        risk = (verdict.get('financials') or {}).get('risk') or scan_profit_risk(competitor_data, tax_info, config['logistics_pct'])
+        rows.append({
+            "market": code,
+            "country": config['country_full'],
+            "currency": config['currency_code'],
+            "avg_price": fin['sell_price'],
+            "listings": competitor_data.get('listing_count', len(competitor_data.get('products', []))),
+            "price_source": competitor_data.get('source'),
+            "tax_rate_pct": round(tax_rate * 100, 1),
+            "logistics_pct": round(config['logistics_pct'] * 100, 1),
+            "net_profit": fin['net_profit'],
+            "net_margin_pct": fin['net_margin_pct'],
+            "loss_chance_pct": round(risk['p_loss'] * 100, 1) if risk else None,
+            "break_even_price": risk['break_even_price'] if risk else None,
+            "final_score": verdict.get('final_score'),
+            "verdict_tag": verdict.get('verdict_tag'),
+            "confidence": verdict.get('confidence_score'),
+        })
+    return sorted(rows, key=lambda r: (-(r['final_score'] or 0), -r['net_margin_pct']))
+
+def run_comparison(product_name, market_codes, on_start=None, on_done=None, include_verdict=True, max_workers=None, budget_secs=None):
+    """
+    Scans one product across several markets in a single run.
+    Returns {'product', 'category', 'markets': {code: {config, guardrails, ..., verdict}}, 'matrix': [rows]}.
+    """
+    product_name = product_keys.resolve(product_name)
+    graph, configs = build_comparison_graph(product_name, market_codes, include_verdict)
+    any_config = next(iter(configs.values()))
+    budgets, fallbacks = degrade_plan(graph, lambda name: configs.get(name.split("/")[0], any_config))
+    budget_secs = SCAN_BUDGET_SECS if budget_secs is None else budget_secs
+    with telemetry.scan(product_name, "Comparison: " + ", ".join(configs)):
+        results = run_graph(graph, on_start=on_start, on_done=on_done, max_workers=max_workers,
+                            budget_secs=budget_secs, budgets=budgets, fallbacks=fallbacks)
+
+    markets = {}
+    for code, config in configs.items():
+        markets[code] = {
+            "config": config,
+            "guardrails": results[f"{code}/guardrails"],
+            "market_data": results[f"{code}/market_data"],
+            "competitor_data": results[f"{code}/competitor_data"],
+            "sourcing_data": results[f"sourcing/{config['sourcing_hub']}"],
+            "tax_info": results[f"{code}/tax_info"],
+            "verdict": results.get(f"{code}/verdict"),
+        }
+    return {
+        "product": product_name,
+        "category": results["category"],
+        "markets": markets,
+        "matrix": comparison_matrix(markets),
+        "degraded": results.get("degraded", []),
+    }
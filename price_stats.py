@@ -0,0 +1,47 @@
+"""
+Robust price statistics for competitor listings.
+
+A plain mean gets dragged around by a single accessory at £5 or a bundle at £900,
+so the competitive scan reports order statistics instead. Everything comes from one
+sorted NumPy array, which stays cheap at thousands of listings.
+"""
+import numpy as np
+
+PERCENTILES = [5, 10, 25, 50, 75, 90, 95]
+TRIM = 0.10  # trimmed mean drops this share from each tail
+
+def robust_price_stats(prices, trim=TRIM):
+    """Returns None for an empty/invalid price list, else a dict of plain floats."""
+    arr = np.asarray(prices, dtype=np.float64)
+    arr = np.sort(arr[np.isfinite(arr) & (arr > 0)])
+    n = int(arr.size)
+    if n == 0: return None
+
+    p5, p10, p25, p50, p75, p90, p95 = np.percentile(arr, PERCENTILES)
+    iqr = p75 - p25
+    lower_fence, upper_fence = p25 - 1.5 * iqr, p75 + 1.5 * iqr
+
+    k = int(n * trim)
+    core = arr[k:n - k] if n - 2 * k > 0 else arr
+    outliers = int(np.count_nonzero((arr < lower_fence) | (arr > upper_fence)))
+
+    return {
+        "count": n,
+        "mean": float(arr.mean()),
+        "median": float(p50),
+        "trimmed_mean": float(core.mean()),
+        "min": float(arr[0]),
+        "max": float(arr[-1]),
+        "stdev": float(arr.std(ddof=1)) if n > 1 else 0.0,
+        "p5": float(p5), "p10": float(p10), "p25": float(p25),
+        "p75": float(p75), "p90": float(p90), "p95": float(p95),
+        "iqr": float(iqr),
+        "lower_fence": float(lower_fence),
+        "upper_fence": float(upper_fence),
+        "outliers": outliers,
+    }
+
+def price_band_mask(prices, min_price, max_price):
+    """Vectorized guardrail check: keep prices within [0.8 * min, 1.5 * max]."""
+    arr = np.asarray(prices, dtype=np.float64)
+    return (arr >= min_price * 0.8) & (arr <= max_price * 1.5)
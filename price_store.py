@@ -0,0 +1,122 @@
+"""
+Local time-series store of every competitor price we scrape.
+
+One row per (query, market, source, title, price, observed_at), indexed on
+(market, query, observed_at). get_price_data serves recent observations straight
+from here instead of re-scraping, and price_history()/price_summary() give the
+trend and dispersion of a product's price without another network call.
+"""
+import os
+import time
+import sqlite3
+import threading
+
+STORE_PATH = os.getenv("PRICE_STORE_PATH", os.path.join(".cache", "prices.sqlite"))
+FRESH_SECS = float(os.getenv("PRICE_FRESH_SECS", str(6 * 3600)))
+
+_local = threading.local()
+
+def _connect():
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        folder = os.path.dirname(STORE_PATH)
+        if folder: os.makedirs(folder, exist_ok=True)
+        conn = sqlite3.connect(STORE_PATH, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS observations (
+                query TEXT NOT NULL,
+                market TEXT NOT NULL,
+                source TEXT NOT NULL,
+                title TEXT,
+                price REAL NOT NULL,
+                observed_at REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_obs_query_time ON observations(market, query, observed_at)")
+        conn.commit()
+        _local.conn = conn
+    return conn
+
+def normalize_query(query):
+    return " ".join(str(query).lower().split())
+
+def market_key(country_config):
+    if country_config.get('amazon_code'): return country_config['amazon_code']
+    # Amazon and Google Shopping both call the UK "GB"
+    gl = country_config['google_gl'].lower()
+    return "GB" if gl in ["uk", "gb"] else gl.upper()
+
+def record(query, market, source, products, observed_at=None):
+    """Stores one scrape (all rows share the same observed_at, which marks the batch)."""
+    if not products: return
+    observed_at = observed_at or time.time()
+    q = normalize_query(query)
+    conn = _connect()
+    conn.executemany(
+        "INSERT INTO observations VALUES (?, ?, ?, ?, ?, ?)",
+        [(q, market, source, p.get('title'), float(p['price']), observed_at) for p in products]
+    )
+    conn.commit()
+
+def recent(query, market, source, max_age_secs=None):
+    """Latest scrape of this source if it is younger than max_age_secs, else None (stale)."""
+    max_age_secs = FRESH_SECS if max_age_secs is None else max_age_secs
+    q = normalize_query(query)
+    conn = _connect()
+    row = conn.execute(
+        "SELECT MAX(observed_at) FROM observations WHERE market = ? AND query = ? AND source = ? AND observed_at >= ?",
+        (market, q, source, time.time() - max_age_secs)
+    ).fetchone()
+    if not row or row[0] is None: return None
+    rows = conn.execute(
+        "SELECT title, price FROM observations WHERE market = ? AND query = ? AND source = ? AND observed_at = ?",
+        (market, q, source, row[0])
+    ).fetchall()
+    return [{ "title": title, "price": price } for title, price in rows]
+
+def price_history(query, market, days=90, bucket_secs=86400):
+    """Per-bucket (default: daily) count / mean / min / max / stdev of observed prices, oldest first."""
+    q = normalize_query(query)
+    rows = _connect().execute("""
+        SELECT CAST(observed_at / ? AS INTEGER) AS bucket,
+               COUNT(*), AVG(price), MIN(price), MAX(price), AVG(price * price)
+        FROM observations
+        WHERE market = ? AND query = ? AND observed_at >= ?
+        GROUP BY bucket ORDER BY bucket
+    """, (bucket_secs, market, q, time.time() - days * 86400)).fetchall()
+
+    history = []
+    for bucket, n, mean, lo, hi, mean_sq in rows:
+        var = max(mean_sq - mean * mean, 0.0)
+        history.append({
+            "period_start": bucket * bucket_secs, "count": n, "mean": mean,
+            "min": lo, "max": hi, "stdev": var ** 0.5,
+        })
+    return history
+
+def price_summary(query, market, days=90):
+    """Compact trend + dispersion view used by the trends/economics pillars."""
+    history = price_history(query, market, days)
+    if not history: return None
+    total = sum(h["count"] for h in history)
+    first, last = history[0]["mean"], history[-1]["mean"]
+    cv = (last and history[-1]["stdev"] / last) or 0.0
+    return {
+        "observations": total,
+        "periods": len(history),
+        "first_mean": first,
+        "latest_mean": last,
+        "change_pct": ((last - first) / first * 100) if first else 0.0,
+        "dispersion_cv": cv,
+    }
+
+def describe(query, market, currency="", days=90):
+    """One-line human summary for prompts; 'No price history yet' if the store is empty."""
+    s = price_summary(query, market, days)
+    if not s: return "No price history yet"
+    span = "1 scan" if s["periods"] == 1 else f"{s['periods']} days with data"
+    return (
+        f"{s['observations']} price points over {span}; avg {currency}{int(s['first_mean'])} -> "
+        f"{currency}{int(s['latest_mean'])} ({s['change_pct']:+.1f}%), dispersion {s['dispersion_cv'] * 100:.0f}%"
+    )
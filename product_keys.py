@@ -0,0 +1,199 @@
+"""
+Canonical product keys: "Smart Ring", "smart rings", "Smart-Ring 2024 model" and "ring, smart"
+are one product.
+
+Every cache and store downstream (LLM answers, Serper/Apify responses, price history,
+stored scans) is keyed on the product text, so trivial variation in what was typed
+used to mean a cold scan. canonical_key() reduces a name to sorted, lemmatized tokens
+with stopwords and model years removed; resolve() maps a name onto the display name of the
+first scan with the *same* key. Near-duplicates ("Wireless Earbuds Pro" vs "Wireless
+Earbuds", "USB A Cable" vs "USB C Cable") are often different products, so they are never
+merged automatically: similar() finds them through a MinHash/LSH index over character
+trigrams and the dashboard offers them as suggestions.
+
+    product_keys.resolve("smart rings 2025 edition")   # -> "Smart Ring" (if that was scanned before)
+    product_keys.similar("smartring")          # -> [("Smart Ring", 0.71), ...]
+
+Names seen so far persist in a small SQLite table (PRODUCT_KEYS_PATH).
+"""
+import os
+import re
+import time
+import zlib
+import sqlite3
+import threading
+
+STORE_PATH = os.getenv("PRODUCT_KEYS_PATH", os.path.join(".cache", "product_keys.sqlite"))
+# Jaccard similarity (character trigrams) above which a past product is offered as a suggestion
+SIMILAR_THRESHOLD = 0.5
+
+# Only filler words: single letters are often variants ("USB A" vs "USB C") and stay in the key
+STOPWORDS = {
+    "an", "the", "and", "or", "for", "with", "of", "in", "on", "to", "by", "from",
+    "new", "best", "latest", "top", "cheap", "buy", "online", "sale", "edition", "version",
+}
+YEAR = re.compile(r"^(19|20)\d\d$")
+# A year-like number is only a model year next to one of these ("2024 model") or beside another
+# number ("iPhone 15 2023"); on its own it is usually the product ("RTX 2070", "iPhone 2020")
+YEAR_WORDS = {"model", "edition", "version", "release", "year", "season", "collection"}
+
+# MinHash: 64 permutations in 16 LSH bands of 4 rows (pairs at ~0.5+ Jaccard usually share a band)
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+_PRIME = (1 << 61) - 1
+
+def _lemma(word):
+    # Lemmatization-lite: plural endings only ("batteries" -> "battery", "watches" -> "watch")
+    if len(word) > 4 and word.endswith("ies"): return word[:-3] + "y"
+    if len(word) > 4 and word.endswith(("ches", "shes", "xes", "sses")): return word[:-2]
+    if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us", "is")): return word[:-1]
+    return word
+
+def _model_years(words):
+    """Indexes of model-year tokens (and the year words beside them) to leave out of the key."""
+    numbers = any(re.search(r"\d", w) and not YEAR.match(w) for w in words)
+    drop = set()
+    for i, word in enumerate(words):
+        if not YEAR.match(word): continue
+        beside = [j for j in (i - 1, i + 1) if 0 <= j < len(words) and words[j] in YEAR_WORDS]
+        if beside or numbers: drop.update([i, *beside])
+    return drop
+
+def tokens(name):
+    """Lowercased, lemmatized tokens with punctuation, stopwords and model years removed (order kept)."""
+    words = re.findall(r"[a-z0-9]+", str(name).lower().replace("'", ""))
+    drop = _model_years(words)
+    return [_lemma(w) for i, w in enumerate(words) if w not in STOPWORDS and i not in drop]
+
+def canonical_key(name):
+    """Order-free identity of a product name: "ring, smart" and "Smart Rings" -> "ring smart"."""
+    toks = tokens(name)
+    # A name made only of stopwords/years keeps its plain words rather than collapsing to ""
+    if not toks: toks = re.findall(r"[a-z0-9]+", str(name).lower())
+    return " ".join(sorted(set(toks)))
+
+def _grams(key):
+    grams = set()
+    for tok in key.split():
+        padded = f" {tok} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return frozenset(grams)
+
+def jaccard(a, b):
+    if not a or not b: return 0.0
+    return len(a & b) / len(a | b)
+
+_perms = None
+
+def _signature(grams):
+    global _perms
+    import numpy as np  # deferred: exact-key lookups (the common case) never need it
+    if _perms is None:
+        rng = np.random.default_rng(20240601)
+        _perms = (rng.integers(1, 1 << 31, NUM_PERM, dtype=np.uint64), rng.integers(0, 1 << 31, NUM_PERM, dtype=np.uint64))
+    a, b = _perms
+    # crc32 rather than hash(): signatures must be stable across processes
+    hashed = np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64, count=len(grams))
+    return ((hashed[:, None] * a + b) % _PRIME).min(axis=0)
+
+class ProductIndex:
+    """In-memory canonical key -> display name map plus the LSH buckets for near-duplicate search."""
+
+    def __init__(self):
+        self.names = {}    # canonical key -> display name (first seen)
+        self.grams = {}    # canonical key -> trigram set
+        self.buckets = {}  # (band, band bytes) -> {canonical keys}
+        self.lock = threading.Lock()
+
+    def add(self, key, name):
+        with self.lock:
+            if key in self.names: return self.names[key]
+            grams = _grams(key)
+            self.names[key], self.grams[key] = name, grams
+            if grams:
+                sig = _signature(grams)
+                for band in range(BANDS):
+                    self.buckets.setdefault((band, sig[band * ROWS:(band + 1) * ROWS].tobytes()), set()).add(key)
+            return name
+
+    def similar(self, key, threshold=SIMILAR_THRESHOLD, limit=5):
+        """[(canonical key, similarity)] best first, excluding the key itself."""
+        grams = _grams(key)
+        if not grams: return []
+        sig = _signature(grams)
+        with self.lock:
+            candidates = set()
+            for band in range(BANDS):
+                candidates |= self.buckets.get((band, sig[band * ROWS:(band + 1) * ROWS].tobytes()), set())
+            candidates.discard(key)
+            scored = [(other, jaccard(grams, self.grams[other])) for other in candidates]
+        scored = [(other, round(score, 3)) for other, score in scored if score >= threshold]
+        return sorted(scored, key=lambda s: -s[1])[:limit]
+
+_local = threading.local()
+_index = None
+_index_lock = threading.Lock()
+
+def _connect():
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        folder = os.path.dirname(STORE_PATH)
+        if folder: os.makedirs(folder, exist_ok=True)
+        conn = sqlite3.connect(STORE_PATH, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS products (
+                key TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                first_seen REAL NOT NULL
+            )
+        """)
+        conn.commit()
+        _local.conn = conn
+    return conn
+
+def index():
+    """The process-wide index, loaded from the store on first use."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            idx = ProductIndex()
+            # Keys are recomputed from the names, so rows stored under an older canonical_key() heal
+            for (name,) in _connect().execute("SELECT name FROM products ORDER BY first_seen"):
+                idx.add(canonical_key(name), name)
+            _index = idx
+        return _index
+
+def _display(name):
+    return " ".join(str(name).split())
+
+def resolve(product_name):
+    """
+    The name downstream agents and caches should use for product_name: the first-seen name with
+    exactly the same canonical key, else product_name itself, which is remembered for next time.
+    """
+    key = canonical_key(product_name)
+    if not key: return product_name
+    idx = index()
+    known = idx.names.get(key)
+    if known: return known
+
+    name = idx.add(key, _display(product_name))
+    conn = _connect()
+    conn.execute("INSERT OR IGNORE INTO products VALUES (?, ?, ?)", (key, name, time.time()))
+    conn.commit()
+    return name
+
+def known(product_name):
+    """True if a product with this exact canonical key was scanned before."""
+    return canonical_key(product_name) in index().names
+
+def similar(product_name, threshold=SIMILAR_THRESHOLD, limit=5):
+    """
+    Other past products that look like product_name: [(display name, similarity)], best first.
+    Suggestions only; the exact match (what resolve() returns) is not included.
+    """
+    key = canonical_key(product_name)
+    idx = index()
+    return [(idx.names[other], score) for other, score in idx.similar(key, threshold, limit)]
@@ -0,0 +1,101 @@
+"""
+Finished scans, kept per browser session and shared across sessions.
+
+Any widget click makes Streamlit re-run app.py from the top. Instead of losing the verdict
+(or paying for every agent again), the dashboard is re-drawn from a stored record:
+
+    store = st.session_state
+    record = results.load(store, product, country)   # session first, then the shared cache
+    record = results.save(store, results.make_record(...))
+
+Records are keyed on (canonical product key, country, PIPELINE_VERSION). Bump the version whenever the
+agents or prompts change in a way that makes old verdicts misleading.
+"""
+import time
+import cache
+import product_keys
+import warehouse
+
+PIPELINE_VERSION = "2026.10"
+HISTORY_LIMIT = 20
+
+SESSION_RESULTS = "scan_results"
+SESSION_ACTIVE = "active_scan"
+
+def result_key(product, country):
+    # Canonical key, so "smart rings" finds the stored "Smart Ring" scan (product_keys.py)
+    return cache.make_key("scan", product_keys.canonical_key(product), country, PIPELINE_VERSION)
+
+def make_record(product, country, scan, verdict, trace=None):
+    """scan: run_scan() output (without the verdict). trace: telemetry Trace.to_dict() for the timing waterfall."""
+    return {
+        "key": result_key(product, country),
+        "product": product,
+        "country": country,
+        "version": PIPELINE_VERSION,
+        "saved_at": time.time(),
+        "guardrails": scan.get("guardrails"),
+        "market_data": scan.get("market_data"),
+        "competitor_data": scan.get("competitor_data"),
+        "sourcing_data": scan.get("sourcing_data"),
+        "tax_info": scan.get("tax_info"),
+        "verdict": verdict,
+        "trace": trace,
+    }
+
+def _summary(record):
+    verdict = record.get("verdict") or {}
+    return {
+        "key": record["key"], "product": record["product"], "country": record["country"],
+        "version": record.get("version"), "saved_at": record["saved_at"], "final_score": verdict.get("final_score"),
+        "verdict_tag": verdict.get("verdict_tag"),
+    }
+
+def _session(store):
+    return store.setdefault(SESSION_RESULTS, {})
+
+def save(store, record, ttl=None):
+    """
+    Keeps the record in this session, shares it with every other session and makes it the active one.
+    `ttl` overrides the cache TTL (watchlist.py keeps watched verdicts servable for longer).
+    Every saved scan is also added to the verdict warehouse (warehouse.py), which never expires.
+    """
+    _session(store)[record["key"]] = record
+    store[SESSION_ACTIVE] = record["key"]
+    cache.set("scans", record["key"], record, ttl)
+    cache.set("scan_index", record["key"], _summary(record), ttl)
+    try:
+        warehouse.add(record)
+    except Exception as e:
+        print(f"⚠️ Warehouse write failed: {e}")
+    return record
+
+def get(store, key):
+    record = _session(store).get(key)
+    if record is None:
+        record = cache.get("scans", key)
+        if record is not None: _session(store)[key] = record
+    return record
+
+def load(store, product, country):
+    """Stored record for this (product, country) at the current PIPELINE_VERSION, or None. Activates it."""
+    key = result_key(product, country)
+    record = get(store, key)
+    if record is not None: store[SESSION_ACTIVE] = key
+    return record
+
+def activate(store, key):
+    record = get(store, key)
+    if record is not None: store[SESSION_ACTIVE] = key
+    return record
+
+def active(store):
+    key = store.get(SESSION_ACTIVE)
+    return get(store, key) if key else None
+
+def history(store, limit=HISTORY_LIMIT):
+    """Newest-first summaries of this session's scans plus everyone's recent ones (summaries only, no payloads)."""
+    summaries = {key: _summary(r) for key, r in _session(store).items()}
+    for s in cache.recent("scan_index", limit):
+        if s.get("version") == PIPELINE_VERSION: summaries.setdefault(s["key"], s)
+    return sorted(summaries.values(), key=lambda s: -s["saved_at"])[:limit]
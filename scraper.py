@@ -1,93 +1,280 @@
 import os
-import requests
-import json
-import statistics
-from apify_client import ApifyClient
-from dotenv import load_dotenv
+import re
+import time
+import hashlib
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import cache
+import throttle
+import clients
+import price_store
+import telemetry
+import deadline
+import health
+from price_stats import robust_price_stats, price_band_mask
 
-load_dotenv()
-
-client = ApifyClient(os.getenv("APIFY_API_TOKEN"))
+# "race" runs Amazon and Google Shopping side by side; "sequential" is the old Amazon-then-fallback flow
+SCRAPE_MODE = os.getenv("SCRAPE_MODE", "race")
+SCRAPE_DEADLINE_SECS = float(os.getenv("SCRAPE_DEADLINE_SECS", "120"))
+MERGE_GRACE_SECS = float(os.getenv("SCRAPE_MERGE_GRACE_SECS", "3"))
+RACE_MARGIN_SECS = 1.0  # Budget kept back for filtering/stats after the race
+APIFY_POLL_SECS = 5
+APIFY_TERMINAL = ("SUCCEEDED", "FAILED", "ABORTED", "TIMED-OUT")
+MIN_ITEMS = 3
+# Listings requested from Apify; raise to hundreds/thousands for a deep competitive scan
+MAX_ITEMS = int(os.getenv("SCRAPE_MAX_ITEMS", "10"))
+# Listings returned to the UI (stats always cover every listing)
+MAX_LISTINGS_RETURNED = int(os.getenv("SCRAPE_MAX_LISTINGS_RETURNED", "200"))
+AMAZON_FIELDS = ["asin", "title", "price", "pricing"]
+AMAZON_ACTOR = "apify/amazon-search-scraper"
 
 def filter_junk_products(products, guardrails):
     min_p = guardrails.get('min_price', 0)
     max_p = guardrails.get('max_price', float('inf'))
     
-    valid_products = []
     if min_p <= 0: min_p = 1
     
     print(f"🛡️ Validator: Filtering items outside {min_p} - {max_p}...")
     
-    for p in products:
-        price = p['price']
-        if price >= (min_p * 0.8) and price <= (max_p * 1.5):
-            valid_products.append(p)
-            
-    return valid_products
+    if not products: return []
+    keep = price_band_mask([p['price'] for p in products], min_p, max_p)
+    return [p for p, ok in zip(products, keep) if ok]
 
-def get_price_data(product_name, country_config, guardrails):
-    country_code = country_config['google_gl']
-    raw_products = []
-    source = "Amazon"
+def listing_key(title):
+    """Dedupe key for listings without an ASIN: hash of the alphanumeric, lower-cased title."""
+    norm = re.sub(r"[^a-z0-9]+", " ", str(title).lower()).strip()
+    return hashlib.blake2b(norm.encode("utf-8"), digest_size=8).digest()
+
+def iter_amazon_listings(items):
+    """
+    Streams raw Apify items into slim {title, price} listings, skipping priceless rows
+    and duplicates (same ASIN, or same normalized title). Raw items are never held in memory.
+    """
+    seen = set()
+    for item in items:
+        price = item.get('price')
+        if not price and 'pricing' in item:
+            price = item['pricing'].get('realPrice')
+        if not (price and isinstance(price, (int, float)) and price > 0): continue
+        
+        title = item.get('title', 'Unknown')
+        key = item.get('asin') or listing_key(title)
+        if key in seen: continue
+        seen.add(key)
+        yield { "title": title, "price": price }
+
+def scrape_amazon(product_name, amazon_country, max_items=None, deadline_secs=None, cancel=None):
+    """
+    Starts the Apify actor without blocking and polls it until it finishes.
+    Gives up (and aborts the paid run) once deadline_secs pass or `cancel` is set.
+    The whole run counts as one call for health.py; only the start request is retried.
+    """
+    print(f"🛍️ Amazon Scraper: Searching for '{product_name}' in {amazon_country}...")
     
-    amazon_country = "GB" if country_code.lower() in ["uk", "gb"] else "IN"
+    run_input = { 
+        "searchQueries": [product_name], 
+        "countryCode": amazon_country, 
+        "maxItems": max_items or MAX_ITEMS
+    }
     
-    try:
-        print(f"🛍️ Amazon Scraper: Searching for '{product_name}' in {amazon_country}...")
+    client = clients.get_apify_client()
+    with health.track(AMAZON_ACTOR):  # The actor id doubles as the endpoint name ("apify/...")
+        telemetry.note_call("apify")
+        run = health.retry(client.actor(AMAZON_ACTOR).start, run_input=run_input, provider="apify")
+        run_client = client.run(run["id"])
+        give_up_at = time.time() + deadline.timeout(deadline_secs or SCRAPE_DEADLINE_SECS)
         
-        run_input = { 
-            "searchQueries": [product_name], 
-            "countryCode": amazon_country, 
-            "maxItems": 10 
-        }
+        while run["status"] not in APIFY_TERMINAL:
+            if (cancel and cancel.is_set()) or deadline.cancelled():
+                run_client.abort()
+                raise health.Abandoned("Amazon run cancelled")
+            if time.time() >= give_up_at:
+                run_client.abort()
+                raise TimeoutError("Amazon run hit its deadline")
+            wait = max(1, int(min(APIFY_POLL_SECS, give_up_at - time.time())))
+            run = run_client.wait_for_finish(wait_secs=wait) or run
         
-        run = client.actor("apify/amazon-search-scraper").call(run_input=run_input)
-        dataset = client.dataset(run["defaultDatasetId"]).list_items().items
+        if run["status"] != "SUCCEEDED":
+            raise RuntimeError(f"Amazon run ended with status {run['status']}")
         
-        for item in dataset:
-            price = item.get('price')
-            if not price and 'pricing' in item:
-                price = item['pricing'].get('realPrice')
+        # Page through the dataset instead of loading it whole; only the fields we use come over the wire
+        items = client.dataset(run["defaultDatasetId"]).iterate_items(fields=AMAZON_FIELDS)
+        products = list(iter_amazon_listings(items))
+    
+    print(f"✅ Amazon found {len(products)} items.")
+    return products
+
+PRICE_RE = re.compile(r"\d[\d.,\s]*")
+
+def _decimal_mark(digits):
+    """Which of '.' / ',' is the decimal mark in digits (None: only thousands grouping), judged by position."""
+    marks = re.findall(r"[.,]", digits)
+    if not marks: return None
+    if len(set(marks)) == 2: return marks[-1]        # '1,299.00' / '1.299,00': the last one
+    if len(marks) > 1: return None                   # '12.345.678' / '1,29,999': repeated = grouping
+    # A single mark before exactly three digits groups thousands ('1.299 €', '1,299'); else decimals ('0,99', '12.5')
+    return None if re.fullmatch(r"[1-9]\d{0,2}[.,]\d{3}", digits) else marks[0]
+
+def parse_price(text):
+    """'£1,299.00', '1.299,00 €', '1.299 €', '₹1,29,999', 'AED 45.50' -> float (None if there is no number)."""
+    match = PRICE_RE.search(str(text or ""))
+    if not match: return None
+    digits = re.sub(r"\s", "", match.group()).rstrip(".,")
+    mark = _decimal_mark(digits)
+    if mark:
+        whole, _, fraction = digits.rpartition(mark)
+        digits = re.sub(r"[.,]", "", whole) + "." + fraction
+    else:
+        digits = re.sub(r"[.,]", "", digits)
+    try: return float(digits)
+    except ValueError: return None
+
+def scrape_google_shopping(product_name, gl_code, currency):
+    res = clients.serper_post("shopping", { "q": product_name, "gl": gl_code, "num": 20 })
+    
+    products = []
+    seen = set()
+    if "shopping" in res:
+        for item in res["shopping"]:
+            price_val = parse_price(item.get('price', ''))
+            if price_val is None: continue
+            key = listing_key(item.get('title'))
+            if key in seen: continue
+            seen.add(key)
+            products.append({ "title": item.get('title'), "price": price_val })
+    return products
+
+def _store_or_scrape(source, product_name, market, cache_namespace, cache_key, scrape):
+    # 1. Recent observations in the price store are served without touching the network (unless refreshing)
+    fresh = None if cache.bypassed() else price_store.recent(product_name, market, source)
+    if fresh is not None:
+        print(f"🗃️ {source}: {len(fresh)} recent prices served from the store.")
+        return fresh
+    
+    # 2. Stale: re-scrape (through the response cache) and record only genuinely new observations
+    def scrape_and_record():
+        products = scrape()
+        price_store.record(product_name, market, source, products)
+        return products
+    return cache.cached(cache_namespace, cache_key, scrape_and_record)
+
+def fetch_amazon(product_name, amazon_country, cancel=None):
+    return _store_or_scrape(
+        "Amazon", product_name, amazon_country,
+        "amazon", cache.make_key("apify", product_name, amazon_country, MAX_ITEMS),
+        lambda: throttle.run("apify", scrape_amazon, product_name, amazon_country, cancel=cancel)
+    )
+
+def fetch_google_shopping(product_name, gl_code, currency):
+    return _store_or_scrape(
+        "Google Shopping", product_name, gl_code.upper(),
+        "shopping", cache.make_key("serper", product_name, gl_code),
+        lambda: throttle.run("serper", scrape_google_shopping, product_name, gl_code, currency)
+    )
+
+def race_price_sources(product_name, amazon_country, gl_code, currency):
+    """
+    Starts Amazon (Apify) and Google Shopping (Serper) together.
+    - The first source to reach MIN_ITEMS wins; the other gets MERGE_GRACE_SECS to land and be merged.
+    - If neither reaches MIN_ITEMS, whatever arrived before the deadline is merged.
+    Worst case is max(sources) instead of sum(sources). A losing Apify run is aborted.
+    """
+    cancel = threading.Event()
+    pool = ThreadPoolExecutor(max_workers=2)
+    futures = {
+        # copy_context: keeps both legs inside the caller's telemetry span
+        pool.submit(contextvars.copy_context().run, fetch_amazon, product_name, amazon_country, cancel): "Amazon",
+        pool.submit(contextvars.copy_context().run, fetch_google_shopping, product_name, gl_code, currency): "Google Shopping",
+    }
+    results = {}
+    # Within a scan budget, stop a little early: whatever landed still gets filtered and merged
+    race_secs = SCRAPE_DEADLINE_SECS if deadline.remaining() is None else min(SCRAPE_DEADLINE_SECS, deadline.remaining() - RACE_MARGIN_SECS)
+    give_up_at = time.time() + max(race_secs, 0)
+    
+    try:
+        pending = set(futures)
+        while pending and time.time() < give_up_at:
+            done, pending = wait(pending, timeout=give_up_at - time.time(), return_when=FIRST_COMPLETED)
+            for fut in done:
+                name = futures[fut]
+                try:
+                    results[name] = fut.result()
+                except Exception as e:
+                    print(f"⚠️ {name} Scrape Skipped: {e}")
             
-            if price and isinstance(price, (int, float)) and price > 0:
-                raw_products.append({ "title": item.get('title', 'Unknown'), "price": price })
-        
-        print(f"✅ Amazon found {len(raw_products)} items.")
-                
-    except Exception as e:
-        print(f"⚠️ Amazon Scrape Skipped: {e}")
-
-    if len(raw_products) < 3:
-        source = "Google Shopping"
-        print("🔄 Switching to Google Shopping...")
+            if pending and any(len(r) >= MIN_ITEMS for r in results.values()):
+                # We have a winner: give the other source a short grace window to merge in
+                done, pending = wait(pending, timeout=max(min(MERGE_GRACE_SECS, give_up_at - time.time()), 0))
+                for fut in done:
+                    try: results[futures[fut]] = fut.result()
+                    except Exception as e: print(f"⚠️ {futures[fut]} Scrape Skipped: {e}")
+                break
+    finally:
+        cancel.set()
+        pool.shutdown(wait=False)
+    
+    found = [name for name in ("Amazon", "Google Shopping") if results.get(name)]
+    products = [p for name in found for p in results[name]]
+    print(f"🏁 Price race: {', '.join(f'{n}={len(results[n])}' for n in results) or 'no source landed'}")
+    return (" + ".join(found) or "Amazon"), products
+
+@telemetry.traced("get_price_data", provider="apify+serper")
+def get_price_data(product_name, country_config, guardrails, mode=None):
+    country_code = country_config['google_gl']
+    raw_products = []
+    source = "Amazon"
+    
+    amazon_country = price_store.market_key(country_config)
+    gl_code = "gb" if country_code.lower() == "uk" else country_code
+    currency = country_config['currency_symbol']
+    
+    if (mode or SCRAPE_MODE) == "race":
+        source, raw_products = race_price_sources(product_name, amazon_country, gl_code, currency)
+    else:
         try:
-            url = "https://google.serper.dev/shopping"
-            gl_code = "gb" if country_code.lower() == "uk" else country_code
-            
-            payload = json.dumps({ "q": product_name, "gl": gl_code, "num": 20 })
-            headers = { 'X-API-KEY': os.getenv("SERPER_API_KEY"), 'Content-Type': 'application/json' }
-            
-            response = requests.post(url, headers=headers, data=payload)
-            res = response.json()
-            
-            if "shopping" in res:
-                for item in res["shopping"]:
-                    currency = country_config['currency_symbol']
-                    p_str = item.get('price', '').replace(currency, '').replace(',', '').strip()
-                    try:
-                        price_val = float(p_str)
-                        raw_products.append({ "title": item.get('title'), "price": price_val })
-                    except: continue
+            raw_products = fetch_amazon(product_name, amazon_country)
         except Exception as e:
-            print(f"⚠️ Google Scrape Failed: {e}")
+            print(f"⚠️ Amazon Scrape Skipped: {e}")
+
+        if len(raw_products) < MIN_ITEMS:
+            source = "Google Shopping"
+            print("🔄 Switching to Google Shopping...")
+            try:
+                raw_products = raw_products + fetch_google_shopping(product_name, gl_code, currency)
+            except Exception as e:
+                print(f"⚠️ Google Scrape Failed: {e}")
 
+    # Same listing surfaced by both sources only counts once
+    deduped, seen = [], set()
+    for p in raw_products:
+        key = listing_key(p['title'])
+        if key in seen: continue
+        seen.add(key)
+        deduped.append(p)
+    raw_products = deduped
+    
     clean_products = filter_junk_products(raw_products, guardrails)
     
-    if not clean_products:
-        source = "Market Estimate (Validator Fallback)"
-        est_price = (guardrails['min_price'] + guardrails['max_price']) / 2
-        clean_products.append({ "title": "Market Average Estimate", "price": est_price })
+    if not clean_products: return estimate_from_guardrails(guardrails)
+    return summarize_prices(source, clean_products)
 
-    avg_price = statistics.mean([p['price'] for p in clean_products])
+def summarize_prices(source, clean_products):
+    # Robust centre: 10% trimmed mean (identical to the plain mean below 10 listings)
+    prices = [p['price'] for p in clean_products]
+    stats = robust_price_stats(prices)
+    # No positive price to summarize (e.g. a 0-0 guardrail estimate): the plain mean, as before
+    avg_price = stats['trimmed_mean'] if stats else (sum(prices) / len(prices) if prices else 0)
     
-    return { "source": source, "average_price": avg_price, "products": clean_products }
\ No newline at end of file
+    return {
+        "source": source,
+        "average_price": avg_price,
+        "price_stats": stats,
+        "listing_count": len(clean_products),
+        "products": clean_products[:MAX_LISTINGS_RETURNED],
+    }
+
+def estimate_from_guardrails(guardrails):
+    """No usable listings (or the scan ran out of time): the midpoint of the validator's range."""
+    est_price = (guardrails['min_price'] + guardrails['max_price']) / 2
+    return summarize_prices("Market Estimate (Validator Fallback)", [{ "title": "Market Average Estimate", "price": est_price }])
@@ -0,0 +1,68 @@
+"""
+Process-wide request coalescing ("single flight").
+
+When several dashboard sessions ask for the same thing at the same moment (two analysts
+scanning "Smart Ring / UK"), only the first caller does the work. Everyone else blocks
+on that in-flight call and gets a copy of its result, or its exception. Nothing is kept
+once the call finishes; remembering results is the response cache's job.
+
+    value = singleflight.do(("trends", key), compute)
+"""
+import copy
+import threading
+import telemetry
+
+class Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+        self.followers = 0
+
+    def wait(self, timeout=None):
+        if not self.done.wait(timeout):
+            raise TimeoutError("Timed out waiting for an identical in-flight request")
+        if self.error is not None: raise self.error
+        # Followers get their own copy: callers are free to mutate what they receive
+        return copy.deepcopy(self.value)
+
+_lock = threading.Lock()
+_flights = {}
+
+def join(key):
+    """Returns (flight, is_leader). The leader must call finish(key, flight, ...) exactly once."""
+    with _lock:
+        flight = _flights.get(key)
+        if flight is not None:
+            flight.followers += 1
+            return flight, False
+        flight = _flights[key] = Flight()
+        return flight, True
+
+def finish(key, flight, value=None, error=None):
+    with _lock:
+        if _flights.get(key) is flight: del _flights[key]
+    flight.value, flight.error = value, error
+    flight.done.set()
+
+def do_shared(key, fn):
+    """Runs fn() once per key among concurrent callers. Returns (value, shared) where shared=True for followers."""
+    flight, leader = join(key)
+    if not leader:
+        telemetry.note_coalesced(key[0] if isinstance(key, tuple) else "call")
+        return flight.wait(), True
+    try:
+        value = fn()
+    except BaseException as e:
+        finish(key, flight, error=e)
+        raise
+    finish(key, flight, value)
+    return value, False
+
+def do(key, fn):
+    return do_shared(key, fn)[0]
+
+def in_flight():
+    """{key: waiting followers} for everything currently running."""
+    with _lock:
+        return {key: f.followers for key, f in _flights.items()}
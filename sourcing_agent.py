@@ -1,10 +1,17 @@
-from langchain_community.utilities import GoogleSerperAPIWrapper
-from dotenv import load_dotenv
+import cache
+import throttle
+import clients
+import telemetry
+from config import sourcing_gl
 
-load_dotenv()
+NO_SOURCING_DATA = "No sourcing data (supply chain agent unavailable)"
 
+@telemetry.traced("get_wholesale_cost", provider="serper")
 def get_wholesale_cost(product_name, config):
-    search = GoogleSerperAPIWrapper(gl=config['google_gl'])
-    location_keyword = "IndiaMart" if config['google_gl'] == 'in' else "Alibaba"
+    # Keyed on the sourcing hub, not the market: every market buying from Alibaba shares one search
+    location_keyword = config.get('sourcing_hub') or ("IndiaMart" if config['google_gl'] == 'in' else "Alibaba")
+    gl = sourcing_gl(config)
     query = f"Wholesale bulk manufacturing cost per unit for {product_name} on {location_keyword}"
-    return search.run(query)
\ No newline at end of file
+    return cache.cached("sourcing", cache.make_key("serper", gl, query),
+        lambda: throttle.run("serper", clients.serper_search, query, gl=gl)
+    )
\ No newline at end of file
@@ -0,0 +1,145 @@
+"""
+Deterministic GST/VAT slab lookup.
+
+Products are classified into a category with a keyword index (first-token inverted
+index over category synonyms, longest phrase wins), then the category is mapped to
+the country's slab. Anything the index can't classify falls through to the LLM in
+agents.lookup_tax_rate, whose answer is written back here via learn().
+"""
+import os
+import re
+import json
+import threading
+
+import config
+
+LEARNED_PATH = os.getenv("TAX_LEARNED_PATH", os.path.join(".cache", "tax_learned.json"))
+
+# 1. CATEGORY SYNONYMS (country-independent)
+CATEGORIES = {
+    "electronics": [
+        "smart ring", "earbuds", "headphones", "earphones", "smartwatch", "smart watch", "fitness tracker",
+        "wearable", "phone", "smartphone", "charger", "power bank", "speaker", "bluetooth speaker", "laptop",
+        "tablet", "camera", "drone", "keyboard", "mouse", "monitor", "router", "gaming console", "electronics",
+        "led light", "smart plug", "vr headset", "projector"
+    ],
+    # No bare "car": "car charger", "car seat" and "toy car" are not vehicles
+    "luxury_vehicles": ["luxury car", "sports car", "supercar", "suv", "yacht", "motorcycle", "superbike"],
+    "food": [
+        "food", "snack", "snacks", "protein bar", "rice", "flour", "tea", "coffee", "spice",
+        "honey", "biscuit", "cereal", "granola"
+    ],
+    "fresh_produce": ["fresh fruit", "fruit", "vegetable", "vegetables", "milk", "eggs", "fresh fish"],
+    "clothing": ["clothes", "clothing", "apparel", "t shirt", "tshirt", "shirt", "dress", "jeans", "socks", "hoodie"],
+    "childrens_clothing": [
+        "kids clothes", "kids clothing", "children clothes", "childrens clothes", "children clothing",
+        "baby clothes", "baby clothing", "toddler clothes", "school uniform"
+    ],
+    "books": ["book", "books", "novel", "textbook", "ebook", "children book"],
+    "gold_jewellery": [
+        "gold", "jewellery", "jewelry", "gold ring", "gold chain", "necklace", "bangle", "earrings",
+        "diamond ring", "silver jewellery"
+    ],
+    "home_energy": ["home energy", "electricity", "heating oil", "solar panel", "heat pump", "home insulation"],
+}
+
+# 2. SLABS PER COUNTRY live in the market registry (config.MARKETS[...]['tax']);
+# categories a country does not list fall back to its standard rate
+TAX_RULES = config.tax_tables()
+
+def _tokens(text):
+    words = re.findall(r"[a-z0-9]+", str(text).lower().replace("'", ""))
+    # Lemmatization-lite: "earbuds" == "earbud", "rings" == "ring"
+    return [w[:-1] if len(w) > 3 and w.endswith("s") and not w.endswith("ss") else w for w in words]
+
+def _build_index():
+    index = {}
+    for category, phrases in CATEGORIES.items():
+        for phrase in phrases:
+            toks = tuple(_tokens(phrase))
+            if toks: index.setdefault(toks[0], []).append((toks, category))
+    # Longest phrases first so "smart ring" beats "ring"-style partials
+    for entries in index.values(): entries.sort(key=lambda e: -len(e[0]))
+    return index
+
+_INDEX = _build_index()
+_learned = None
+_learned_lock = threading.Lock()
+
+def categorize(product_name):
+    """Returns the best matching category name, or None if nothing in the index applies."""
+    toks = _tokens(product_name)
+    best, best_len = None, 0
+    for i, tok in enumerate(toks):
+        for phrase, category in _INDEX.get(tok, []):
+            n = len(phrase)
+            if n > best_len and tuple(toks[i:i + n]) == phrase:
+                best, best_len = category, n
+                break
+    return best
+
+def rate_for(category, country):
+    rules = TAX_RULES.get(country)
+    if not rules or not category: return None
+    rate = rules["rates"].get(category, rules["standard"])
+    pretty = category.replace("_", " ").title()
+    return {
+        "rate": rate,
+        "reason": f"{pretty} slab in {country} is {int(round(rate * 100))}% {rules['label']}",
+        "category": category,
+        "source": "rules",
+    }
+
+def _learned_key(product_name, country):
+    return f"{country}|{' '.join(_tokens(product_name))}"
+
+def _load_learned():
+    global _learned
+    if _learned is None:
+        try:
+            with open(LEARNED_PATH) as f: _learned = json.load(f)
+        except (OSError, ValueError):
+            _learned = {}
+    return _learned
+
+def learn(product_name, country, tax_info):
+    """Persist an LLM answer so the next lookup for this product stays local."""
+    learn_many([(product_name, country, tax_info)])
+
+def learn_many(entries):
+    """learn() for many (product_name, country, tax_info) answers at once, with one rewrite of the file."""
+    if not entries: return
+    with _learned_lock:
+        learned = _load_learned()
+        for product_name, country, tax_info in entries:
+            learned[_learned_key(product_name, country)] = {
+                "rate": tax_info.get("rate"), "reason": tax_info.get("reason"), "source": "learned"
+            }
+        folder = os.path.dirname(LEARNED_PATH)
+        if folder: os.makedirs(folder, exist_ok=True)
+        tmp = LEARNED_PATH + ".tmp"
+        with open(tmp, "w") as f: json.dump(learned, f, indent=1)
+        os.replace(tmp, LEARNED_PATH)
+
+def classify(product_name, country, category=None):
+    """
+    Local tax lookup: learned mappings first, then the rules index. None means 'ask the LLM'.
+    Pass a precomputed `category` to skip re-categorizing (multi-market scans categorize once).
+    """
+    with _learned_lock:
+        hit = _load_learned().get(_learned_key(product_name, country))
+    # Entries learned before answers were validated may lack a usable rate: ignore them
+    if hit and isinstance(hit.get("rate"), (int, float)) and 0 <= hit["rate"] <= 1: return dict(hit)
+    return rate_for(category or categorize(product_name), country)
+
+def describe_rules(country=None):
+    """The rules table (one country, or all) rendered as prompt prose, so the LLM and the index never disagree."""
+    lines = []
+    for name, rules in TAX_RULES.items():
+        if country and name != country: continue
+        lines.append(f"[{name.upper()}]")
+        lines.append(f"- Standard Goods: {int(round(rules['standard'] * 100))}%")
+        for category, rate in rules["rates"].items():
+            examples = ", ".join(CATEGORIES[category][:3])
+            lines.append(f"- {category.replace('_', ' ').title()} ({examples}): {int(round(rate * 100))}%")
+    return "\n    ".join(lines)
@@ -0,0 +1,275 @@
+"""
+Per-scan tracing: wall time, provider, retries, tokens, estimated cost, cache hits
+and payload size for every agent call.
+
+    with telemetry.scan(product, market) as trace:
+        ...  # any @traced agent called here (or in a thread started via copy_context) lands in trace
+
+Finished scans are appended to metrics/scans.jsonl, and process-wide counters are
+rewritten to metrics/metrics.<pid>.prom in Prometheus text format (node-exporter textfile
+style). Each process (dashboard, job workers, batch) writes its own file and labels its
+series with pid, so totals across processes are a sum() away and never overwrite each other.
+"""
+import os
+import json
+import time
+import inspect
+import tempfile
+import threading
+import functools
+import contextvars
+from contextlib import contextmanager
+
+METRICS_DIR = os.getenv("METRICS_DIR", "metrics")
+
+# USD per 1M tokens (input, output)
+LLM_PRICING = {
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+}
+# USD per billable request for non-token providers
+CALL_PRICING = {
+    "serper": 0.001,
+}
+
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+_totals_lock = threading.Lock()
+_export_lock = threading.Lock()
+_totals = {}  # (metric, labels tuple) -> value
+_gauges = {}  # (metric, labels tuple) -> latest value
+
+class Trace:
+    def __init__(self, product, market):
+        self.product = product
+        self.market = market
+        self.started = time.time()
+        self.t0 = time.perf_counter()
+        self.spans = []
+        self.lock = threading.Lock()
+        self.elapsed = None
+
+    def add(self, span):
+        with self.lock: self.spans.append(span)
+
+    def to_dict(self):
+        with self.lock: spans = [dict(s) for s in self.spans]
+        return {
+            "product": self.product, "market": self.market, "started_at": self.started,
+            "elapsed_s": self.elapsed, "spans": spans,
+            "cost_usd": round(sum(s.get("cost_usd", 0) for s in spans), 6),
+            "prompt_tokens": sum(s.get("prompt_tokens", 0) for s in spans),
+            "completion_tokens": sum(s.get("completion_tokens", 0) for s in spans),
+        }
+
+def current_trace():
+    return _current_trace.get()
+
+@contextmanager
+def scan(product, market):
+    """Opens a trace for one scan. Nested calls reuse the outer trace (and only the outer one exports)."""
+    existing = _current_trace.get()
+    if existing is not None:
+        yield existing
+        return
+    trace = Trace(product, market)
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        trace.elapsed = round(time.perf_counter() - trace.t0, 4)
+        _current_trace.reset(token)
+        export(trace)
+
+def _payload_size(value):
+    try: return len(json.dumps(value, default=str))
+    except Exception: return len(str(value))
+
+def _open_span(name, provider):
+    trace = _current_trace.get()
+    span = {
+        "agent": name, "provider": provider, "thread": threading.current_thread().name,
+        "start_s": round(time.perf_counter() - trace.t0, 4) if trace else 0.0,
+        "retries": 0, "prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0,
+        "cache_hits": 0, "cache_misses": 0, "calls": 0, "error": None,
+        "coalesced": 0, "throttle_wait_s": 0.0, "circuit_skips": 0,
+    }
+    return trace, span, time.perf_counter()
+
+def _close_span(trace, span, t_start, result=None, error=None):
+    span["duration_s"] = round(time.perf_counter() - t_start, 4)
+    span["end_s"] = round(span["start_s"] + span["duration_s"], 4)
+    span["payload_bytes"] = _payload_size(result) if result is not None else 0
+    if error is not None: span["error"] = repr(error)
+    _accumulate(span)
+    if trace is not None: trace.add(span)
+
+def traced(name, provider=None):
+    """Decorator recording one span per call. Works for plain functions and generators."""
+    def wrap(fn):
+        if inspect.isgeneratorfunction(fn):
+            @functools.wraps(fn)
+            def gen_wrapper(*args, **kwargs):
+                trace, span, t_start = _open_span(name, provider)
+                gen = fn(*args, **kwargs)
+                last, error = None, None
+                try:
+                    while True:
+                        # The span is only "current" while the generator body runs, not while the consumer does
+                        token = _current_span.set(span)
+                        try:
+                            item = next(gen)
+                        except StopIteration:
+                            break
+                        finally:
+                            _current_span.reset(token)
+                        last = item
+                        yield item
+                except GeneratorExit:
+                    gen.close()  # Consumer stopped early; not an error
+                    raise
+                except BaseException as e:
+                    error = e
+                    gen.close()
+                    raise
+                finally:
+                    _close_span(trace, span, t_start, last, error)
+            return gen_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            trace, span, t_start = _open_span(name, provider)
+            token = _current_span.set(span)
+            result, error = None, None
+            try:
+                result = fn(*args, **kwargs)
+                return result
+            except BaseException as e:
+                error = e
+                raise
+            finally:
+                _current_span.reset(token)
+                _close_span(trace, span, t_start, result, error)
+        return wrapper
+    return wrap
+
+# --- Hooks called from cache / clients / agents ---
+
+def note_cache(namespace, hit):
+    span = _current_span.get()
+    if span is not None: span["cache_hits" if hit else "cache_misses"] += 1
+    _incr("cache_requests_total", (("namespace", namespace), ("result", "hit" if hit else "miss")))
+
+def note_retry(provider=None):
+    span = _current_span.get()
+    if span is not None: span["retries"] += 1
+    _incr("provider_retries_total", (("provider", provider or "unknown"),))
+
+def note_coalesced(kind):
+    """This call piggybacked on an identical one already in flight (singleflight.py)."""
+    span = _current_span.get()
+    if span is not None: span["coalesced"] += 1
+    _incr("coalesced_requests_total", (("kind", str(kind)),))
+
+def note_throttle(provider, waited_s):
+    """Time spent queued behind a provider rate limit (throttle.py)."""
+    span = _current_span.get()
+    if span is not None: span["throttle_wait_s"] = round(span["throttle_wait_s"] + waited_s, 4)
+    _incr("provider_throttle_seconds_total", (("provider", provider),), waited_s)
+
+def note_provider_result(endpoint, ok, seconds):
+    """One attempt against a provider endpoint, as seen by health.py."""
+    labels = (("endpoint", endpoint), ("result", "ok" if ok else "error"))
+    _incr("provider_requests_total", labels)
+    _incr("provider_request_seconds_total", labels, seconds)
+
+def note_circuit(endpoint, event):
+    """Circuit breaker transitions ('open', 'half_open', 'closed') and calls skipped while open."""
+    span = _current_span.get()
+    if span is not None and event == "skipped": span["circuit_skips"] += 1
+    _incr("provider_circuit_events_total", (("endpoint", endpoint), ("event", event)))
+
+def note_call(provider):
+    """One billable request to a non-token provider (Serper, Apify)."""
+    span = _current_span.get()
+    cost = CALL_PRICING.get(provider, 0.0)
+    if span is not None:
+        span["calls"] += 1
+        span["cost_usd"] = round(span["cost_usd"] + cost, 6)
+    _incr("provider_calls_total", (("provider", provider),))
+
+def note_llm_usage(model, usage):
+    """usage: LangChain usage_metadata dict ({'input_tokens', 'output_tokens'}) or None."""
+    if not usage: return
+    prompt = int(usage.get("input_tokens", 0) or 0)
+    completion = int(usage.get("output_tokens", 0) or 0)
+    price_in, price_out = LLM_PRICING.get(model, LLM_PRICING["gpt-4o"])
+    cost = (prompt * price_in + completion * price_out) / 1_000_000
+    span = _current_span.get()
+    if span is not None:
+        span["calls"] += 1
+        span["prompt_tokens"] += prompt
+        span["completion_tokens"] += completion
+        span["cost_usd"] = round(span["cost_usd"] + cost, 6)
+    _incr("llm_tokens_total", (("model", model), ("kind", "prompt")), prompt)
+    _incr("llm_tokens_total", (("model", model), ("kind", "completion")), completion)
+    _incr("llm_cost_usd_total", (("model", model),), cost)
+
+# --- Export ---
+
+def _incr(metric, labels, value=1):
+    with _totals_lock:
+        _totals[(metric, labels)] = _totals.get((metric, labels), 0) + value
+
+def set_gauge(metric, labels, value):
+    with _totals_lock:
+        _gauges[(metric, labels)] = value
+
+def _accumulate(span):
+    labels = (("agent", span["agent"]),)
+    _incr("agent_calls_total", labels)
+    _incr("agent_seconds_total", labels, span["duration_s"])
+    if span["error"]: _incr("agent_errors_total", labels)
+
+def prometheus_text(extra_labels=()):
+    with _totals_lock:
+        items = [(key, value, "counter") for key, value in sorted(_totals.items())]
+        items += [(key, value, "gauge") for key, value in sorted(_gauges.items())]
+    lines, typed = [], set()
+    for (metric, labels), value, kind in items:
+        name = f"market_analyst_{metric}"
+        if name not in typed:
+            lines.append(f"# TYPE {name} {kind}")
+            typed.add(name)
+        label_str = ",".join(f'{k}="{v}"' for k, v in (*labels, *extra_labels))
+        lines.append(f"{name}{{{label_str}}} {value:g}" if label_str else f"{name} {value:g}")
+    return "\n".join(lines) + "\n"
+
+def metrics_path(metrics_dir=None):
+    """This process's Prometheus file."""
+    return os.path.join(metrics_dir or METRICS_DIR, f"metrics.{os.getpid()}.prom")
+
+def export(trace, metrics_dir=None):
+    metrics_dir = metrics_dir or METRICS_DIR
+    _incr("scans_total", (("market", trace.market),))
+    _incr("scan_seconds_total", (("market", trace.market),), trace.elapsed or 0)
+    tmp = None
+    try:
+        with _export_lock:
+            os.makedirs(metrics_dir, exist_ok=True)
+            with open(os.path.join(metrics_dir, "scans.jsonl"), "a", encoding="utf-8") as f:
+                f.write(json.dumps(trace.to_dict(), default=str) + "\n")
+            # A unique temp file (not *.prom, so collectors skip it), then an atomic rename over our own file
+            with tempfile.NamedTemporaryFile("w", dir=metrics_dir, prefix=".metrics.", suffix=".tmp",
+                                             delete=False, encoding="utf-8") as f:
+                tmp = f.name
+                f.write(prometheus_text((("pid", os.getpid()),)))
+            os.replace(tmp, metrics_path(metrics_dir))
+            tmp = None
+    except OSError as e:
+        print(f"⚠️ Metrics export failed: {e}")
+    finally:
+        if tmp:
+            try: os.remove(tmp)
+            except OSError: pass
@@ -1,8 +1,7 @@
 import os
-from dotenv import load_dotenv
 
-# Load the keys from the .env file
-load_dotenv()
+# Importing config loads the keys from the .env file
+import config
 
 print("--- SYSTEM CHECK ---")
 
@@ -0,0 +1,54 @@
+"""
+Shared setup: the repo root on sys.path, and every on-disk store pointed at a throwaway
+directory *before* any pipeline module is imported (they read their paths at import time).
+Providers are never called for real: tests that scan install fakes.py first.
+"""
+import os
+import sys
+import tempfile
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import benchmark
+
+benchmark.isolate(tempfile.mkdtemp(prefix="market-analyst-tests-"), cache_on=False)
+
+@pytest.fixture
+def fresh_store(tmp_path, monkeypatch):
+    """fresh_store(module) points a SQLite-backed module (STORE_PATH + thread-local conn) at an empty file."""
+    def point(module, filename=None):
+        monkeypatch.setattr(module, "STORE_PATH", str(tmp_path / (filename or f"{module.__name__}.sqlite")))
+        monkeypatch.setattr(module, "_local", threading.local())
+        return module
+    return point
+
+@pytest.fixture
+def llm_answer(monkeypatch):
+    """llm_answer(content) makes every clients.get_llm() model reply `content`; returns it (for .calls)."""
+    import clients
+    import fakes
+
+    class Answer:
+        def __init__(self, content):
+            self.content, self.calls = content, 0
+        def invoke(self, prompt, **kwargs):
+            self.calls += 1
+            return fakes.FakeMessage(self.content)
+
+    def install(content):
+        llm = Answer(content)
+        monkeypatch.setattr(clients, "get_llm", lambda *a, **k: llm)
+        return llm
+    return install
+
+@pytest.fixture
+def cache_on(tmp_path, monkeypatch):
+    """The response cache switched on, in an empty file (the suite otherwise runs with it off)."""
+    import cache
+    monkeypatch.setattr(cache, "CACHE_ENABLED", True)
+    monkeypatch.setattr(cache, "CACHE_PATH", str(tmp_path / "responses.sqlite"))
+    monkeypatch.setattr(cache, "_local", threading.local())
+    return cache
@@ -0,0 +1,84 @@
+import json
+
+import pytest
+
+import batch
+import fakes
+import pipeline
+
+@pytest.fixture(autouse=True)
+def offline():
+    fakes.install(llm=fakes.Latency(0), serper=fakes.Latency(0), apify=fakes.Latency(0))
+
+@pytest.fixture
+def ideas(tmp_path):
+    path = tmp_path / "ideas.csv"
+    path.write_text("product,country\nSmart Ring,UK\nAir Fryer,US\nYoga Mat,INDIA\n")
+    return str(path)
+
+def _run(ideas, tmp_path):
+    output = str(tmp_path / "out.jsonl")
+    counts = batch.run_batch(ideas, output, workers=2)
+    with open(output + ".ckpt") as f: checkpoint = f.read().splitlines()
+    return counts, checkpoint, output
+
+def test_resume_skips_rows_already_checkpointed(ideas, tmp_path):
+    counts, checkpoint, output = _run(ideas, tmp_path)
+    assert counts == {"ok": 3, "error": 0, "skipped": 0}
+    assert len(checkpoint) == 3
+
+    counts, _, _ = _run(ideas, tmp_path)
+    assert counts == {"ok": 0, "error": 0, "skipped": 3}
+    with open(output) as f: assert len(f.readlines()) == 3  # nothing re-scored
+
+@pytest.mark.parametrize("breakage", ["degraded", "error_verdict"])
+def test_failed_or_degraded_rows_are_not_checkpointed(ideas, tmp_path, monkeypatch, breakage):
+    real_scan = pipeline.run_scan
+    def flaky_scan(product, config, **kwargs):
+        scan = real_scan(product, config, **kwargs)
+        if product == "Air Fryer":
+            if breakage == "degraded": scan["degraded"] = ["competitor_data"]
+            else: scan["verdict"] = {"verdict_tag": "ERROR", "recommendation": "OpenAI outage"}
+        return scan
+    monkeypatch.setattr(pipeline, "run_scan", flaky_scan)
+
+    counts, checkpoint, output = _run(ideas, tmp_path)
+    assert counts == {"ok": 2, "error": 1, "skipped": 0}
+    assert not any(key.startswith("air fryer") for key in checkpoint)
+    with open(output) as f: rows = [json.loads(line) for line in f]
+    assert [r["status"] for r in rows if r["product"] == "Air Fryer"] == ["error"]
+
+    # Provider back: the resume retries only the failed row
+    monkeypatch.setattr(pipeline, "run_scan", real_scan)
+    counts, checkpoint, _ = _run(ideas, tmp_path)
+    assert counts == {"ok": 1, "error": 0, "skipped": 2}
+    assert len(checkpoint) == 3
+
+def test_prewarm_uses_the_names_run_scan_will_resolve(fresh_store, monkeypatch):
+    import agents
+    import cache
+    import product_keys
+    import validator
+    fresh_store(product_keys)
+    monkeypatch.setattr(product_keys, "_index", None)
+    monkeypatch.setattr(cache, "CACHE_ENABLED", True)
+    seen = []
+    monkeypatch.setattr(validator, "get_market_guardrails_batch", lambda items: seen.extend(n for n, _ in items))
+    monkeypatch.setattr(agents, "lookup_tax_rates_batch", lambda items: None)
+
+    product_keys.resolve("Smart Ring")
+    batch.prewarm([{"product": "smart rings", "country": "UK"}, {"product": "Yoga Mat", "country": "INDIA"}])
+    assert seen == ["Smart Ring", "Yoga Mat"]
+
+@pytest.mark.parametrize("flag, given, kept", [("--openai-rpm", "requests", "tokens"), ("--openai-tpm", "tokens", "requests")])
+def test_one_rate_flag_keeps_the_other_limit_from_the_env(monkeypatch, flag, given, kept):
+    import throttle
+    monkeypatch.setattr(throttle, "_buckets", {})
+    monkeypatch.setenv("OPENAI_RPM", "30")
+    monkeypatch.setenv("OPENAI_TPM", "60000")
+    monkeypatch.setattr(batch, "run_batch", lambda *a, **k: {"ok": 0, "error": 0, "skipped": 0})
+    before = throttle.per_minute("openai", kept)
+
+    assert batch.main(["ideas.csv", flag, "120"]) == 0
+    assert throttle.per_minute("openai", given) == pytest.approx(120)
+    assert throttle.per_minute("openai", kept) == pytest.approx(before) == pytest.approx(30 if kept == "requests" else 60000)
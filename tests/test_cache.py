@@ -0,0 +1,37 @@
+import pytest
+
+import cache
+import price_store
+import scraper
+
+@pytest.fixture
+def store(cache_on):
+    return cache_on
+
+def test_refreshing_recomputes_and_replaces_the_cached_value(store):
+    answers = iter(["old", "new"])
+    compute = lambda: next(answers)
+    assert store.cached("trends", "k", compute) == "old"
+    assert store.cached("trends", "k", compute) == "old"
+    with store.refreshing():
+        assert store.bypassed()
+        assert store.cached("trends", "k", compute) == "new"
+    assert not store.bypassed()
+    assert store.get("trends", "k") == "new"
+
+def test_refreshing_false_changes_nothing(store):
+    store.set("trends", "k", "old")
+    with store.refreshing(False):
+        assert store.get("trends", "k") == "old"
+
+def test_refresh_skips_recent_prices_in_the_store(store, fresh_store, monkeypatch):
+    fresh_store(price_store)
+    monkeypatch.setattr(price_store, "FRESH_SECS", 3600)
+    price_store.record("smart ring", "uk", "Google", [{"title": "Old ring", "price": 100.0}])
+    scrape = lambda: [{"title": "New ring", "price": 120.0}]
+
+    served = scraper._store_or_scrape("Google", "smart ring", "uk", "shopping", "k", scrape)
+    assert served == [{"title": "Old ring", "price": 100.0}]
+    with cache.refreshing():
+        served = scraper._store_or_scrape("Google", "smart ring", "uk", "shopping", "k", scrape)
+    assert served == [{"title": "New ring", "price": 120.0}]
@@ -0,0 +1,17 @@
+from config import get_country_config
+from economics import price_list_economics, scalar_waterfall, LOGISTICS_PCT
+
+PRODUCTS = [{"title": "A", "price": 100}, {"title": "B", "price": 250}, {"title": "C"}]
+
+def test_price_list_uses_the_markets_logistics_share():
+    pct = get_country_config("AUSTRALIA")["logistics_pct"]
+    assert pct != LOGISTICS_PCT
+    rows = price_list_economics(PRODUCTS, 0.1, pct)
+    assert rows["logistics_cost"].tolist() == [int(100 * pct), int(250 * pct), 0]
+
+def test_price_list_matches_the_scalar_waterfall():
+    rows = price_list_economics(PRODUCTS, 0.18, 0.12)
+    assert rows["net_profit"][1] == scalar_waterfall(250, 0.18, 0.12)["net_profit"]
+
+def test_price_list_defaults_to_the_global_logistics_share():
+    assert price_list_economics(PRODUCTS, 0.1)["logistics_cost"][0] == int(100 * LOGISTICS_PCT)
@@ -0,0 +1,20 @@
+import os
+import sys
+import json
+import subprocess
+
+import fakes
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _verdict_in_new_process(hash_seed):
+    code = "import json, fakes; print(json.dumps(fakes.fake_verdict('Smart Ring | UK')))"
+    env = dict(os.environ, PYTHONHASHSEED=str(hash_seed))
+    return json.loads(subprocess.run([sys.executable, "-c", code], cwd=REPO, env=env,
+                                     capture_output=True, text=True, check=True).stdout)
+
+def test_fake_verdict_is_the_same_in_every_process():
+    assert _verdict_in_new_process(1) == _verdict_in_new_process(2) == fakes.fake_verdict("Smart Ring | UK")
+
+def test_fake_verdict_differs_per_prompt():
+    assert fakes.fake_verdict("Smart Ring | UK") != fakes.fake_verdict("Yoga Mat | INDIA")
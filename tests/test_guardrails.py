@@ -0,0 +1,26 @@
+import pytest
+
+import scraper
+import validator
+from config import get_country_config
+
+@pytest.mark.parametrize("content", [
+    '{"min_price": 50}', '{"min_price": 90, "max_price": 10}', '{"min_price": -5, "max_price": 10}', 'not json',
+])
+def test_unusable_range_falls_back(llm_answer, content):
+    llm_answer(content)
+    assert validator.get_market_guardrails("Smart Ring", get_country_config("UK")) == validator.FALLBACK_GUARDRAILS
+
+def test_valid_range_is_returned(llm_answer):
+    llm_answer('```json\n{"min_price": 40, "max_price": 400}\n```')
+    assert validator.get_market_guardrails("Smart Ring", get_country_config("UK")) == {"min_price": 40, "max_price": 400}
+
+def test_estimate_from_zero_guardrails_has_a_zero_average():
+    estimate = scraper.estimate_from_guardrails({"min_price": 0, "max_price": 0})
+    assert estimate["average_price"] == 0
+    assert estimate["price_stats"] is None
+
+def test_estimate_is_the_midpoint_of_the_range():
+    estimate = scraper.estimate_from_guardrails({"min_price": 40, "max_price": 400})
+    assert estimate["average_price"] == 220
+    assert estimate["price_stats"]["count"] == 1
@@ -0,0 +1,111 @@
+import pytest
+
+import deadline
+import health
+
+class Clock:
+    """Stands in for health.time; only moves when advance() or sleep() is called."""
+    def __init__(self):
+        self.now, self.slept = 1000.0, []
+    def monotonic(self):
+        return self.now
+    perf_counter = monotonic
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+    def advance(self, seconds):
+        self.now += seconds
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(health, "time", clock)
+    monkeypatch.setattr(health, "FAILURE_THRESHOLD", 3)
+    monkeypatch.setattr(health, "COOLDOWN_SECS", 30.0)
+    monkeypatch.setattr(health, "MAX_COOLDOWN_SECS", 100.0)
+    monkeypatch.setattr(health, "_endpoints", {})
+    return clock
+
+class Transient(Exception):
+    status_code = 503
+
+def _fail(endpoint="serper/shopping", error=None):
+    with pytest.raises(type(error or Transient())):
+        with health.track(endpoint): raise error or Transient()
+
+def _ok(endpoint="serper/shopping"):
+    with health.track(endpoint): pass
+
+def _state(endpoint="serper/shopping"):
+    return health._endpoints[endpoint].state
+
+def test_circuit_opens_after_consecutive_failures_and_fails_fast(clock):
+    _fail(); _fail(); _ok(); _fail(); _fail()
+    assert _state() == "closed"  # The success reset the run
+    _fail()
+    assert _state() == "open"
+    with pytest.raises(health.CircuitOpenError):
+        with health.track("serper/shopping"): pytest.fail("call made through an open circuit")
+    assert health.snapshot()[0]["retry_in_s"] == 30.0
+
+def test_half_open_lets_one_probe_through_and_success_closes(clock):
+    for _ in range(3): _fail()
+    clock.advance(29.9)
+    assert not health.allow("serper/shopping")
+    clock.advance(0.2)
+    assert health.allow("serper/shopping") and _state() == "half_open"
+    assert not health.allow("serper/shopping")  # Only one probe at a time
+    health.record("serper/shopping", True, 0.1)
+    assert _state() == "closed" and health._endpoints["serper/shopping"].cooldown == 30.0
+
+def test_failed_probe_reopens_for_twice_as_long_up_to_the_cap(clock):
+    for _ in range(3): _fail()
+    cooldowns = []
+    for _ in range(4):
+        clock.advance(health._endpoints["serper/shopping"].cooldown)
+        _fail()  # The half-open probe fails
+        assert _state() == "open"
+        cooldowns.append(health._endpoints["serper/shopping"].cooldown)
+    assert cooldowns == [60.0, 100.0, 100.0, 100.0]
+
+def test_abandoned_calls_are_not_the_providers_fault(clock):
+    for _ in range(3): _fail("apify/actor", health.Abandoned("scan gave up"))
+    assert _state("apify/actor") == "closed" and not health._endpoints["apify/actor"].outcomes
+    for _ in range(3): _fail("apify/actor")
+    clock.advance(30)
+    _fail("apify/actor", health.Abandoned("scan gave up"))  # The probe is released, not counted
+    assert _state("apify/actor") == "half_open" and health.allow("apify/actor")
+
+def test_backoff_is_full_jitter_under_the_cap(monkeypatch):
+    monkeypatch.setattr(health.random, "uniform", lambda low, high: (low, high))
+    assert [health.backoff(a) for a in range(6)] == [(0, 0.5), (0, 1.0), (0, 2.0), (0, 4.0), (0, 8.0), (0, 8.0)]
+    monkeypatch.undo()
+    samples = [health.backoff(3) for _ in range(500)]
+    assert 0 <= min(samples) and max(samples) <= 4.0 and max(samples) > 2.0
+
+def test_retry_retries_transient_errors_only(clock):
+    attempts = []
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3: raise Transient()
+        return "ok"
+    assert health.retry(flaky, retries=2) == "ok" and len(clock.slept) == 2
+
+    attempts.clear()
+    def broken(): attempts.append(1); raise ValueError("bad request")
+    with pytest.raises(ValueError): health.retry(broken, retries=5)
+    assert len(attempts) == 1
+
+def test_retry_never_sleeps_past_the_deadline(clock, monkeypatch):
+    monkeypatch.setattr(health, "backoff", lambda attempt: 5.0)
+    def down(): raise Transient()
+    with deadline.scope(2), pytest.raises(Transient):
+        health.retry(down, retries=3)
+    assert clock.slept == []
+
+@pytest.mark.parametrize("error, transient", [
+    (Transient(), True), (TimeoutError(), True), (type("RateLimitError", (Exception,), {})(), True),
+    (ValueError(), False), (type("E", (Exception,), {"status_code": 404})(), False),
+])
+def test_is_transient(error, transient):
+    assert health.is_transient(error) == transient
@@ -0,0 +1,22 @@
+import pytest
+
+import jobs
+import product_keys
+
+@pytest.fixture(autouse=True)
+def stores(fresh_store, monkeypatch):
+    fresh_store(jobs)
+    fresh_store(product_keys)
+    monkeypatch.setattr(product_keys, "_index", None)
+
+def test_resubmitting_an_active_scan_returns_the_same_job():
+    first = jobs.submit("Smart Ring", "uk")
+    assert jobs.submit("smart rings", "UK") == first
+    assert jobs.get(first)["force_refresh"] == 0
+
+def test_refresh_never_joins_a_plain_scan():
+    plain = jobs.submit("Smart Ring", "UK")
+    forced = jobs.submit("Smart Ring", "UK", force_refresh=True)
+    assert forced != plain and jobs.get(forced)["force_refresh"] == 1
+    assert jobs.submit("Smart Ring", "UK", force_refresh=True) == forced
+    assert jobs.submit("Smart Ring", "UK") == plain
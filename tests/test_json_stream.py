@@ -0,0 +1,90 @@
+import json
+import random
+
+import pytest
+
+from json_stream import IncrementalJSONParser
+
+VERDICT = {
+    "verdict_tag": "🟡 ENTER \"CAUTIOUSLY\"",
+    "final_score": 7.25,
+    "strategic_thesis": "Demand is real {but} crowded; see C:\\path and a \\\"quote\\\".",
+    "breakdown": {
+        "demand": {"total": 8, "reason": "Rising \"smart ring\" searches", "signals": {"trend": "up"}},
+        "competition": {"total": 6, "reason": "Brands: [Oura, Ultrahuman]"},
+    },
+    "pros": ["Margin", "Low returns"],
+    "financials": {"net_margin_pct": -3, "risk": None, "ok": True},
+}
+TEXT = "```json\n" + json.dumps(VERDICT, ensure_ascii=False, indent=1) + "\n```"
+
+def _parse(chunks, max_depth=2):
+    parser = IncrementalJSONParser(max_depth=max_depth)
+    events = []
+    for chunk in chunks:
+        events += parser.feed(chunk)
+    return parser, events
+
+def _split(text, seed):
+    rng, chunks, i = random.Random(seed), [], 0
+    while i < len(text):
+        n = rng.randint(1, 12)
+        chunks.append(text[i:i + n])
+        i += n
+    return chunks
+
+def test_whole_text_events_and_result():
+    parser, events = _parse([TEXT])
+    assert parser.done and parser.result == VERDICT
+    assert dict(events) == {
+        ("verdict_tag",): VERDICT["verdict_tag"],
+        ("final_score",): 7.25,
+        ("strategic_thesis",): VERDICT["strategic_thesis"],
+        ("breakdown", "demand"): VERDICT["breakdown"]["demand"],
+        ("breakdown", "competition"): VERDICT["breakdown"]["competition"],
+        ("breakdown",): VERDICT["breakdown"],
+        ("pros",): ["Margin", "Low returns"],
+        ("financials", "net_margin_pct"): -3,
+        ("financials", "risk"): None,
+        ("financials", "ok"): True,
+        ("financials",): VERDICT["financials"],
+    }
+
+@pytest.mark.parametrize("seed", range(25))
+def test_chunk_boundaries_never_change_the_events(seed):
+    assert _parse(_split(TEXT, seed))[1] == _parse([TEXT])[1]
+
+def test_one_character_at_a_time():
+    parser, events = _parse(list(TEXT))
+    assert events == _parse([TEXT])[1] and parser.result == VERDICT
+
+def test_number_split_across_chunks_is_not_emitted_early():
+    parser = IncrementalJSONParser()
+    assert parser.feed('{"final_score": 7') == []
+    assert parser.feed('.25') == []
+    assert parser.feed(', "x"') == [(("final_score",), 7.25)]
+
+def test_escaped_quote_split_at_the_backslash():
+    parser = IncrementalJSONParser()
+    assert parser.feed('{"tag": "say \\') == []
+    assert parser.feed('"hi\\"", "k": 1}') == [(("tag",), 'say "hi"'), (("k",), 1)]
+    assert parser.result == {"tag": 'say "hi"', "k": 1}
+
+def test_escaped_quotes_in_keys():
+    parser, events = _parse(['{"a \\"b\\"": {"c": 1}}'])
+    assert events == [(('a "b"', "c"), 1), (('a "b"',), {"c": 1})]
+
+def test_members_deeper_than_max_depth_are_not_emitted():
+    _, events = _parse([TEXT], max_depth=1)
+    assert all(len(path) == 1 for path, _ in events)
+    assert (("breakdown",), VERDICT["breakdown"]) in events
+
+def test_nested_member_is_emitted_when_its_brace_closes():
+    parser = IncrementalJSONParser()
+    assert parser.feed('{"breakdown": {"demand": {"total": 8, "signals": {"a": 1}') == []
+    assert parser.feed('}') == [(("breakdown", "demand"), {"total": 8, "signals": {"a": 1}})]
+
+def test_trailing_text_after_the_object_is_ignored():
+    parser = IncrementalJSONParser()
+    parser.feed('{"a": 1}\n``` and {"b": 2}')
+    assert parser.result == {"a": 1}
@@ -0,0 +1,118 @@
+import time
+import threading
+
+import pytest
+
+import brain
+import cache
+import clients
+import deadline
+import fakes
+import health
+import pipeline
+import throttle
+from config import get_country_config
+
+def _slow(seconds, value):
+    def node(**_):
+        time.sleep(seconds)
+        return value
+    return node
+
+def test_node_over_its_budget_is_replaced_by_its_fallback():
+    graph = {"fast": (lambda: 1, []), "slow": (_slow(2, "late"), []), "after": (lambda slow: slow, ["slow"])}
+    started = time.monotonic()
+    results = pipeline.run_graph(graph, budgets={"slow": 0.2}, fallbacks={"slow": lambda: "fallback"})
+    assert time.monotonic() - started < 1.5
+    assert results == {"fast": 1, "slow": "fallback", "after": "fallback", "degraded": ["slow"]}
+
+def test_scan_budget_caps_every_node():
+    graph = {"slow": (_slow(2, "late"), [])}
+    results = pipeline.run_graph(graph, budget_secs=0.2, budgets={"slow": 30}, fallbacks={"slow": lambda: "fallback"})
+    assert results["slow"] == "fallback"
+
+def test_failing_node_uses_its_fallback_with_the_same_inputs():
+    def boom(x): raise RuntimeError("provider down")
+    graph = {"x": (lambda: 2, []), "y": (boom, ["x"])}
+    results = pipeline.run_graph(graph, fallbacks={"y": lambda x: x * 10})
+    assert results["y"] == 20 and results["degraded"] == ["y"]
+
+def test_node_without_a_fallback_still_raises():
+    def boom(): raise RuntimeError("provider down")
+    with pytest.raises(RuntimeError):
+        pipeline.run_graph({"y": (boom, [])})
+
+def test_verdict_deadline_never_passes_the_scan_budget():
+    now = time.monotonic()
+    assert pipeline.verdict_deadline(now - 80, budget_secs=90) == pytest.approx(now + 10, abs=0.5)
+    assert pipeline.verdict_deadline(now, budget_secs=90) == pytest.approx(now + pipeline.AGENT_BUDGETS["verdict"], abs=0.5)
+    assert pipeline.verdict_deadline(now - 1000, budget_secs=0) == pytest.approx(now + pipeline.AGENT_BUDGETS["verdict"], abs=0.5)
+
+def _stream(median_s):
+    fake = fakes.install(llm=fakes.Latency(median_s, sigma=0), serper=fakes.Latency(0), apify=fakes.Latency(0))
+    config = get_country_config("UK")
+    scan = pipeline.run_scan("Smart Ring", config, include_verdict=False)
+    events = brain.stream_viability_score(
+        "Smart Ring", config, scan["market_data"], scan["competitor_data"], scan["sourcing_data"], scan["tax_info"]
+    )
+    return fake["llm"][brain.SYNTHESIS_TEMPERATURE], events
+
+def test_stream_with_no_time_left_returns_the_empty_verdict_without_calling_the_llm():
+    llm, events = _stream(0)
+    calls = llm.calls
+    with deadline.scope(at=time.monotonic() - 1):
+        verdict = list(events)[-1][1]
+    assert verdict["verdict_tag"] == "ERROR" and verdict["recommendation"] == brain.SYNTHESIS_TIMEOUT
+    assert llm.calls == calls
+
+def test_slow_stream_is_cut_off_at_the_deadline():
+    llm, events = _stream(2.0)
+    started = time.monotonic()
+    with deadline.scope(0.8):
+        verdict = list(events)[-1][1]
+    assert time.monotonic() - started < 1.5
+    assert verdict["verdict_tag"] == "ERROR" and verdict["recommendation"] == brain.SYNTHESIS_TIMEOUT
+
+def test_stream_within_its_deadline_finishes_normally():
+    _, events = _stream(0)
+    with deadline.scope(5):
+        verdict = list(events)[-1][1]
+    assert verdict["verdict_tag"] != "ERROR"
+
+@pytest.fixture
+def providers(monkeypatch):
+    monkeypatch.setattr(throttle, "_slots", {})
+    monkeypatch.setattr(throttle, "_buckets", {})
+    return fakes.install(llm=fakes.Latency(0), serper=fakes.Latency(0), apify=fakes.Latency(0))
+
+def test_node_abandoned_while_queued_never_calls_the_provider(providers):
+    llm = providers["llm"][0]
+    throttle.set_concurrency("openai", 1)
+    busy = throttle.slot("openai")
+    busy.__enter__()  # Another scan holds the only OpenAI slot
+    graph = {"verdict": (lambda: cache.cached_invoke(llm, "late prompt", "synthesis"), [])}
+    try:
+        results = pipeline.run_graph(graph, budgets={"verdict": 0.2}, fallbacks={"verdict": lambda: "fallback"})
+    finally:
+        busy.__exit__(None, None, None)
+    assert results["verdict"] == "fallback"
+    time.sleep(3 * throttle.POLL_SECS)  # The abandoned worker sees the free slot, and must still not call out
+    assert llm.calls == 0
+
+def test_abandoned_caller_stops_waiting_for_the_rate_limit_and_returns_its_budget(providers):
+    throttle.set_rate("openai", requests_per_min=60)
+    throttle.wait_for_rate("openai")  # The bucket's one token: the next request owes a full second
+    cancel = threading.Event()
+    threading.Timer(0.2, cancel.set).start()
+    started = time.monotonic()
+    with deadline.scope(30, cancel=cancel), pytest.raises(health.Abandoned):
+        throttle.wait_for_rate("openai")
+    assert time.monotonic() - started < 0.6
+    assert throttle._bucket("openai", "requests").reserve(0) == 0  # The reservation was handed back
+
+def test_serper_call_is_skipped_once_the_scan_gave_up(providers):
+    cancel = threading.Event()
+    cancel.set()
+    with deadline.scope(30, cancel=cancel), pytest.raises(health.Abandoned):
+        clients.serper_post("shopping", {"q": "smart ring"})
+    assert providers["serper"].calls == 0
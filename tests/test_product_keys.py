@@ -0,0 +1,61 @@
+import pytest
+
+import product_keys
+
+@pytest.fixture
+def keys(fresh_store, monkeypatch):
+    fresh_store(product_keys)
+    monkeypatch.setattr(product_keys, "_index", None)
+    return product_keys
+
+def test_canonical_key_ignores_order_plurals_case_and_model_years():
+    key = product_keys.canonical_key("Smart Ring")
+    assert product_keys.canonical_key("smart rings") == key
+    assert product_keys.canonical_key("Smart-Ring 2024 model") == key
+    assert product_keys.canonical_key("Smart Ring (2023 edition)") == key
+    assert product_keys.canonical_key("ring, smart") == key
+
+@pytest.mark.parametrize("first, second", [("RTX 2070", "RTX 2080"), ("iPhone 2020", "iPhone")])
+def test_year_like_numbers_that_name_the_product_stay_in_the_key(first, second):
+    assert product_keys.canonical_key(first) != product_keys.canonical_key(second)
+
+def test_year_beside_another_number_is_a_model_year():
+    assert product_keys.canonical_key("iPhone 15 2023") == product_keys.canonical_key("iPhone 15")
+
+def test_resolve_keeps_numbered_products_apart(keys):
+    assert keys.resolve("RTX 2070") == "RTX 2070"
+    assert keys.resolve("RTX 2080") == "RTX 2080"
+
+def test_single_letter_variants_stay_in_the_key():
+    assert product_keys.canonical_key("USB A Cable") != product_keys.canonical_key("USB C Cable")
+
+def test_resolve_maps_spelling_variants_onto_the_first_name(keys):
+    assert keys.resolve("Smart Ring") == "Smart Ring"
+    assert keys.resolve("smart rings 2025 edition") == "Smart Ring"
+
+@pytest.mark.parametrize("first, second", [
+    ("USB C Cable", "USB A Cable"),
+    ("Wireless Earbuds", "Wireless Earbuds Pro"),
+    ("iPhone 14 Case", "iPhone 15 Case"),
+])
+def test_resolve_never_merges_near_duplicates(keys, first, second):
+    keys.resolve(first)
+    assert keys.resolve(second) == second
+
+def test_near_duplicates_are_offered_as_suggestions(keys):
+    keys.resolve("Wireless Earbuds")
+    suggestions = keys.similar("Wireless Earbuds Pro")
+    assert [name for name, _ in suggestions] == ["Wireless Earbuds"]
+    assert not keys.known("Wireless Earbuds Pro")
+
+def test_names_persist_across_processes(keys, monkeypatch):
+    keys.resolve("Standing Desk")
+    monkeypatch.setattr(product_keys, "_index", None)  # as if the process restarted
+    assert keys.resolve("standing desks") == "Standing Desk"
+
+def test_names_stored_under_an_older_key_are_rekeyed(keys):
+    conn = keys._connect()
+    conn.execute("INSERT INTO products VALUES ('rtx', 'RTX 2070', 0)")
+    conn.commit()
+    assert keys.resolve("RTX 2080") == "RTX 2080"
+    assert keys.resolve("rtx 2070") == "RTX 2070"
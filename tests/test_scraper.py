@@ -0,0 +1,71 @@
+import time
+
+import pytest
+
+import deadline
+import fakes
+import scraper
+from config import get_country_config
+
+@pytest.mark.parametrize("text, price", [
+    ("£1,299.00", 1299.0), ("1.299,00 €", 1299.0), ("1 299,00 €", 1299.0),
+    ("1.299 €", 1299.0), ("1,299", 1299.0), ("12.345.678 ₹", 12345678.0), ("₹1,29,999", 129999.0),
+    ("€ 0,99", 0.99), ("2.50 €", 2.5), ("AED 45.50", 45.5), ("$12.5", 12.5), ("1.2345", 1.2345), ("$40.", 40.0),
+    ("", None), ("Out of stock", None), (None, None),
+])
+def test_parse_price(text, price):
+    assert scraper.parse_price(text) == price
+
+@pytest.fixture
+def race(monkeypatch):
+    """race(serper_s, apify_s, ...) installs fakes with fixed latencies; returns the fakes."""
+    monkeypatch.setattr(scraper, "MERGE_GRACE_SECS", 0.5)
+    monkeypatch.setattr(scraper, "APIFY_POLL_SECS", 1)
+
+    def install(serper_s, apify_s, apify_errors=0.0, shopping_results=20):
+        return fakes.install(
+            llm=fakes.Latency(0), serper=fakes.Latency(serper_s, sigma=0),
+            apify=fakes.Latency(apify_s, sigma=0, error_rate=apify_errors), shopping_results=shopping_results,
+        )
+    return install
+
+def _race(product):
+    started = time.monotonic()
+    source, products = scraper.race_price_sources(product, "UK", "gb", "£")
+    return source, products, time.monotonic() - started
+
+def test_winner_does_not_wait_for_the_slow_source_and_its_run_is_aborted(race):
+    fake = race(serper_s=0, apify_s=5)
+    source, products, took = _race("race widget slow amazon")
+    assert source == "Google Shopping" and len(products) == 20
+    assert took < 1.5
+
+    run = next(iter(fake["apify"].runs.values()))
+    for _ in range(30):  # The losing leg notices the cancel on its next poll
+        if run.data["status"] == "ABORTED": break
+        time.sleep(0.1)
+    assert run.data["status"] == "ABORTED"
+
+def test_source_landing_within_the_grace_window_is_merged(race):
+    race(serper_s=0, apify_s=0.2)
+    source, products, _ = _race("race widget both")
+    assert source == "Amazon + Google Shopping"
+    assert len(products) == scraper.MAX_ITEMS + 20
+
+def test_failed_source_is_skipped(race):
+    race(serper_s=0.2, apify_s=0, apify_errors=1.0)
+    source, products, _ = _race("race widget failed amazon")
+    assert source == "Google Shopping" and len(products) == 20
+
+def test_thin_results_are_merged_at_the_scan_deadline(race):
+    race(serper_s=0, apify_s=5, shopping_results=2)  # Below MIN_ITEMS: no winner, so wait for the deadline
+    with deadline.scope(scraper.RACE_MARGIN_SECS + 0.5):
+        source, products, took = _race("race widget thin")
+    assert source == "Google Shopping" and len(products) == 2
+    assert took < 1.5
+
+def test_get_price_data_merges_both_sources_once(race):
+    race(serper_s=0, apify_s=0)
+    data = scraper.get_price_data("race widget merged", get_country_config("UK"), {"min_price": 1, "max_price": 10_000})
+    assert data["source"] == "Amazon + Google Shopping"
+    assert data["listing_count"] == len({p["title"] for p in data["products"]}) == scraper.MAX_ITEMS + 20
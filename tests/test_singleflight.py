@@ -0,0 +1,64 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import singleflight
+
+def _concurrently(n, fn):
+    with ThreadPoolExecutor(n) as pool:
+        futures = [pool.submit(fn) for _ in range(n)]
+    return futures
+
+def _blocking(compute_calls, release, result):
+    def compute():
+        compute_calls.append(1)
+        release.wait(5)
+        if isinstance(result, Exception): raise result
+        return result
+    return compute
+
+def _release_when_all_joined(key, followers, release):
+    def watch():
+        while singleflight.in_flight().get(key, 0) < followers: threading.Event().wait(0.005)
+        release.set()
+    threading.Thread(target=watch, daemon=True).start()
+
+def test_identical_concurrent_calls_share_one_upstream_call():
+    calls, release = [], threading.Event()
+    _release_when_all_joined(("test", "ok"), 7, release)
+    futures = _concurrently(8, lambda: singleflight.do_shared(("test", "ok"), _blocking(calls, release, {"price": 10})))
+    results = [f.result() for f in futures]
+    assert len(calls) == 1
+    assert [value for value, _ in results] == [{"price": 10}] * 8
+    assert sorted(shared for _, shared in results) == [False] + [True] * 7
+    assert ("test", "ok") not in singleflight.in_flight()
+
+def test_every_waiter_gets_the_leaders_exception():
+    calls, release = [], threading.Event()
+    _release_when_all_joined(("test", "boom"), 4, release)
+    futures = _concurrently(5, lambda: singleflight.do(("test", "boom"), _blocking(calls, release, RuntimeError("provider down"))))
+    for f in futures:
+        with pytest.raises(RuntimeError, match="provider down"): f.result()
+    assert len(calls) == 1
+
+def test_followers_get_their_own_copy():
+    flight, leader = singleflight.join(("test", "copy"))
+    follower, is_leader = singleflight.join(("test", "copy"))
+    assert leader and not is_leader and follower is flight
+    singleflight.finish(("test", "copy"), flight, {"products": [1]})
+    mine = follower.wait()
+    mine["products"].append(2)
+    assert follower.wait() == {"products": [1]}
+
+def test_nothing_is_remembered_after_the_call_finishes():
+    calls = []
+    compute = lambda: calls.append(1) or len(calls)
+    assert singleflight.do(("test", "again"), compute) == 1
+    assert singleflight.do(("test", "again"), compute) == 2
+
+def test_waiting_follower_can_time_out():
+    flight, _ = singleflight.join(("test", "slow"))
+    follower, _ = singleflight.join(("test", "slow"))
+    with pytest.raises(TimeoutError): follower.wait(timeout=0.01)
+    singleflight.finish(("test", "slow"), flight, 1)
@@ -0,0 +1,56 @@
+import json
+
+import pytest
+
+import agents
+import tax_rules
+from config import get_country_config
+
+@pytest.fixture
+def learned(tmp_path, monkeypatch):
+    monkeypatch.setattr(tax_rules, "LEARNED_PATH", str(tmp_path / "tax_learned.json"))
+    monkeypatch.setattr(tax_rules, "_learned", None)
+    return tmp_path / "tax_learned.json"
+
+def _lookup(llm_answer, content, product="quantum widget"):
+    llm_answer(content)
+    return agents.lookup_tax_rate(product, get_country_config("UK"))
+
+@pytest.mark.parametrize("content", [
+    '{"reason": "no rate given"}', '{"rate": null}', '{"rate": "unknown"}', '{"rate": 250}', '["0.2"]',
+])
+def test_unusable_answer_falls_back_and_is_not_learned(llm_answer, learned, content):
+    result = _lookup(llm_answer, content)
+    assert result == agents.tax_fallback(get_country_config("UK"))
+    assert not learned.exists()
+
+def test_valid_answer_is_normalized_and_learned(llm_answer, learned):
+    result = _lookup(llm_answer, '```json\n{"rate": 18, "reason": "Standard"}\n```')
+    assert result == {"rate": 0.18, "reason": "Standard"}
+    assert json.loads(learned.read_text())["United Kingdom|quantum widget"]["rate"] == 0.18
+    assert tax_rules.classify("quantum widget", "United Kingdom")["source"] == "learned"
+
+def test_classify_ignores_learned_entries_without_a_rate(learned):
+    learned.write_text(json.dumps({"United Kingdom|quantum widget": {"rate": None, "reason": "", "source": "learned"}}))
+    assert tax_rules.classify("quantum widget", "United Kingdom") is None
+
+@pytest.mark.parametrize("product, category", [
+    ("car charger", "electronics"), ("car seat", None), ("toy car", None),
+    ("luxury car", "luxury_vehicles"), ("sports car", "luxury_vehicles"), ("electric suv", "luxury_vehicles"),
+])
+def test_categorize_only_qualified_cars_as_luxury_vehicles(product, category):
+    assert tax_rules.categorize(product) == category
+
+def test_batch_lookup_learns_every_answer_with_one_write(learned, monkeypatch):
+    import os
+    import fakes
+    fakes.install(llm=fakes.Latency(0), serper=fakes.Latency(0), apify=fakes.Latency(0))
+    writes = []
+    replace = os.replace
+    monkeypatch.setattr(os, "replace", lambda src, dst: writes.append(dst) or replace(src, dst))
+
+    products = [f"quantum widget {i}" for i in range(5)]
+    rates = agents.lookup_tax_rates_batch([(p, get_country_config("UK")) for p in products])
+    assert [r["rate"] for r in rates] == [0.2] * 5
+    assert writes == [str(learned)]
+    assert all(tax_rules.classify(p, "United Kingdom")["source"] == "learned" for p in products)
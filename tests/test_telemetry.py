@@ -0,0 +1,17 @@
+import os
+import threading
+
+import telemetry
+
+def test_concurrent_exports_write_one_file_per_process(tmp_path, capsys):
+    for _ in range(3):
+        threads = [threading.Thread(target=telemetry.export, args=(telemetry.Trace(f"P{i}", "UK"), str(tmp_path)))
+                   for i in range(8)]
+        for t in threads: t.start()
+        for t in threads: t.join()
+
+    assert "Metrics export failed" not in capsys.readouterr().out
+    assert sorted(os.listdir(tmp_path)) == sorted(["scans.jsonl", f"metrics.{os.getpid()}.prom"])
+    assert len((tmp_path / "scans.jsonl").read_text().splitlines()) == 24
+    text = open(telemetry.metrics_path(str(tmp_path))).read()
+    assert f'market_analyst_scans_total{{market="UK",pid="{os.getpid()}"}}' in text
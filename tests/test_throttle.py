@@ -0,0 +1,76 @@
+import threading
+import time
+
+import pytest
+
+import throttle
+
+class Clock:
+    """Stands in for throttle.time: monotonic() only moves when something sleeps or advance() is called."""
+    def __init__(self):
+        self.now, self.slept = 1000.0, []
+    def monotonic(self):
+        return self.now
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+    def advance(self, seconds):
+        self.now += seconds
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(throttle, "time", clock)
+    return clock
+
+def test_bucket_bursts_up_to_capacity_then_waits_for_refill(clock):
+    bucket = throttle.TokenBucket(rate=2, capacity=3)
+    assert [bucket.reserve() for _ in range(3)] == [0, 0, 0]
+    assert bucket.reserve() == pytest.approx(0.5)
+    assert bucket.reserve() == pytest.approx(1.0)  # Queued behind the previous reservation
+
+def test_bucket_refills_at_its_rate_and_never_past_capacity(clock):
+    bucket = throttle.TokenBucket(rate=2, capacity=3)
+    for _ in range(3): bucket.reserve()
+    clock.advance(1)
+    assert bucket.reserve(2) == 0 and bucket.reserve() == pytest.approx(0.5)
+    clock.advance(60)
+    assert bucket.reserve(3) == 0 and bucket.reserve() == pytest.approx(0.5)
+
+def test_acquire_sleeps_for_the_debt_and_oversized_requests_still_pass(clock):
+    bucket = throttle.TokenBucket(rate=10, capacity=10)
+    assert bucket.acquire(25) == pytest.approx(1.5)
+    assert clock.slept == [pytest.approx(1.5)]
+
+def test_adjust_refunds_or_charges_the_real_cost(clock):
+    bucket = throttle.TokenBucket(rate=1, capacity=10)
+    bucket.reserve(10)
+    bucket.adjust(4)   # Used 4 fewer tokens than estimated
+    assert bucket.reserve(4) == 0
+    bucket.adjust(-2)  # Used 2 more
+    assert bucket.reserve(0) == pytest.approx(2)
+
+def test_wait_for_rate_charges_requests_and_tokens(clock, monkeypatch):
+    monkeypatch.setattr(throttle, "_buckets", {})
+    throttle.set_rate("openai", requests_per_min=60, tokens_per_min=600)  # 1 req/s, 10 tokens/s (burst 100)
+    assert throttle.wait_for_rate("openai", tokens=100) == 0
+    # 1s for the request; the token debt (20 - 10 refilled meanwhile) takes 1s more
+    assert throttle.wait_for_rate("openai", tokens=20) == pytest.approx(1 + 1)
+    assert throttle.per_minute("openai", "tokens") == pytest.approx(600)
+
+def test_slot_caps_concurrency(monkeypatch):
+    monkeypatch.setattr(throttle, "_slots", {})
+    monkeypatch.setattr(throttle, "_buckets", {})
+    throttle.set_concurrency("test", 2)
+    active, peak, lock = [0], [0], threading.Lock()
+    def call():
+        with throttle.slot("test"):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.05)
+            with lock: active[0] -= 1
+    threads = [threading.Thread(target=call) for _ in range(6)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    assert peak[0] == 2
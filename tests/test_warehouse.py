@@ -0,0 +1,33 @@
+import pytest
+
+import cache
+import results
+import warehouse
+
+@pytest.fixture(autouse=True)
+def stores(cache_on, fresh_store):
+    fresh_store(warehouse)
+
+def _record(product, score):
+    verdict = {"final_score": score, "verdict_tag": "🟢 ENTER", "financials": {"net_margin_pct": 20}}
+    return results.make_record(product, "UK", {"competitor_data": {"products": []}}, verdict)
+
+def _rows():
+    return warehouse._connect().execute("SELECT COUNT(*) FROM verdicts").fetchone()[0]
+
+def test_backfill_skips_scans_the_warehouse_already_has():
+    results.save({}, _record("Smart Ring", 7.5))   # Written to the cache and the warehouse
+    cache.set("scans", "only-cached", dict(_record("Yoga Mat", 6.0), key="only-cached"))
+    assert _rows() == 1
+
+    assert warehouse.backfill() == 1
+    assert _rows() == 2
+    assert warehouse.backfill() == 0
+    assert _rows() == 2
+    assert warehouse.count() == 2
+
+def test_backfill_skips_failed_verdicts():
+    record = _record("Air Fryer", 0)
+    record["verdict"]["verdict_tag"] = "ERROR"
+    cache.set("scans", record["key"], record)
+    assert warehouse.backfill() == 0 and _rows() == 0
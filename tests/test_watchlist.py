@@ -0,0 +1,95 @@
+import time
+from datetime import datetime
+
+import pytest
+
+import watchlist
+import pipeline
+
+@pytest.fixture
+def wl(fresh_store, monkeypatch):
+    fresh_store(watchlist)
+    monkeypatch.setattr(watchlist, "volatility", lambda product, country: 0.0)
+    return watchlist
+
+def _entry(product, country="UK"):
+    return next(e for e in watchlist.entries() if e["product"] == product and e["country"] == country)
+
+def _set(product, **columns):
+    conn = watchlist._connect()
+    for column, value in columns.items():
+        conn.execute(f"UPDATE watchlist SET {column} = ? WHERE product = ?", (value, product))
+    conn.commit()
+
+def test_in_window_handles_midnight_wrap():
+    at = lambda h, m=0: datetime(2026, 1, 1, h, m).timestamp()
+    assert watchlist.in_window("01:00-06:00", at(3))
+    assert not watchlist.in_window("01:00-06:00", at(7))
+    assert watchlist.in_window("22:00-02:00", at(23)) and watchlist.in_window("22:00-02:00", at(1))
+    assert watchlist.in_window("", at(12))
+
+def test_plan_orders_requested_then_new_then_stalest(wl):
+    now = time.time()
+    for product in ("Fresh", "Stale", "Staler", "Never", "Asked"):
+        wl.add(product, "UK")
+    _set("Fresh", last_scanned_at=now - 3600)
+    _set("Stale", last_scanned_at=now - 2 * wl.REFRESH_SECS)
+    _set("Staler", last_scanned_at=now - 3 * wl.REFRESH_SECS)
+    _set("Asked", last_scanned_at=now - 3600, requested_at=now - 60)
+    planned = [e["product"] for e in wl.plan(now=now, window="", daily_quota=10)]
+    assert planned == ["Asked", "Never", "Staler", "Stale"]
+
+def test_outside_the_window_only_requested_entries_run(wl):
+    now = datetime(2026, 1, 1, 12).timestamp()
+    wl.add("Never", "UK")
+    wl.add("Asked", "UK")
+    _set("Asked", requested_at=now - 60)
+    assert [e["product"] for e in wl.plan(now=now, window="01:00-06:00", daily_quota=10)] == ["Asked"]
+
+def test_plan_respects_the_daily_quota(wl):
+    for product in ("A1", "B2", "C3"):
+        wl.add(product, "UK")
+    assert len(wl.plan(window="", daily_quota=2)) == 2
+
+def test_failed_refresh_backs_off_exponentially(wl, monkeypatch):
+    def broken_scan(*args, **kwargs): raise RuntimeError("provider down")
+    monkeypatch.setattr(pipeline, "run_scan", broken_scan)
+    wl.add("Smart Ring", "UK")
+
+    assert wl.refresh(_entry("Smart Ring")) == "error"
+    first = _entry("Smart Ring")
+    assert first["failures"] == 1 and first["last_scanned_at"] is None
+    assert first["next_attempt_at"] == pytest.approx(time.time() + wl.RETRY_SECS, abs=5)
+    # Still due, but not before its backoff ends: no paid scan on every poll
+    assert wl.plan(window="", daily_quota=100) == []
+    assert [e["product"] for e in wl.plan(now=first["next_attempt_at"] + 1, window="", daily_quota=100)] == ["Smart Ring"]
+
+    wl.refresh(first)
+    assert _entry("Smart Ring")["failures"] == 2
+    assert wl.retry_delay(2) == 2 * wl.RETRY_SECS
+    assert wl.retry_delay(50) == wl.REFRESH_SECS
+
+def test_successful_refresh_clears_the_backoff(wl, monkeypatch):
+    import fakes
+    fakes.install(llm=fakes.Latency(0), serper=fakes.Latency(0), apify=fakes.Latency(0))
+    wl.add("Yoga Mat", "UK")
+    _set("Yoga Mat", failures=3, next_attempt_at=time.time() - 1)
+    assert wl.refresh(_entry("Yoga Mat")) == "ok"
+    entry = _entry("Yoga Mat")
+    assert entry["failures"] == 0 and entry["next_attempt_at"] is None and entry["last_scanned_at"]
+
+def test_degraded_refresh_keeps_the_last_good_verdict(wl, monkeypatch):
+    import results
+    calls = []
+    def degraded_scan(product, cfg, **kwargs):
+        calls.append(kwargs)
+        return {"verdict": {"verdict_tag": "🟢 ENTER", "final_score": 8}, "degraded": ["competitor_data"]}
+    monkeypatch.setattr(pipeline, "run_scan", degraded_scan)
+    monkeypatch.setattr(results, "save", lambda *a, **k: pytest.fail("a degraded verdict was stored"))
+    wl.add("Smart Ring", "UK")
+
+    assert wl.refresh(_entry("Smart Ring")) == "error"
+    entry = _entry("Smart Ring")
+    assert entry["failures"] == 1 and "competitor_data" in entry["last_error"]
+    # Revalidation skips the response cache
+    assert calls == [{"force_refresh": True}]
@@ -0,0 +1,178 @@
+"""
+Process-wide limits per external provider: concurrency caps and token-bucket rate limits.
+
+Every real network call goes through run(provider, fn, ...) or slot(provider), so a batch
+run or a busy shared dashboard never has more than N requests open against OpenAI, Serper
+or Apify at once, and never sends them faster than the provider's quota. Over-limit calls
+queue (block) instead of collecting 429s that throw away whole scans.
+
+Concurrency (env or set_concurrency()):
+    MAX_CONCURRENT_OPENAI / MAX_CONCURRENT_SERPER / MAX_CONCURRENT_APIFY   (Apify default 25 runs)
+Rates (env or set_rate()), 0 = unlimited:
+    OPENAI_RPM   requests per minute        OPENAI_TPM   tokens per minute
+    SERPER_QPS   requests per second        APIFY_RPM    actor starts per minute
+
+A caller the scan has abandoned (deadline.py) stops queueing: slot() raises health.Abandoned
+instead of letting its call out, and hands back the rate budget it had reserved.
+"""
+import os
+import time
+import threading
+from contextlib import contextmanager
+
+import telemetry
+import deadline
+import health
+
+PROVIDERS = ("openai", "serper", "apify")
+
+# Apify accounts cap concurrent actor runs; going over makes start() fail outright
+DEFAULT_CONCURRENCY = {"apify": 25}
+
+# provider -> (requests env var, per-seconds), (tokens env var, per-seconds)
+RATE_ENV = {
+    "openai": (("OPENAI_RPM", 60), ("OPENAI_TPM", 60)),
+    "serper": (("SERPER_QPS", 1), None),
+    "apify": (("APIFY_RPM", 60), None),
+}
+POLL_SECS = 0.1  # How often a queued caller checks whether its scan still wants the call
+
+class TokenBucket:
+    """
+    `rate` tokens per second, bursting up to `capacity`. acquire() reserves first and sleeps
+    after, so callers queue in arrival order and a request larger than the bucket still
+    goes through (it just waits for the debt to refill).
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(rate, 1))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, n=1):
+        """Takes n tokens now and returns how long the caller must wait before using them."""
+        with self.lock:
+            self._refill()
+            self.tokens -= n
+            return max(0.0, -self.tokens / self.rate)
+
+    def acquire(self, n=1):
+        wait = self.reserve(n)
+        if wait > 0: time.sleep(wait)
+        return wait
+
+    def adjust(self, n):
+        """Gives back (n > 0) or charges extra (n < 0) once the real cost is known."""
+        with self.lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens + n)
+
+_slots = {}
+_buckets = {}  # (provider, "requests" | "tokens") -> TokenBucket or None
+_lock = threading.Lock()
+
+def set_concurrency(provider, limit):
+    """limit=None (or 0) removes the cap."""
+    with _lock:
+        _slots[provider] = threading.BoundedSemaphore(limit) if limit else None
+
+def set_rate(provider, requests_per_min=None, tokens_per_min=None):
+    """Per-minute request/token budgets for a provider. None (or 0) removes that limit."""
+    with _lock:
+        _buckets[(provider, "requests")] = TokenBucket(requests_per_min / 60) if requests_per_min else None
+        _buckets[(provider, "tokens")] = TokenBucket(tokens_per_min / 60, tokens_per_min / 6) if tokens_per_min else None
+
+def _slot(provider):
+    with _lock:
+        if provider not in _slots:
+            env_limit = int(os.getenv(f"MAX_CONCURRENT_{provider.upper()}", str(DEFAULT_CONCURRENCY.get(provider, 0))))
+            _slots[provider] = threading.BoundedSemaphore(env_limit) if env_limit else None
+        return _slots[provider]
+
+def _bucket(provider, kind):
+    with _lock:
+        if (provider, kind) not in _buckets:
+            env = RATE_ENV.get(provider, (None, None))[0 if kind == "requests" else 1]
+            bucket = None
+            if env:
+                name, per_secs = env
+                limit = float(os.getenv(name, "0"))
+                # Token budgets may burst ~10s worth so one long prompt is not starved
+                if limit: bucket = TokenBucket(limit / per_secs, limit / 6 if kind == "tokens" else None)
+            _buckets[(provider, kind)] = bucket
+        return _buckets[(provider, kind)]
+
+def _acquire(bucket, n, provider):
+    """bucket.acquire(n), but an abandoned caller stops waiting and gives its reservation back."""
+    wait = bucket.reserve(n)
+    until = time.monotonic() + wait
+    while True:
+        if deadline.cancelled():
+            bucket.adjust(n)
+            health.check_abandoned(provider)
+        left = until - time.monotonic()
+        if left <= 0: return wait
+        time.sleep(min(left, POLL_SECS))
+
+def per_minute(provider, kind):
+    """The current requests/tokens ("requests" | "tokens") per minute limit, from set_rate() or the env; None = unlimited."""
+    bucket = _bucket(provider, kind)
+    return bucket.rate * 60 if bucket else None
+
+def wait_for_rate(provider, tokens=0):
+    """Blocks until one request (and `tokens` tokens, if the provider has a token budget) may go out."""
+    waited = 0.0
+    requests_bucket = _bucket(provider, "requests")
+    if requests_bucket: waited += _acquire(requests_bucket, 1, provider)
+    tokens_bucket = _bucket(provider, "tokens") if tokens else None
+    if tokens_bucket:
+        try: waited += _acquire(tokens_bucket, tokens, provider)
+        except health.Abandoned:
+            if requests_bucket: requests_bucket.adjust(1)
+            raise
+    if waited > 0: telemetry.note_throttle(provider, waited)
+    return waited
+
+def settle_tokens(provider, estimated, usage):
+    """Corrects the token budget once the provider reports real usage (LangChain usage_metadata)."""
+    bucket = _bucket(provider, "tokens")
+    if not bucket or not usage: return
+    actual = int(usage.get("input_tokens", 0) or 0) + int(usage.get("output_tokens", 0) or 0)
+    bucket.adjust(estimated - actual)
+
+@contextmanager
+def slot(provider, tokens=0):
+    """
+    Holds one of the provider's concurrency slots for the duration of the block (e.g. a streamed
+    response), after waiting out its rate limit. `tokens` is the estimated token cost (OpenAI).
+    """
+    health.check_abandoned(provider)
+    sem = _slot(provider)
+    if sem is None:
+        wait_for_rate(provider, tokens)
+        health.check_abandoned(provider)
+        yield
+        return
+    while not sem.acquire(timeout=POLL_SECS):
+        health.check_abandoned(provider)
+    try:
+        wait_for_rate(provider, tokens)
+        health.check_abandoned(provider)
+        yield
+    finally:
+        sem.release()
+
+def run(provider, fn, *args, **kwargs):
+    with slot(provider):
+        return fn(*args, **kwargs)
+
+def estimate_tokens(prompt, completion=500):
+    """Cheap pre-flight estimate (~4 chars per token) of prompt + expected completion tokens."""
+    return len(prompt) // 4 + completion
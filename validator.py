@@ -1,17 +1,12 @@
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import PromptTemplate
-from dotenv import load_dotenv
 import json
+import cache
+import clients
+import telemetry
+import llm_batch
 
-load_dotenv()
+FALLBACK_GUARDRAILS = {"min_price": 10, "max_price": 1000000}
 
-def get_market_guardrails(product_name, country_config):
-    llm = ChatOpenAI(model="gpt-4o", temperature=0)
-    
-    currency = country_config.get('currency_symbol', '$')
-    country = country_config.get('country_full', 'Unknown')
-
-    template = """
+GUARDRAILS_TEMPLATE = """
     You are a Market Calibration Engine.
     
     Product: "{product_name}"
@@ -31,11 +26,91 @@ def get_market_guardrails(product_name, country_config):
         "max_price": 400
     }}
     """
-    
-    prompt = PromptTemplate(input_variables=["product_name", "country", "currency"], template=template)
-    
+
+BATCH_GUARDRAILS_TEMPLATE = """
+    You are a Market Calibration Engine.
+
+    TASK: For EACH item below, determine the REALISTIC price range for one unit of the product
+    in its market's currency. Exclude cheap accessories.
+
+    EXAMPLES:
+    - Smart Ring (India/₹) -> min: 3000, max: 35000
+    - Smart Ring (UK/£) -> min: 40, max: 400
+
+    ITEMS (id -> product, market, currency):
+    {items}
+
+    OUTPUT JSON ONLY, one entry per id, no other text:
+    {{
+        "1": {{"min_price": 50, "max_price": 400}}
+    }}
+    """
+
+def _market(country_config):
+    return country_config.get('country_full', 'Unknown'), country_config.get('currency_symbol', '$')
+
+def guardrails_prompt(product_name, country_config):
+    """The single-item prompt. Its hash is the cache key, so batch answers are stored under it too."""
+    from langchain_core.prompts import PromptTemplate  # heavy; deferred to first use
+    country, currency = _market(country_config)
+    prompt = PromptTemplate(input_variables=["product_name", "country", "currency"], template=GUARDRAILS_TEMPLATE)
+    return prompt.format(product_name=product_name, country=country, currency=currency)
+
+def _parse_guardrails(text):
+    return json.loads(text.replace("```json", "").replace("```", "").strip())
+
+def _valid_guardrails(answer, item=None):
+    if not isinstance(answer, dict): return None
+    lo, hi = float(answer["min_price"]), float(answer["max_price"])
+    if lo < 0 or hi <= lo: return None
+    return {"min_price": answer["min_price"], "max_price": answer["max_price"]}
+
+@telemetry.traced("get_market_guardrails", provider="openai")
+def get_market_guardrails(product_name, country_config):
+    llm = clients.get_llm("gpt-4o", temperature=0)
     try:
-        res = llm.invoke(prompt.format(product_name=product_name, country=country, currency=currency))
-        return json.loads(res.content.replace("```json", "").replace("```", "").strip())
-    except:
-        return {"min_price": 10, "max_price": 1000000}
\ No newline at end of file
+        # Validated inside parse (like the batch path), so a malformed range is never cached
+        guardrails = cache.cached_invoke(
+            llm, guardrails_prompt(product_name, country_config), "guardrails",
+            parse=lambda text: _valid_guardrails(_parse_guardrails(text))
+        )
+        if guardrails is None:
+            print("⚠️ Guardrails lookup returned no usable range, using the fallback range")
+            return dict(FALLBACK_GUARDRAILS)
+        return guardrails
+    except Exception as e:
+        print(f"⚠️ Guardrails lookup failed, using the fallback range: {e}")
+        return dict(FALLBACK_GUARDRAILS)
+
+@telemetry.traced("get_market_guardrails_batch", provider="openai")
+def get_market_guardrails_batch(items):
+    """
+    Guardrails for many [(product_name, country_config), ...] at once, in input order.
+    Cached items are served from the single-item cache; the rest share a few batched prompts,
+    and every answer is written back under its single-item key, so a later
+    get_market_guardrails() for the same product is a cache hit. Items that never
+    validate get the same fallback as the single-item call.
+    """
+    llm = clients.get_llm("gpt-4o", temperature=0)
+    results, pending = [None] * len(items), {}
+    for i, (product_name, country_config) in enumerate(items):
+        key = cache.llm_key(llm, guardrails_prompt(product_name, country_config))
+        hit = cache.get("guardrails", key)
+        if hit is not None: results[i] = hit
+        else: pending[str(i + 1)] = (i, product_name, country_config, key)
+
+    def build_prompt(chunk):
+        lines = []
+        for item_id, (_, product_name, country_config, _) in chunk.items():
+            country, currency = _market(country_config)
+            lines.append(f'{item_id}: "{product_name}" | {country} | {currency}')
+        return BATCH_GUARDRAILS_TEMPLATE.format(items="\n    ".join(lines))
+
+    answers = llm_batch.run(llm, pending, build_prompt, _valid_guardrails) if pending else {}
+    for item_id, (i, _, _, key) in pending.items():
+        if item_id in answers:
+            cache.set("guardrails", key, answers[item_id])
+            results[i] = answers[item_id]
+        else:
+            results[i] = dict(FALLBACK_GUARDRAILS)
+    return results
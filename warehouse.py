@@ -0,0 +1,262 @@
+"""
+Verdict warehouse: every finished scan as one flat, indexed row, for ranking ideas.
+
+A verdict used to be rendered once and then only live on as a JSON blob in the response
+cache. Here each scan (dashboard, background worker, watchlist, batch) is flattened into a
+fixed set of columns (COLUMNS): the verdict and its pillars, the forced financials and
+profit risk, the competitor price snapshot, the tax rate and the guardrails.
+
+    warehouse.top(20, country="UK", min_margin=15)     # leaderboard
+    warehouse.market_summary()                         # per-market aggregates
+    warehouse.export_parquet("verdicts.parquet")       # columnar copy (needs pyarrow)
+
+Every scan is kept; `latest` marks the newest scan of each (product key, market), and the
+leaderboard indexes are partial indexes on latest = 1, so top-N, margin filters and
+per-market aggregates stay in the milliseconds at 100k+ ideas.
+
+    python warehouse.py top --market UK --min-margin 15
+    python warehouse.py markets
+    python warehouse.py export verdicts.parquet
+    python warehouse.py backfill          # load the scans still in the response cache
+"""
+import os
+import sys
+import json
+import time
+import sqlite3
+import argparse
+import threading
+
+import config  # loads .env once, before the modules below read their settings
+import product_keys
+
+STORE_PATH = os.getenv("WAREHOUSE_PATH", os.path.join(".cache", "warehouse.sqlite"))
+PILLARS = ("demand", "competition", "economics", "culture")
+
+# The stable schema: (column, SQLite type). Append new columns at the end, never rename.
+COLUMNS = [
+    ("record_key", "TEXT NOT NULL"), ("product_key", "TEXT NOT NULL"), ("product", "TEXT NOT NULL"),
+    ("country", "TEXT NOT NULL"), ("currency", "TEXT"), ("version", "TEXT"), ("scanned_at", "REAL NOT NULL"),
+    ("latest", "INTEGER NOT NULL DEFAULT 1"),
+    # Verdict
+    ("final_score", "REAL"), ("confidence_score", "REAL"), ("verdict_tag", "TEXT"), ("strategic_thesis", "TEXT"),
+    ("lifecycle_stage", "TEXT"), ("volatility", "TEXT"), ("recommendation", "TEXT"),
+    ("entry_strategy", "TEXT"), ("entry_reason", "TEXT"),
+    *[(f"{p}_{field}", kind) for p in PILLARS for field, kind in (("score", "REAL"), ("reason", "TEXT"), ("signals", "TEXT"))],
+    ("pros", "TEXT"), ("cons", "TEXT"), ("missing_signals", "TEXT"),
+    # Financials (economics.scalar_waterfall, forced into the verdict) and profit risk
+    ("sell_price", "REAL"), ("cogs", "REAL"), ("marketing_cpa", "REAL"), ("logistics_cost", "REAL"),
+    ("tax_amount", "REAL"), ("net_profit", "REAL"), ("net_margin_pct", "REAL"),
+    ("loss_chance_pct", "REAL"), ("expected_net_profit", "REAL"), ("break_even_price", "REAL"), ("safe_price", "REAL"),
+    ("margin_p5", "REAL"), ("margin_p50", "REAL"), ("margin_p95", "REAL"),
+    # Competitor snapshot, tax, guardrails
+    ("price_source", "TEXT"), ("average_price", "REAL"), ("listing_count", "INTEGER"),
+    ("price_median", "REAL"), ("price_min", "REAL"), ("price_max", "REAL"), ("price_stdev", "REAL"),
+    ("tax_rate", "REAL"), ("tax_reason", "TEXT"), ("guard_min_price", "REAL"), ("guard_max_price", "REAL"),
+]
+COLUMN_NAMES = [name for name, _ in COLUMNS]
+JSON_COLUMNS = {f"{p}_signals" for p in PILLARS} | {"pros", "cons", "missing_signals"}
+# What the leaderboard shows (the long text columns stay out of ranking queries)
+SUMMARY_COLUMNS = [
+    "product", "country", "currency", "final_score", "confidence_score", "verdict_tag", "net_margin_pct",
+    "net_profit", "sell_price", "loss_chance_pct", "break_even_price", "listing_count", "price_source", "scanned_at",
+]
+
+_local = threading.local()
+
+def _connect():
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        folder = os.path.dirname(STORE_PATH)
+        if folder: os.makedirs(folder, exist_ok=True)
+        conn = sqlite3.connect(STORE_PATH, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"CREATE TABLE IF NOT EXISTS verdicts (id INTEGER PRIMARY KEY, {', '.join(f'{n} {t}' for n, t in COLUMNS)})")
+        # Schema grows by appending columns; older files get them added in place
+        have = {row[1] for row in conn.execute("PRAGMA table_info(verdicts)")}
+        for name, kind in COLUMNS:
+            if name not in have: conn.execute(f"ALTER TABLE verdicts ADD COLUMN {name} {kind.replace(' NOT NULL', '')}")
+        # Partial indexes: rankings only ever look at the newest scan of each idea
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_verdicts_score ON verdicts(final_score DESC, net_margin_pct DESC) WHERE latest = 1")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_verdicts_market ON verdicts(country, final_score DESC, net_margin_pct, loss_chance_pct) WHERE latest = 1")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_verdicts_margin ON verdicts(net_margin_pct) WHERE latest = 1")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_verdicts_time ON verdicts(scanned_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_verdicts_idea ON verdicts(product_key, country, latest)")
+        conn.commit()
+        _local.conn = conn
+    return conn
+
+def _num(value):
+    try: return float(value)
+    except (TypeError, ValueError): return None
+
+def flatten(record):
+    """results.make_record() output -> {column: value} in the COLUMNS schema."""
+    verdict = record.get("verdict") or {}
+    fin = verdict.get("financials") or {}
+    risk = fin.get("risk") or {}
+    margins = risk.get("margin_percentiles") or {}
+    competitor = record.get("competitor_data") or {}
+    stats = competitor.get("price_stats") or {}
+    tax = record.get("tax_info") or {}
+    guard = record.get("guardrails") or {}
+    entry = verdict.get("market_entry") or {}
+    market = config.get_country_config(record["country"]) or {}
+    rate = _num(tax.get("rate"))
+
+    row = {
+        "record_key": record["key"], "product_key": product_keys.canonical_key(record["product"]),
+        "product": record["product"], "country": record["country"], "currency": market.get("currency_symbol"),
+        "version": record.get("version"), "scanned_at": record.get("saved_at") or time.time(), "latest": 1,
+        "final_score": _num(verdict.get("final_score")), "confidence_score": _num(verdict.get("confidence_score")),
+        "verdict_tag": verdict.get("verdict_tag"), "strategic_thesis": verdict.get("strategic_thesis"),
+        "lifecycle_stage": verdict.get("lifecycle_stage"), "volatility": verdict.get("volatility"),
+        "recommendation": verdict.get("recommendation"),
+        "entry_strategy": entry.get("strategy"), "entry_reason": entry.get("reason"),
+        "pros": verdict.get("pros") or [], "cons": verdict.get("cons") or [],
+        "missing_signals": (verdict.get("context_report") or {}).get("missing_signals") or [],
+        "sell_price": _num(fin.get("sell_price")), "cogs": _num(fin.get("cogs")),
+        "marketing_cpa": _num(fin.get("marketing_cpa")), "logistics_cost": _num(fin.get("logistics_cost")),
+        "tax_amount": _num(fin.get("tax_rate")),  # The verdict's 'tax_rate' is the tax amount per unit
+        "net_profit": _num(fin.get("net_profit")), "net_margin_pct": _num(fin.get("net_margin_pct")),
+        "loss_chance_pct": round(risk["p_loss"] * 100, 1) if _num(risk.get("p_loss")) is not None else None,
+        "expected_net_profit": _num(risk.get("expected_net_profit")),
+        "break_even_price": _num(risk.get("break_even_price")), "safe_price": _num(risk.get("safe_price")),
+        "margin_p5": _num(margins.get("p5")), "margin_p50": _num(margins.get("p50")), "margin_p95": _num(margins.get("p95")),
+        "price_source": competitor.get("source"), "average_price": _num(competitor.get("average_price")),
+        "listing_count": competitor.get("listing_count", len(competitor.get("products") or [])),
+        "price_median": _num(stats.get("median")), "price_min": _num(stats.get("min")),
+        "price_max": _num(stats.get("max")), "price_stdev": _num(stats.get("stdev")),
+        "tax_rate": rate / 100 if rate is not None and rate > 1 else rate, "tax_reason": tax.get("reason"),
+        "guard_min_price": _num(guard.get("min_price")), "guard_max_price": _num(guard.get("max_price")),
+    }
+    for p in PILLARS:
+        pillar = (verdict.get("breakdown") or {}).get(p) or {}
+        row[f"{p}_score"] = _num(pillar.get("total"))
+        row[f"{p}_reason"] = pillar.get("reason")
+        row[f"{p}_signals"] = [pillar[k] for k in sorted(pillar) if k.startswith("signal_")]
+    return row
+
+def add(record):
+    """Stores one finished scan and makes it the idea's latest. Failed (ERROR) verdicts are not ranked."""
+    if (record.get("verdict") or {}).get("verdict_tag") == "ERROR": return False
+    add_rows([flatten(record)])
+    return True
+
+def add_rows(rows):
+    """Bulk insert of flatten() rows, one transaction (backfill, benchmarks)."""
+    conn = _connect()
+    placeholders = ", ".join("?" for _ in COLUMN_NAMES)
+    with conn:
+        for row in rows:
+            conn.execute("UPDATE verdicts SET latest = 0 WHERE product_key = ? AND country = ? AND latest = 1",
+                         (row["product_key"], row["country"]))
+            conn.execute(
+                f"INSERT INTO verdicts ({', '.join(COLUMN_NAMES)}) VALUES ({placeholders})",
+                [json.dumps(row[n]) if n in JSON_COLUMNS else row[n] for n in COLUMN_NAMES]
+            )
+
+# --- Queries (newest scan of each idea only) ---
+
+def _where(country=None, min_margin=None, min_score=None, max_loss_chance=None, since=None):
+    clauses, params = ["latest = 1"], []  # Kept index-only: no filters on columns the indexes lack
+    if country:
+        codes = [country] if isinstance(country, str) else list(country)
+        clauses.append(f"country IN ({', '.join('?' for _ in codes)})")
+        params += [c.upper() for c in codes]
+    if min_margin is not None: clauses.append("net_margin_pct >= ?"); params.append(min_margin)
+    if min_score is not None: clauses.append("final_score >= ?"); params.append(min_score)
+    if max_loss_chance is not None: clauses.append("loss_chance_pct <= ?"); params.append(max_loss_chance)
+    if since is not None: clauses.append("scanned_at >= ?"); params.append(since)
+    return " AND ".join(clauses), params
+
+def _rows(cursor):
+    cols = [d[0] for d in cursor.description]
+    return [dict(zip(cols, r)) for r in cursor.fetchall()]
+
+def top(n=20, country=None, min_margin=None, min_score=None, max_loss_chance=None, since=None, columns=None):
+    """Best ideas by viability score (then net margin). `country` may be one market code or a list."""
+    where, params = _where(country, min_margin, min_score, max_loss_chance, since)
+    cols = ", ".join(columns or SUMMARY_COLUMNS)
+    return _rows(_connect().execute(
+        f"SELECT {cols} FROM verdicts WHERE {where} ORDER BY final_score DESC, net_margin_pct DESC LIMIT ?", params + [n]
+    ))
+
+def count(country=None, min_margin=None, min_score=None, max_loss_chance=None, since=None):
+    where, params = _where(country, min_margin, min_score, max_loss_chance, since)
+    return _connect().execute(f"SELECT COUNT(*) FROM verdicts WHERE {where}", params).fetchone()[0]
+
+def market_summary(min_margin=None, since=None):
+    """Per-market aggregates over each idea's latest scan, best average score first."""
+    where, params = _where(min_margin=min_margin, since=since)
+    return _rows(_connect().execute(f"""
+        SELECT country, COUNT(*) AS ideas,
+               ROUND(AVG(final_score), 2) AS avg_score, MAX(final_score) AS best_score,
+               ROUND(AVG(net_margin_pct), 1) AS avg_margin_pct,
+               ROUND(AVG(loss_chance_pct), 1) AS avg_loss_chance_pct,
+               SUM(final_score >= 7) AS strong_ideas
+        FROM verdicts WHERE {where} GROUP BY country ORDER BY avg_score DESC
+    """, params))
+
+def history(product, country=None):
+    """Every stored scan of one idea, newest first (the score over time)."""
+    sql = f"SELECT {', '.join(SUMMARY_COLUMNS)}, version FROM verdicts WHERE product_key = ?"
+    params = [product_keys.canonical_key(product)]
+    if country: sql += " AND country = ?"; params.append(country.upper())
+    return _rows(_connect().execute(sql + " ORDER BY scanned_at DESC", params))
+
+def get(record_key):
+    """Full latest row (every column, JSON columns decoded) for a results.py record key."""
+    rows = _rows(_connect().execute("SELECT * FROM verdicts WHERE record_key = ? ORDER BY scanned_at DESC LIMIT 1", (record_key,)))
+    if not rows: return None
+    return {k: json.loads(v) if k in JSON_COLUMNS and v else v for k, v in rows[0].items()}
+
+def export_parquet(path, latest_only=True):
+    """Writes the warehouse (every COLUMNS field) to Parquet. `path` may be a file path or a binary buffer."""
+    import pandas as pd  # pandas + pyarrow: only needed for exports
+    sql = f"SELECT {', '.join(COLUMN_NAMES)} FROM verdicts" + (" WHERE latest = 1" if latest_only else "")
+    frame = pd.read_sql_query(sql, _connect())
+    frame.to_parquet(path, index=False)
+    return len(frame)
+
+def backfill(limit=100_000):
+    """Loads the scans still in the response cache (results.py) that the warehouse does not have yet."""
+    import cache
+    # Compared as (key, float) in Python: SQLite prints a REAL with fewer digits than repr()
+    have = set(_connect().execute("SELECT DISTINCT record_key, scanned_at FROM verdicts"))
+    records = [r for r in cache.recent("scans", limit) if (r["key"], r["saved_at"]) not in have]
+    records = [r for r in sorted(records, key=lambda r: r["saved_at"]) if (r.get("verdict") or {}).get("verdict_tag") != "ERROR"]
+    add_rows([flatten(r) for r in records])
+    return len(records)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query and export the verdict warehouse.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    top_cmd = sub.add_parser("top", help="Best ideas by viability score")
+    top_cmd.add_argument("-n", type=int, default=20)
+    top_cmd.add_argument("--market", action="append", help="Market code (repeatable)")
+    top_cmd.add_argument("--min-margin", type=float, default=None, help="Minimum net margin %%")
+    top_cmd.add_argument("--min-score", type=float, default=None)
+    top_cmd.add_argument("--max-loss-chance", type=float, default=None, help="Maximum chance of a loss %%")
+    markets_cmd = sub.add_parser("markets", help="Per-market aggregates")
+    markets_cmd.add_argument("--min-margin", type=float, default=None)
+    export = sub.add_parser("export", help="Write a Parquet file")
+    export.add_argument("path")
+    export.add_argument("--all-scans", action="store_true", help="Every stored scan, not only each idea's latest")
+    sub.add_parser("backfill", help="Load scans from the response cache")
+    args = parser.parse_args(argv)
+
+    if args.command == "top":
+        for i, r in enumerate(top(args.n, args.market, args.min_margin, args.min_score, args.max_loss_chance), 1):
+            print(f"{i:>3}. {r['final_score']}/10 · {r['product']} · {r['country']} · margin {r['net_margin_pct']}% · {r['verdict_tag']}")
+    elif args.command == "markets":
+        for r in market_summary(args.min_margin):
+            print(f"{r['country']}: {r['ideas']} ideas · avg {r['avg_score']}/10 · avg margin {r['avg_margin_pct']}% · {r['strong_ideas']} scoring 7+")
+    elif args.command == "export":
+        print(f"📦 Exported {export_parquet(args.path, latest_only=not args.all_scans)} rows to {args.path}")
+    else:
+        print(f"📥 Loaded {backfill()} scans from the response cache")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,281 @@
+"""
+Watchlist + background refresher (stale-while-revalidate).
+
+Analysts re-check the same few hundred ideas every week. Watched (product, market) pairs
+are re-scanned by a separate scheduler process, ideally at night, so the dashboard can
+show the last good verdict at once and never waits on a cold scan for them:
+
+    python watchlist.py add "Smart Ring" UK
+    python watchlist.py list
+    python watchlist.py run --window 01:00-06:00 --daily-quota 150     # long-running scheduler
+    python watchlist.py run --once                                     # one cycle (cron)
+
+Each cycle refreshes the entries that are due, highest priority first:
+  1. Entries the dashboard asked for (a watched verdict was shown stale): served even outside
+     the off-peak window, so a stale verdict is revalidated within one poll.
+  2. Everything else only inside the window, ranked by staleness x price volatility
+     (price_store dispersion/trend), so jumpy products come round sooner.
+No cycle starts more scans than the rolling 24h quota has left. An entry whose refresh failed
+is not retried before its next_attempt_at: WATCH_RETRY_SECS after the first failure, doubling
+with every further one (capped at WATCH_REFRESH_SECS), so a broken product or a provider
+outage cannot burn the quota one paid scan per poll.
+
+Settings (env or flags): WATCH_REFRESH_SECS, WATCH_DAILY_QUOTA, WATCH_WINDOW, WATCH_KEEP_SECS,
+WATCH_RETRY_SECS.
+"""
+import os
+import sys
+import time
+import sqlite3
+import argparse
+import threading
+from datetime import datetime
+
+import config  # loads .env once, before the modules below read their settings
+import product_keys
+
+STORE_PATH = os.getenv("WATCHLIST_PATH", os.path.join(".cache", "watchlist.sqlite"))
+REFRESH_SECS = float(os.getenv("WATCH_REFRESH_SECS", str(24 * 3600)))  # Matches the daily cache TTLs
+DAILY_QUOTA = int(os.getenv("WATCH_DAILY_QUOTA", "100"))              # Full scans per rolling 24h
+WINDOW = os.getenv("WATCH_WINDOW", "01:00-06:00")                     # Off-peak, local time ("" = always)
+KEEP_SECS = float(os.getenv("WATCH_KEEP_SECS", str(7 * 24 * 3600)))   # How long a watched verdict stays servable
+RETRY_SECS = float(os.getenv("WATCH_RETRY_SECS", "900"))               # Backoff after the first failed refresh
+POLL_SECS = 60
+VOLATILITY_WEIGHT = 4.0  # A product whose price swings 25% is due twice as often
+
+_local = threading.local()
+
+def _connect():
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        folder = os.path.dirname(STORE_PATH)
+        if folder: os.makedirs(folder, exist_ok=True)
+        conn = sqlite3.connect(STORE_PATH, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS watchlist (
+                product_key TEXT NOT NULL,
+                country TEXT NOT NULL,
+                product TEXT NOT NULL,
+                added_at REAL NOT NULL,
+                last_scanned_at REAL,
+                last_status TEXT,
+                last_error TEXT,
+                requested_at REAL,
+                failures INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL,
+                PRIMARY KEY (product_key, country)
+            )
+        """)
+        # Files created before the failure backoff get its columns added in place
+        have = {row[1] for row in conn.execute("PRAGMA table_info(watchlist)")}
+        if "failures" not in have: conn.execute("ALTER TABLE watchlist ADD COLUMN failures INTEGER NOT NULL DEFAULT 0")
+        if "next_attempt_at" not in have: conn.execute("ALTER TABLE watchlist ADD COLUMN next_attempt_at REAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS runs (
+                started_at REAL NOT NULL,
+                product_key TEXT NOT NULL,
+                country TEXT NOT NULL,
+                status TEXT NOT NULL,
+                elapsed_s REAL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_runs_time ON runs(started_at)")
+        conn.commit()
+        _local.conn = conn
+    return conn
+
+def _key(product):
+    return product_keys.canonical_key(product)
+
+def add(product, country):
+    country = country.upper()
+    conn = _connect()
+    conn.execute(
+        "INSERT OR IGNORE INTO watchlist (product_key, country, product, added_at) VALUES (?, ?, ?, ?)",
+        (_key(product), country, product_keys.resolve(product), time.time())
+    )
+    conn.commit()
+
+def remove(product, country):
+    conn = _connect()
+    conn.execute("DELETE FROM watchlist WHERE product_key = ? AND country = ?", (_key(product), country.upper()))
+    conn.commit()
+
+def is_watched(product, country):
+    row = _connect().execute(
+        "SELECT 1 FROM watchlist WHERE product_key = ? AND country = ?", (_key(product), country.upper())
+    ).fetchone()
+    return row is not None
+
+def request_refresh(product, country):
+    """Called when a watched verdict is served stale: the scheduler picks it up on its next poll."""
+    conn = _connect()
+    conn.execute(
+        "UPDATE watchlist SET requested_at = COALESCE(requested_at, ?) WHERE product_key = ? AND country = ?",
+        (time.time(), _key(product), country.upper())
+    )
+    conn.commit()
+
+ENTRY_COLUMNS = ("product_key", "country", "product", "added_at", "last_scanned_at", "last_status", "last_error",
+                 "requested_at", "failures", "next_attempt_at")
+
+def entries():
+    rows = _connect().execute(f"SELECT {', '.join(ENTRY_COLUMNS)} FROM watchlist ORDER BY added_at").fetchall()
+    cols = ENTRY_COLUMNS
+    return [dict(zip(cols, r)) for r in rows]
+
+def is_stale(saved_at, now=None):
+    return (now or time.time()) - saved_at >= REFRESH_SECS
+
+def retry_delay(failures, retry_secs=None):
+    """Seconds to wait after the n-th consecutive failure: retry_secs, 2x, 4x, ... capped at REFRESH_SECS."""
+    retry_secs = RETRY_SECS if retry_secs is None else retry_secs
+    return min(retry_secs * 2 ** max(failures - 1, 0), max(REFRESH_SECS, retry_secs))
+
+# --- Scheduling ---
+
+def in_window(window=None, now=None):
+    """True if `now` falls inside "HH:MM-HH:MM" (local time, may wrap midnight). Empty window = always."""
+    window = WINDOW if window is None else window
+    if not window: return True
+    start, end = [int(h) * 60 + int(m) for h, m in (part.split(":") for part in window.split("-"))]
+    t = datetime.fromtimestamp(now or time.time())
+    minute = t.hour * 60 + t.minute
+    return start <= minute < end if start <= end else minute >= start or minute < end
+
+def quota_left(daily_quota=None, now=None):
+    daily_quota = DAILY_QUOTA if daily_quota is None else daily_quota
+    used = _connect().execute(
+        "SELECT COUNT(*) FROM runs WHERE started_at >= ?", ((now or time.time()) - 86400,)
+    ).fetchone()[0]
+    return max(daily_quota - used, 0)
+
+def volatility(product, country):
+    """Price instability from the local store: dispersion plus the size of the recent trend (0 = flat/unknown)."""
+    import price_store
+    cfg = config.get_country_config(country)
+    if cfg is None: return 0.0
+    summary = price_store.price_summary(product, price_store.market_key(cfg), days=30)
+    if not summary: return 0.0
+    return summary["dispersion_cv"] + abs(summary["change_pct"]) / 100
+
+def plan(now=None, window=None, daily_quota=None, refresh_secs=None):
+    """Entries to refresh this cycle, highest priority first, capped by the remaining quota."""
+    now = now or time.time()
+    refresh_secs = refresh_secs or REFRESH_SECS
+    budget = quota_left(daily_quota, now)
+    if not budget: return []
+    off_peak = in_window(window, now)
+
+    ranked = []
+    for e in entries():
+        # Failing entries wait out their backoff, even when the dashboard asked for them
+        if e["next_attempt_at"] and e["next_attempt_at"] > now: continue
+        if e["requested_at"]:
+            ranked.append((0, -(now - e["requested_at"]), e))  # Oldest request first
+            continue
+        if not off_peak: continue
+        if e["last_scanned_at"] is None:
+            ranked.append((1, 0, e))
+            continue
+        vol = volatility(e["product"], e["country"])
+        # Volatile products go stale sooner: the effective refresh interval shrinks with volatility
+        staleness = (now - e["last_scanned_at"]) / refresh_secs * (1 + VOLATILITY_WEIGHT * vol)
+        if staleness >= 1: ranked.append((2, -staleness, e))
+    ranked.sort(key=lambda r: r[:2])
+    return [e for _, _, e in ranked[:budget]]
+
+def refresh(entry):
+    """
+    Full scan (with verdict, bypassing the response cache) for one entry; a good verdict replaces the stored
+    record, a failed or degraded one never does and pushes the entry's next attempt back (retry_delay).
+    """
+    import results
+    import telemetry
+    from pipeline import run_scan
+
+    cfg = config.get_country_config(entry["country"])
+    started = time.time()
+    status, error = "ok", None
+    try:
+        if cfg is None: raise ValueError(f"Unknown market '{entry['country']}'")
+        with telemetry.scan(entry["product"], cfg["country_full"]) as trace:
+            # A revalidation: fresh provider data, not the cached answers the stored verdict was built from
+            scan = run_scan(entry["product"], cfg, force_refresh=True)
+        verdict = scan["verdict"]
+        if verdict.get("verdict_tag") == "ERROR": raise RuntimeError(verdict.get("recommendation") or "Verdict failed")
+        if scan.get("degraded"): raise RuntimeError(f"Degraded scan, agents fell back: {', '.join(scan['degraded'])}")
+        record = results.make_record(entry["product"], entry["country"], scan, verdict, trace.to_dict())
+        results.save({}, record, ttl=KEEP_SECS)
+    except Exception as e:
+        status, error = "error", str(e)
+
+    conn = _connect()
+    conn.execute("INSERT INTO runs VALUES (?, ?, ?, ?, ?)",
+                 (started, entry["product_key"], entry["country"], status, round(time.time() - started, 2)))
+    # A failed refresh keeps the old last_scanned_at, so the entry stays due and the last good verdict stays up
+    if status == "ok":
+        conn.execute(
+            "UPDATE watchlist SET last_scanned_at = ?, last_status = ?, last_error = NULL, requested_at = NULL, "
+            "failures = 0, next_attempt_at = NULL WHERE product_key = ? AND country = ?",
+            (started, status, entry["product_key"], entry["country"])
+        )
+    else:
+        failures = (entry.get("failures") or 0) + 1
+        conn.execute(
+            "UPDATE watchlist SET last_status = ?, last_error = ?, requested_at = NULL, failures = ?, next_attempt_at = ? "
+            "WHERE product_key = ? AND country = ?",
+            (status, error, failures, started + retry_delay(failures), entry["product_key"], entry["country"])
+        )
+    conn.commit()
+    return status
+
+def run_cycle(window=None, daily_quota=None, workers=2):
+    from concurrent.futures import ThreadPoolExecutor
+    due = plan(window=window, daily_quota=daily_quota)
+    if not due: return {"ok": 0, "error": 0}
+    print(f"🔄 Watchlist: refreshing {len(due)} entries ({quota_left(daily_quota)} scans left in the 24h quota)")
+    counts = {"ok": 0, "error": 0}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for entry, status in zip(due, pool.map(refresh, due)):
+            counts[status] += 1
+            print(f"{'✅' if status == 'ok' else '❌'} {entry['product']} · {entry['country']}")
+    return counts
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Watched products, re-scanned in the background.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name in ("add", "remove"):
+        p = sub.add_parser(name)
+        p.add_argument("product")
+        p.add_argument("country", help="Market code from config.MARKETS, e.g. UK")
+    sub.add_parser("list")
+    run = sub.add_parser("run", help="Scheduler loop (or one cycle with --once)")
+    run.add_argument("--once", action="store_true", help="Run one cycle and exit (for cron)")
+    run.add_argument("--window", default=None, help=f"Off-peak window HH:MM-HH:MM, '' = always (default {WINDOW!r})")
+    run.add_argument("--daily-quota", type=int, default=None, help=f"Scans per rolling 24h (default {DAILY_QUOTA})")
+    run.add_argument("--workers", type=int, default=2, help="Entries refreshed concurrently")
+    run.add_argument("--poll", type=float, default=POLL_SECS, help="Seconds between cycles")
+    args = parser.parse_args(argv)
+
+    if args.command == "add":
+        if config.get_country_config(args.country) is None: parser.error(f"Unknown market '{args.country}'")
+        add(args.product, args.country)
+        print(f"⭐ Watching {args.product} · {args.country.upper()}")
+    elif args.command == "remove":
+        remove(args.product, args.country)
+    elif args.command == "list":
+        for e in entries():
+            when = datetime.fromtimestamp(e["last_scanned_at"]).strftime("%d %b %H:%M") if e["last_scanned_at"] else "never"
+            retry = f" · retry after {datetime.fromtimestamp(e['next_attempt_at']).strftime('%d %b %H:%M')}" if e["next_attempt_at"] else ""
+            print(f"{e['product']} · {e['country']} · last scan {when} · {e['last_status'] or '-'}{retry}")
+    else:
+        while True:
+            counts = run_cycle(args.window, args.daily_quota, args.workers)
+            if args.once: return 1 if counts["error"] else 0
+            time.sleep(args.poll)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())